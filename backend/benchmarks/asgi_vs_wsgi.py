@@ -0,0 +1,133 @@
+"""
+Throughput comparison of the API served by a sync WSGI worker and by an async
+ASGI worker, both talking to the same (remote) database.
+
+Start the two servers with one worker each, from the backend directory:
+
+    gunicorn mysite.wsgi:application --workers 1 --bind 127.0.0.1:8001
+    uvicorn mysite.asgi:application --workers 1 --port 8002
+
+then run, with the credentials of an HR user:
+
+    python benchmarks/asgi_vs_wsgi.py --username <hr> --password <pw> \
+        --target wsgi=http://127.0.0.1:8001 --target asgi=http://127.0.0.1:8002
+
+Every target gets the same number of concurrent clients for the same duration.
+A sync worker handles one request at a time and sits idle during every
+database round trip, an async worker keeps accepting requests meanwhile, so
+the gap grows with the database latency and with the concurrency.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ["/api/employees?limit=100", "/api/leaves?limit=100", "/api/holidays"]
+
+
+def login(base_url, username, password):
+    """Log in as HR and return the Cookie header to send with every request."""
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port)
+    conn.request("GET", "/api/set-csrf-token")
+    response = conn.getresponse()
+    csrf_token = json.loads(response.read())["csrftoken"]
+    cookies = {"csrftoken": csrf_token}
+
+    conn.request(
+        "POST",
+        "/api/login",
+        body=json.dumps({"username": username, "password": password}),
+        headers={
+            "Content-Type": "application/json",
+            "Cookie": f"csrftoken={csrf_token}",
+            "X-CSRFToken": csrf_token,
+        },
+    )
+    response = conn.getresponse()
+    body = json.loads(response.read())
+    if not body.get("success"):
+        raise SystemExit(f"Login failed on {base_url}: {body.get('message')}")
+    for header, value in response.getheaders():
+        if header.lower() == "set-cookie":
+            name, _, rest = value.partition("=")
+            cookies[name] = rest.split(";", 1)[0]
+    conn.close()
+    return "; ".join(f"{name}={value}" for name, value in cookies.items())
+
+
+def client(base_url, cookie, paths, deadline, latencies, errors):
+    """One keep-alive client sending requests in a loop until the deadline."""
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    index = 0
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path, headers={"Cookie": cookie})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def run_target(base_url, cookie, paths, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client, args=(base_url, cookie, paths, deadline, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {"requests": len(latencies), "errors": len(errors), "rps": len(latencies) / elapsed}
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100)
+        result.update(p50_ms=cuts[49] * 1000, p95_ms=cuts[94] * 1000, p99_ms=cuts[98] * 1000)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", required=True, metavar="NAME=URL",
+                        help="server to benchmark, e.g. asgi=http://127.0.0.1:8002 (repeatable)")
+    parser.add_argument("--username", required=True, help="HR username")
+    parser.add_argument("--password", required=True, help="HR password")
+    parser.add_argument("--path", action="append", dest="paths",
+                        help=f"API path to request (repeatable, default: {' '.join(DEFAULT_PATHS)})")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent clients (default: 50)")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per target (default: 20)")
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    print(f"{'target':<8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for target in args.target:
+        name, _, base_url = target.partition("=")
+        cookie = login(base_url, args.username, args.password)
+        result = run_target(base_url, cookie, paths, args.concurrency, args.duration)
+        print(
+            f"{name:<8} {result['rps']:>9.1f} {result.get('p50_ms', 0):>9.1f} "
+            f"{result.get('p95_ms', 0):>9.1f} {result.get('p99_ms', 0):>9.1f} {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+One benchmark case per endpoint of main/api.py (several for endpoints with
+distinct modes, e.g. first page / deep page / streamed).
+
+A case is a function taking the run context and the iteration number. It does
+any untimed preparation (creating the employee a DELETE will remove, logging
+in a fresh client...) and returns a zero-argument callable sending the timed
+request.
+"""
+import io
+import json
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from asgiref.sync import async_to_sync
+from django.test import Client
+
+from main.models import Employee, ProjectManager
+from main.pagination import encode_cursor
+from main.utils import create_employee_user, create_project_manager_user
+
+# Password of the HR user the suite logs in with
+HR_PASSWORD = "benchmark-password"
+
+# Rows per request in the bulk import cases
+IMPORT_ROWS = 100
+
+
+@dataclass
+class Case:
+    name: str
+    func: callable
+    # Cap for cases that read a whole table per request
+    max_iterations: int = None
+
+
+CASES = []
+
+
+def case(name, max_iterations=None):
+    def register(func):
+        CASES.append(Case(name, func, max_iterations))
+        return func
+    return register
+
+
+@dataclass
+class Context:
+    """Shared state of a run: the logged in client and sample rows to target."""
+    client: Client
+    hr_username: str
+    employee_username: str
+    manager_username: str
+    department: str
+    deep_cursor: str
+    token: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+
+    def unique(self, label, i):
+        """A value no other iteration or run uses, for unique emails."""
+        return f"{label}{self.token}{i}"
+
+
+def read_response(response):
+    """Consume the body, streamed or not, sync or async, and return it."""
+    if not response.streaming:
+        return response.content
+    if hasattr(response.streaming_content, "__aiter__"):
+        async def collect():
+            return b"".join([chunk async for chunk in response.streaming_content])
+        return async_to_sync(collect)()
+    return b"".join(response.streaming_content)
+
+
+def _employee_payload(ctx, i):
+    return {
+        "first_name": "Bench",
+        "last_name": "Employee",
+        "email": f"{ctx.unique('emp', i)}@example.com",
+        "phone_number": "9000000000",
+        "department": ctx.department,
+        "birthday": "1990-05-17",
+        "date_of_joining": "2021-03-01",
+    }
+
+
+def _new_employee(ctx, i):
+    payload = _employee_payload(ctx, f"x{i}")
+    return create_employee_user(**payload).username
+
+
+def _new_project_manager(ctx, i):
+    payload = _employee_payload(ctx, f"pm{i}")
+    del payload["date_of_joining"]
+    return create_project_manager_user(**payload).username
+
+
+# --------------------- Session / HR --------------------- #
+
+@case("GET /set-csrf-token")
+def csrf_token(ctx, i):
+    return lambda: ctx.client.get("/api/set-csrf-token")
+
+
+@case("GET /metrics")
+def metrics(ctx, i):
+    return lambda: ctx.client.get("/api/metrics")
+
+
+@case("POST /register")
+def register(ctx, i):
+    body = {
+        "first_name": "Bench",
+        "last_name": "Hr",
+        "email": f"{ctx.unique('hr', i)}@example.com",
+        "password": HR_PASSWORD,
+        "branch": "Pune",
+        "birthday": "1988-02-11",
+    }
+    return lambda: ctx.client.post("/api/register", body, content_type="application/json")
+
+
+@case("POST /login")
+def login(ctx, i):
+    client = Client()
+    body = {"username": ctx.hr_username, "password": HR_PASSWORD}
+    return lambda: client.post("/api/login", body, content_type="application/json")
+
+
+@case("POST /logout")
+def logout(ctx, i):
+    client = Client()
+    client.post("/api/login", {"username": ctx.hr_username, "password": HR_PASSWORD},
+                content_type="application/json")
+    return lambda: client.post("/api/logout")
+
+
+@case("PUT /hr/update")
+def update_hr(ctx, i):
+    body = {"branch": "Pune" if i % 2 else "Mumbai"}
+    return lambda: ctx.client.put("/api/hr/update", body, content_type="application/json")
+
+
+@case("GET /hrs")
+def list_hrs(ctx, i):
+    return lambda: ctx.client.get("/api/hrs")
+
+
+@case("GET /hr/{username}")
+def get_hr(ctx, i):
+    return lambda: ctx.client.get(f"/api/hr/{ctx.hr_username}")
+
+
+# --------------------- Employees --------------------- #
+
+@case("POST /employees/create")
+def create_employee(ctx, i):
+    body = _employee_payload(ctx, i)
+    return lambda: ctx.client.post("/api/employees/create", body, content_type="application/json")
+
+
+@case("GET /employees/search")
+def search(ctx, i):
+    query = ["smi", "jennifer", "eng", "bench-emp-1"][i % 4]
+    return lambda: ctx.client.get("/api/employees/search", {"q": query})
+
+
+@case("POST /employees/import")
+def import_employees(ctx, i):
+    rows = [_employee_payload(ctx, f"imp{i}_{row}") for row in range(IMPORT_ROWS)]
+    return lambda: ctx.client.post("/api/employees/import", rows, content_type="application/json")
+
+
+@case("POST /employees/import/csv")
+def import_employees_csv(ctx, i):
+    rows = [_employee_payload(ctx, f"csv{i}_{row}") for row in range(IMPORT_ROWS)]
+    lines = [",".join(rows[0])] + [",".join(row.values()) for row in rows]
+    content = "\n".join(lines).encode()
+
+    def send():
+        upload = io.BytesIO(content)
+        upload.name = "employees.csv"
+        return ctx.client.post("/api/employees/import/csv", {"file": upload})
+    return send
+
+
+@case("PUT /employees/{username}")
+def update_employee(ctx, i):
+    body = {"phone_number": f"90000{i:05d}"}
+    return lambda: ctx.client.put(f"/api/employees/{ctx.employee_username}", body,
+                                  content_type="application/json")
+
+
+@case("DELETE /employees/{username}")
+def delete_employee(ctx, i):
+    username = _new_employee(ctx, f"del{i}")
+    return lambda: ctx.client.delete(f"/api/employees/{username}")
+
+
+@case("GET /employees")
+def list_employees(ctx, i):
+    return lambda: ctx.client.get("/api/employees")
+
+
+@case("GET /employees (deep cursor)")
+def list_employees_deep(ctx, i):
+    return lambda: ctx.client.get("/api/employees", {"cursor": ctx.deep_cursor})
+
+
+@case("GET /employees?stream=ndjson", max_iterations=5)
+def stream_employees(ctx, i):
+    return lambda: ctx.client.get("/api/employees", {"stream": "ndjson"})
+
+
+@case("GET /employees/{username}/leaves")
+def employee_leaves(ctx, i):
+    return lambda: ctx.client.get(f"/api/employees/{ctx.employee_username}/leaves")
+
+
+# --------------------- Project managers --------------------- #
+
+@case("POST /project_managers/create")
+def create_project_manager(ctx, i):
+    body = _employee_payload(ctx, f"pmc{i}")
+    del body["date_of_joining"]
+    return lambda: ctx.client.post("/api/project_managers/create", body,
+                                   content_type="application/json")
+
+
+@case("PUT /project_managers/{username}")
+def update_project_manager(ctx, i):
+    body = {"phone_number": f"91000{i:05d}"}
+    return lambda: ctx.client.put(f"/api/project_managers/{ctx.manager_username}", body,
+                                  content_type="application/json")
+
+
+@case("DELETE /project_managers/{username}")
+def delete_project_manager(ctx, i):
+    username = _new_project_manager(ctx, f"del{i}")
+    return lambda: ctx.client.delete(f"/api/project_managers/{username}")
+
+
+@case("POST /offboard")
+def offboard(ctx, i):
+    # A fresh department of a manager and ten employees, one with IMPORT_ROWS leaves
+    department = ctx.unique("offboard", i)
+    manager = _new_project_manager(ctx, f"off{i}")
+    ProjectManager.objects.filter(username__username=manager).update(department=department)
+    rows = _leave_rows(ctx, f"off{i}")
+    usernames = [rows[0]["employee_username"]] + [_new_employee(ctx, f"off{i}_{n}") for n in range(9)]
+    Employee.objects.filter(username__username__in=usernames).update(department=department)
+    ctx.client.post("/api/leaves/import", rows, content_type="application/json")
+    return lambda: ctx.client.post("/api/offboard", {"department": department},
+                                   content_type="application/json")
+
+
+@case("GET /project-managers")
+def list_project_managers(ctx, i):
+    return lambda: ctx.client.get("/api/project-managers")
+
+
+@case("GET /project-managers/{username}/team")
+def team(ctx, i):
+    return lambda: ctx.client.get(f"/api/project-managers/{ctx.manager_username}/team")
+
+
+@case("GET /org-chart", max_iterations=5)
+def org_chart(ctx, i):
+    return lambda: ctx.client.get("/api/org-chart")
+
+
+# --------------------- Holidays and leaves --------------------- #
+
+@case("GET /holidays")
+def holidays(ctx, i):
+    return lambda: ctx.client.get("/api/holidays")
+
+
+@case("GET /holidays?year")
+def holidays_year(ctx, i):
+    return lambda: ctx.client.get("/api/holidays", {"year": 2020 + i % 6})
+
+
+def _holiday_rows(i):
+    # IMPORT_ROWS new holidays per iteration, in a year without leaves
+    first = date(2090, 1, 1)
+    return [
+        {"name": f"Bench holiday {i}", "date": str(first + timedelta(days=row))}
+        for row in range(IMPORT_ROWS)
+    ]
+
+
+@case("POST /holidays/import")
+def import_holidays(ctx, i):
+    rows = _holiday_rows(i)
+    return lambda: ctx.client.post("/api/holidays/import", rows, content_type="application/json")
+
+
+@case("POST /holidays/import/csv")
+def import_holidays_csv(ctx, i):
+    rows = _holiday_rows(f"csv{i}")
+    content = "\n".join(["name,date"] + [f"{row['name']},{row['date']}" for row in rows]).encode()
+
+    def send():
+        upload = io.BytesIO(content)
+        upload.name = "holidays.csv"
+        return ctx.client.post("/api/holidays/import/csv", {"file": upload})
+    return send
+
+
+@case("POST /holidays/import/ics")
+def import_holidays_ics(ctx, i):
+    events = "".join(
+        f"BEGIN:VEVENT\r\nDTSTART;VALUE=DATE:{row['date'].replace('-', '')}\r\n"
+        f"SUMMARY:{row['name']}\r\nEND:VEVENT\r\n"
+        for row in _holiday_rows(f"ics{i}")
+    )
+    content = f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\n{events}END:VCALENDAR\r\n".encode()
+
+    def send():
+        upload = io.BytesIO(content)
+        upload.name = "holidays.ics"
+        return ctx.client.post("/api/holidays/import/ics", {"file": upload})
+    return send
+
+
+@case("GET /leaves")
+def list_leaves(ctx, i):
+    return lambda: ctx.client.get("/api/leaves")
+
+
+@case("GET /leaves?stream=ndjson", max_iterations=3)
+def stream_leaves(ctx, i):
+    return lambda: ctx.client.get("/api/leaves", {"stream": "ndjson"})
+
+
+@case("POST /leaves/create")
+def create_leave(ctx, i):
+    # A fresh employee per iteration, so no leave ever overlaps a previous one
+    body = {
+        "employee_username": _new_employee(ctx, f"lv{i}"),
+        "start_date": "2024-06-10",
+        "end_date": "2024-06-14",
+        "approvable": True,
+    }
+    return lambda: ctx.client.post("/api/leaves/create", body, content_type="application/json")
+
+
+def _leave_rows(ctx, i):
+    # IMPORT_ROWS weekly leaves of a fresh employee, so iterations never overlap
+    username = _new_employee(ctx, f"blk{i}")
+    first = date(2024, 1, 1)
+    return [
+        {
+            "employee_username": username,
+            "start_date": str(first + timedelta(weeks=row)),
+            "end_date": str(first + timedelta(weeks=row, days=2)),
+            "approvable": row % 2 == 0,
+        }
+        for row in range(IMPORT_ROWS)
+    ]
+
+
+@case("POST /leaves/import")
+def import_leaves(ctx, i):
+    rows = _leave_rows(ctx, i)
+    return lambda: ctx.client.post("/api/leaves/import", rows, content_type="application/json")
+
+
+@case("POST /leaves/import/csv")
+def import_leaves_csv(ctx, i):
+    rows = _leave_rows(ctx, f"csv{i}")
+    lines = [",".join(rows[0])] + [",".join(str(value) for value in row.values()) for row in rows]
+    content = "\n".join(lines).encode()
+
+    def send():
+        upload = io.BytesIO(content)
+        upload.name = "leaves.csv"
+        return ctx.client.post("/api/leaves/import/csv", {"file": upload})
+    return send
+
+
+@case("GET /leave-balances?username")
+def leave_balances_employee(ctx, i):
+    return lambda: ctx.client.get("/api/leave-balances",
+                                  {"year": 2024, "username": ctx.employee_username})
+
+
+@case("GET /leave-balances?department", max_iterations=10)
+def leave_balances_department(ctx, i):
+    return lambda: ctx.client.get("/api/leave-balances",
+                                  {"year": 2024, "department": ctx.department})
+
+
+# --------------------- Analytics --------------------- #
+
+@case("GET /analytics/departments")
+def department_analytics(ctx, i):
+    return lambda: ctx.client.get("/api/analytics/departments", {"year": 2024})
+
+
+def _quarter(i):
+    # Three months of 2024, moving with the iteration
+    start = date(2024, i % 10 + 1, 1)
+    return {"start": str(start), "end": str(date(2024, i % 10 + 3, 28))}
+
+
+@case("GET /absences/heatmap?department")
+def absence_heatmap_department(ctx, i):
+    return lambda: ctx.client.get("/api/absences/heatmap", {**_quarter(i), "department": ctx.department})
+
+
+@case("GET /absences/heatmap?manager")
+def absence_heatmap_team(ctx, i):
+    return lambda: ctx.client.get("/api/absences/heatmap", {**_quarter(i), "manager": ctx.manager_username})
+
+
+@case("GET /celebrations")
+def upcoming_celebrations(ctx, i):
+    return lambda: ctx.client.get("/api/celebrations", {"days": 30})
+
+
+def build_context(hr_username):
+    """Log in as HR and pick the sample rows the cases target."""
+    client = Client()
+    response = client.post("/api/login", {"username": hr_username, "password": HR_PASSWORD},
+                           content_type="application/json")
+    if not json.loads(response.content).get("success"):
+        raise RuntimeError("Unable to log in as the benchmark HR user")
+
+    employees = Employee.objects.select_related("username").order_by("last_name", "id")
+    total = employees.count()
+    sample = employees[total // 2]
+    manager = ProjectManager.objects.select_related("username").order_by("id").first()
+
+    return Context(
+        client=client,
+        hr_username=hr_username,
+        employee_username=sample.username.username,
+        manager_username=manager.username.username,
+        department=sample.department,
+        # A page in the middle of the collection
+        deep_cursor=encode_cursor(sample.last_name, sample.id),
+    )
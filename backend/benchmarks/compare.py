@@ -0,0 +1,83 @@
+"""
+Diff two benchmark outputs of benchmarks.run and flag regressions.
+
+    python -m benchmarks.compare baseline.json current.json [--threshold 0.2]
+
+A case regresses when its p50 or p95 latency grows by more than the threshold
+(and by more than --min-ms, so sub-millisecond noise is ignored), when it
+runs more SQL queries, or when its peak memory grows by more than the
+threshold. The exit status is 1 if any case regressed, so the command can
+gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def _change(old, new):
+    if not old:
+        return 0.0 if not new else float("inf")
+    return (new - old) / old
+
+
+def compare(baseline, current, threshold=0.2, min_ms=1.0):
+    """
+    Returns:
+        list: one (case, field, old, new, regressed) tuple per compared value
+    """
+    rows = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        for field in ("p50_ms", "p95_ms"):
+            regressed = (_change(old[field], new[field]) > threshold
+                         and new[field] - old[field] > min_ms)
+            rows.append((name, field, old[field], new[field], regressed))
+        rows.append((name, "queries", old["queries"], new["queries"], new["queries"] > old["queries"]))
+        rows.append((name, "peak_memory_kb", old["peak_memory_kb"], new["peak_memory_kb"],
+                     _change(old["peak_memory_kb"], new["peak_memory_kb"]) > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.compare", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("baseline", help="benchmark JSON of the reference commit")
+    parser.add_argument("current", help="benchmark JSON to check")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative growth counted as a regression (default: 0.2)")
+    parser.add_argument("--min-ms", type=float, default=1.0,
+                        help="ignore latency changes smaller than this (default: 1.0)")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    for key in ("employees", "leaves_per_employee", "database"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: {key} differs ({baseline['meta'].get(key)} vs {current['meta'].get(key)})")
+
+    print(f"{baseline['meta'].get('commit')} -> {current['meta'].get('commit')}")
+    print(f"{'case':<42} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>8}")
+    regressions = 0
+    for name, field, old, new, regressed in compare(baseline, current, args.threshold, args.min_ms):
+        regressions += regressed
+        change = _change(old, new)
+        print(f"{name:<42} {field:<15} {old:>10} {new:>10} {change:>+8.1%}"
+              + ("  REGRESSION" if regressed else ""))
+
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    for name in missing:
+        print(f"{name:<42} missing from {args.current}")
+
+    print(f"{regressions} regression(s)")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Benchmark every API endpoint against a seeded test database.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --scale 10k --output benchmarks/results/10k.json
+
+A throwaway test database is created (as for the test suite), seeded with
+benchmarks.seed and every case of benchmarks.cases is exercised through the
+Django test client. For every case the output records latency percentiles,
+the number of SQL queries of one request and the peak Python memory
+allocated while serving it. Compare two outputs with benchmarks.compare.
+
+--keepdb keeps the test database between runs and skips seeding when it
+already holds the requested number of employees, which saves minutes at the
+100k scale.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
+    import django
+    django.setup()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(cuts, p):
+    return round(cuts[p - 1] * 1000, 3)
+
+
+def measure(case, ctx, iterations, warmup):
+    """Time one case, then count the queries and peak memory of one more request."""
+    # The login view prints debug output, keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        return _measure(case, ctx, iterations, warmup)
+
+
+def _measure(case, ctx, iterations, warmup):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from .cases import read_response
+
+    iterations = min(iterations, case.max_iterations or iterations)
+    warmup = min(warmup, iterations)
+    latencies = []
+    errors = 0
+    for i in range(warmup + iterations):
+        send = case.func(ctx, i)
+        started = time.perf_counter()
+        response = send()
+        body = read_response(response)
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200 or body.startswith(b'{"success": false'):
+            errors += 1
+        if i >= warmup:
+            latencies.append(elapsed)
+
+    send = case.func(ctx, warmup + iterations)
+    gc.collect()
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        read_response(send())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else [latencies[0]] * 99
+    return {
+        "iterations": len(latencies),
+        "errors": errors,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": percentile(cuts, 50),
+        "p95_ms": percentile(cuts, 95),
+        "p99_ms": percentile(cuts, 99),
+        "max_ms": round(max(latencies) * 1000, 3),
+        "queries": len(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--scale", default="1k", help="1k, 10k or 100k employees (default: 1k)")
+    parser.add_argument("--employees", type=int, help="explicit employee count, overrides --scale")
+    parser.add_argument("--leaves-per-employee", type=int, default=10,
+                        help="leaves seeded per employee (default: 10, i.e. 1M leaves at 100k)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed of the data set (default: 42)")
+    parser.add_argument("--iterations", type=int, default=30, help="timed requests per case (default: 30)")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed requests per case (default: 3)")
+    parser.add_argument("--only", action="append", help="run only cases containing this text (repeatable)")
+    parser.add_argument("--keepdb", action="store_true", help="keep and reuse the seeded test database")
+    parser.add_argument("--output", "-o", help="JSON file to write (default: benchmark-<scale>.json)")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.hashers import make_password
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    from main.models import Employee, HR, User
+    from main.utils import create_hr_user
+
+    from .cases import CASES, HR_PASSWORD, build_context
+    from .seed import SCALES, seed
+
+    if args.employees is None and args.scale not in SCALES:
+        parser.error(f"unknown scale {args.scale!r}, expected one of {', '.join(SCALES)}")
+    employee_count = args.employees if args.employees is not None else SCALES[args.scale]
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=args.keepdb)
+    try:
+        if Employee.objects.filter(username__username__startswith="bench-emp-").count() == employee_count:
+            print(f"Reusing the seeded database ({employee_count} employees)")
+        else:
+            started = time.perf_counter()
+            seeded = seed(args.scale, args.leaves_per_employee, args.seed,
+                          employees=args.employees, stdout=sys.stdout)
+            print(f"Seeded {seeded} in {time.perf_counter() - started:.1f}s")
+
+        hr = HR.objects.select_related("username").filter(username__username__startswith="bench_").first()
+        if hr is None:
+            hr_user = create_hr_user("Bench", "Hr", "bench-hr@example.com", "Bench", "1985-01-01", HR_PASSWORD)
+        else:
+            hr_user = hr.username
+            User.objects.filter(pk=hr_user.pk).update(password=make_password(HR_PASSWORD))
+        ctx = build_context(hr_user.username)
+
+        results = {}
+        for case in CASES:
+            if args.only and not any(text in case.name for text in args.only):
+                continue
+            results[case.name] = measure(case, ctx, args.iterations, args.warmup)
+            result = results[case.name]
+            print(f"{case.name:<42} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+                  f"{result['queries']:>4} queries  {result['peak_memory_kb']:>9.1f} KiB"
+                  + (f"  {result['errors']} errors" if result["errors"] else ""))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=args.keepdb)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "scale": args.scale if args.employees is None else str(args.employees),
+            "employees": employee_count,
+            "leaves_per_employee": args.leaves_per_employee,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "database": connection.vendor,
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+    output = Path(args.output or f"benchmark-{report['meta']['scale']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Deterministic synthetic data for the benchmark suite.
+
+The same scale and seed always produce the same rows. Everything is written
+with bulk_create in batches, then the caches and the leave ledger that the
+model signals would normally maintain are brought up to date.
+"""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import transaction
+
+from main.business_days import working_days_batch
+from main.ledger import rebuild_leave_balances
+from main.models import User, Employee, ProjectManager, Holiday, Leave
+
+# Number of employees of every named scale
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+# One project manager per this many employees
+EMPLOYEES_PER_MANAGER = 20
+
+# Rows per INSERT while seeding
+SEED_BATCH_SIZE = 5000
+
+# Leaves are spread over these years, holidays are seeded for all of them
+FIRST_YEAR = 2020
+LAST_YEAR = 2025
+
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "Finance", "Support", "Operations", "Legal", "Design"]
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David",
+               "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas",
+               "Sarah", "Priya", "Rahul", "Ananya", "Arjun", "Wei", "Mei", "Carlos", "Lucia"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore",
+              "Jackson", "Martin", "Lee", "Sharma", "Patel", "Chen", "Wang", "Walker", "Young"]
+HOLIDAYS = [(1, 1, "New Year"), (1, 26, "Republic Day"), (3, 25, "Holi"), (5, 1, "Labour Day"),
+            (8, 15, "Independence Day"), (10, 2, "Gandhi Jayanti"), (11, 1, "Diwali"),
+            (12, 25, "Christmas")]
+
+
+def _random_date(rng, first, last):
+    return first + timedelta(days=rng.randrange((last - first).days + 1))
+
+
+def _create_users(prefix, role, count, rng, unusable_password):
+    """Create `count` users with usernames the username allocator never produces."""
+    users = []
+    for start in range(0, count, SEED_BATCH_SIZE):
+        batch = [
+            User(
+                username=f"{prefix}-{index}",
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f"{prefix}-{index}@example.com",
+                password=unusable_password,
+                role=role,
+            )
+            for index in range(start, min(start + SEED_BATCH_SIZE, count))
+        ]
+        users.extend(User.objects.bulk_create(batch))
+    return users
+
+
+def _leave_ranges(rng, leaves_per_employee):
+    """Non-overlapping leaves of one employee, in date order."""
+    ranges = []
+    day = date(FIRST_YEAR, 1, 1) + timedelta(days=rng.randrange(30))
+    span = (date(LAST_YEAR, 12, 1) - day).days
+    gap = max(span // max(leaves_per_employee, 1), 7)
+    for _ in range(leaves_per_employee):
+        start = day + timedelta(days=rng.randrange(max(gap - 6, 1)))
+        end = start + timedelta(days=rng.randrange(5))
+        ranges.append((start, end))
+        day = end + timedelta(days=2)
+    return ranges
+
+
+def seed(scale="1k", leaves_per_employee=10, random_seed=42, employees=None, stdout=None):
+    """
+    Seed employees (a named scale or an explicit count), project managers,
+    holidays and leaves_per_employee leaves for every employee.
+
+    Returns:
+        dict: the number of rows created per model
+    """
+    rng = random.Random(random_seed)
+    employee_count = employees if employees is not None else SCALES[scale]
+    manager_count = max(employee_count // EMPLOYEES_PER_MANAGER, 1)
+    unusable_password = make_password(None)
+
+    def log(message):
+        if stdout:
+            stdout.write(message + "\n")
+
+    with transaction.atomic():
+        Holiday.objects.bulk_create([
+            Holiday(name=name, date=date(year, month, day))
+            for year in range(FIRST_YEAR, LAST_YEAR + 1)
+            for month, day, name in HOLIDAYS
+        ])
+        # Holidays were written without signals, drop the cached calendars
+        cache.clear()
+
+        log(f"Seeding {manager_count} project managers")
+        manager_users = _create_users("bench-pm", "PROJECT_MANAGER", manager_count, rng, unusable_password)
+        managers = ProjectManager.objects.bulk_create(
+            [
+                ProjectManager(
+                    username=user,
+                    first_name=user.first_name,
+                    last_name=user.last_name,
+                    email=user.email,
+                    phone_number=f"9{rng.randrange(10 ** 9):09d}",
+                    department=rng.choice(DEPARTMENTS),
+                    birthday=_random_date(rng, date(1965, 1, 1), date(1995, 12, 31)),
+                )
+                for user in manager_users
+            ],
+            batch_size=SEED_BATCH_SIZE,
+        )
+
+        log(f"Seeding {employee_count} employees")
+        employee_users = _create_users("bench-emp", "EMPLOYEE", employee_count, rng, unusable_password)
+        employees_created = Employee.objects.bulk_create(
+            [
+                Employee(
+                    username=user,
+                    first_name=user.first_name,
+                    last_name=user.last_name,
+                    email=user.email,
+                    phone_number=f"8{rng.randrange(10 ** 9):09d}",
+                    department=rng.choice(DEPARTMENTS),
+                    birthday=_random_date(rng, date(1970, 1, 1), date(2002, 12, 31)),
+                    date_of_joining=_random_date(rng, date(2010, 1, 1), date(2019, 12, 31)),
+                    # A few employees are left without a manager
+                    reporting_manager=rng.choice(managers) if rng.random() > 0.05 else None,
+                )
+                for user in employee_users
+            ],
+            batch_size=SEED_BATCH_SIZE,
+        )
+
+        log(f"Seeding {employee_count * leaves_per_employee} leaves")
+        leave_count = 0
+        pending = []
+        for emp in employees_created:
+            pending.extend(
+                (emp.id, start, end, rng.random() < 0.7)
+                for start, end in _leave_ranges(rng, leaves_per_employee)
+            )
+            if len(pending) >= SEED_BATCH_SIZE or emp is employees_created[-1]:
+                counts = working_days_batch((start, end) for _, start, end, _ in pending)
+                Leave.objects.bulk_create(
+                    [
+                        Leave(employee_id=employee_id, start_date=start, end_date=end,
+                              number_of_days=days, approvable=approvable)
+                        for (employee_id, start, end, approvable), days in zip(pending, counts)
+                    ],
+                    batch_size=SEED_BATCH_SIZE,
+                )
+                leave_count += len(pending)
+                pending = []
+
+    log("Rebuilding leave balances")
+    rebuild_leave_balances()
+    # Nothing above sent signals, start from an empty cache
+    cache.clear()
+
+    return {
+        "holidays": (LAST_YEAR - FIRST_YEAR + 1) * len(HOLIDAYS),
+        "project_managers": manager_count,
+        "employees": employee_count,
+        "leaves": leave_count,
+    }
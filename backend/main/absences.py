@@ -0,0 +1,107 @@
+from datetime import timedelta
+from itertools import accumulate
+
+from .business_days import WEEKEND_DAYS
+from .cache import cached_collection_many, get_collection_version
+from .models import Leave
+from .utils import get_all_holidays
+
+# Longest date range one heatmap request covers
+MAX_HEATMAP_DAYS = 366
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _months(start, end):
+    month = _month_start(start)
+    while month <= end:
+        yield month
+        month = _next_month(month)
+
+
+def _absence_counts(leaves, first_day, last_day):
+    """
+    Number of employees on leave each day from `first_day` to `last_day`,
+    approved and pending leaves counted apart.
+
+    A difference array per status: +1 on the first day of a leave, -1 on the
+    day after its last, then one running sum, so the work grows with leaves
+    plus days instead of leaves times days.
+    """
+    length = (last_day - first_day).days + 1
+    approved = [0] * (length + 1)
+    pending = [0] * (length + 1)
+    for start, end, approvable in leaves:
+        diff = approved if approvable else pending
+        diff[(max(start, first_day) - first_day).days] += 1
+        diff[(min(end, last_day) - first_day).days + 1] -= 1
+    return list(accumulate(approved[:length])), list(accumulate(pending[:length]))
+
+
+def get_absence_heatmap(start, end, department=None, manager_username=None):
+    """
+    Utility to count the employees of a department, or of a project manager's
+    team, on leave each day from `start` to `end`, with weekends and holidays
+    marked.
+
+    Counts are cached per scope and calendar month until leaves or employees
+    change. The months missing from the cache are computed together from one
+    query reading only the leaves that overlap them.
+
+    Returns:
+        list: [{"date", "absent", "pending", "weekend", "holiday"}] per day
+    """
+    if department:
+        scope = {"employee__department": department}
+        scope_key = f"department:{department}"
+    else:
+        scope = {"employee__reporting_manager__username__username": manager_username}
+        scope_key = f"team:{manager_username}"
+    # Moving an employee to another department or team bumps "employees"
+    prefix = f"absences:{get_collection_version('employees')}:{scope_key}"
+    month_keys = {f"{prefix}:{month}": month for month in _months(start, end)}
+
+    def compute_missing(suffixes):
+        months = sorted(month_keys[suffix] for suffix in suffixes)
+        first_day = months[0]
+        last_day = _next_month(months[-1]) - timedelta(days=1)
+        leaves = Leave.objects.filter(
+            start_date__lte=last_day, end_date__gte=first_day, **scope
+        ).values_list("start_date", "end_date", "approvable")
+        approved, pending = _absence_counts(leaves, first_day, last_day)
+        computed = {}
+        for month in months:
+            offset = (month - first_day).days
+            length = (_next_month(month) - month).days
+            computed[f"{prefix}:{month}"] = (
+                approved[offset:offset + length], pending[offset:offset + length]
+            )
+        return computed
+
+    counts = cached_collection_many("leaves", list(month_keys), compute_missing)
+
+    holidays = {}
+    for year in range(start.year, end.year + 1):
+        for holiday in get_all_holidays(year):
+            holidays.setdefault(holiday["date"], []).append(holiday["name"])
+
+    days = []
+    day = start
+    while day <= end:
+        approved, pending = counts[f"{prefix}:{_month_start(day)}"]
+        names = holidays.get(str(day))
+        days.append({
+            "date": day,
+            "absent": approved[day.day - 1],
+            "pending": pending[day.day - 1],
+            "weekend": day.weekday() in WEEKEND_DAYS,
+            "holiday": ", ".join(names) if names else None,
+        })
+        day += timedelta(days=1)
+    return days
@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .cache import cached_collection
+from .models import Employee, LeaveBalance, ProjectManager
+
+# Seconds the department analytics are served from the cache. They are not
+# invalidated on writes, a dashboard can be this much behind.
+ANALYTICS_CACHE_TIMEOUT = 60
+
+
+def _money(value):
+    return str(Decimal(value).quantize(Decimal("0.01"))) if value is not None else None
+
+
+def get_department_analytics(year):
+    """
+    Utility to compute per department: headcount, total and average salary,
+    number of project managers and leave days taken in `year`.
+
+    One GROUP BY over the employees, with the manager count and the leave
+    days (from the leave ledger) as correlated subqueries on the department,
+    so the database returns one row per department.
+    """
+    def load():
+        managers = (
+            ProjectManager.objects.filter(department=OuterRef("department"))
+            .order_by()
+            .values("department")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        leave_days = (
+            LeaveBalance.objects.filter(year=year, employee__department=OuterRef("department"))
+            .order_by()
+            .values("employee__department")
+            .annotate(days=Sum("taken"))
+            .values("days")
+        )
+        rows = (
+            Employee.objects.order_by()
+            .values("department")
+            .annotate(
+                headcount=Count("id"),
+                total_salary=Sum("salary"),
+                average_salary=Avg("salary"),
+                managers=Coalesce(Subquery(managers, output_field=IntegerField()), Value(0)),
+                leave_days_taken=Coalesce(Subquery(leave_days, output_field=IntegerField()), Value(0)),
+            )
+            .order_by("department")
+        )
+        return [
+            {
+                "department": row["department"],
+                "headcount": row["headcount"],
+                "total_salary": _money(row["total_salary"]),
+                "average_salary": _money(row["average_salary"]),
+                "managers": row["managers"],
+                "leave_days_taken": row["leave_days_taken"],
+            }
+            for row in rows
+        ]
+
+    return cached_collection("department_analytics", year, load, timeout=ANALYTICS_CACHE_TIMEOUT)
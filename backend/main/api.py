@@ -1,6 +1,12 @@
-from ninja import NinjaAPI
+import secrets
+from datetime import MAXYEAR, MINYEAR, date
+from typing import List
+from ninja import NinjaAPI, Body, File
+from ninja.files import UploadedFile
 from ninja.security import django_auth
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
+from django.http import HttpResponse
 from django.middleware.csrf import get_token
 from .utils import (
     create_employee_user,
@@ -11,17 +17,45 @@ from .utils import (
     delete_employee,
     update_project_manager,
     update_hr,
-    get_all_hrs,
-    get_hr_by_username,
-    get_all_employees,
-    get_all_project_managers,
-    get_all_holidays,
-    get_all_leaves,
-    get_user_leaves,
-    create_leave
+    aget_all_hrs,
+    aget_hr_by_username,
+    aget_all_employees,
+    aget_all_project_managers,
+    aget_all_holidays,
+    aget_all_leaves,
+    aiter_all_employees,
+    aiter_all_project_managers,
+    aiter_all_leaves,
+    iter_all_employees,
+    iter_all_project_managers,
+    iter_all_leaves,
+    aget_user_leaves,
+    create_leave,
+    employee_to_dict,
+    project_manager_to_dict,
+    hr_to_dict,
 )
 
-from .models import User, Employee, ProjectManager, HR, Holiday, Leave
+from .absences import MAX_HEATMAP_DAYS, get_absence_heatmap
+from .analytics import get_department_analytics
+from .celebrations import MAX_CELEBRATION_DAYS, get_upcoming_celebrations
+from .conditional import collection_validators, not_modified, set_validators
+from .hierarchy import get_org_chart, get_team
+from .ledger import get_leave_balances
+from .metrics import connection_stats, registry
+from .search import search_employees
+from .security import async_django_auth
+from .bulk import (
+    bulk_create_employees,
+    bulk_create_leaves,
+    bulk_import_holidays,
+    bulk_offboard,
+    read_csv_rows,
+    read_ics_rows,
+)
+from .models import User, ProjectManager
+from .pagination import InvalidCursor
+from .streaming import STREAM_FORMATS, server_rows, stream_rows
 from .schemas import (
     RegisterHRSchema,
     SignInSchema,
@@ -30,7 +64,8 @@ from .schemas import (
     ProjectManagerCreateSchema,
     ProjectManagerUpdateSchema,
     HRUpdateSchema,
-    LeaveCreateSchema
+    LeaveCreateSchema,
+    OffboardSchema,
 )
 
 api = NinjaAPI()
@@ -41,6 +76,29 @@ def get_csrf_token(request):
     return {"csrftoken": get_token(request)}
 
 
+# Api for monitoring to scrape per-route request and SQL metrics and database
+# connection statistics (Prometheus text format)
+@api.get("/metrics")
+def get_metrics_handler(request):
+    if not settings.METRICS_ENABLED:
+        return {"success": False, "message": "Metrics are disabled"}
+    if settings.METRICS_TOKEN:
+        authorized = secrets.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+        )
+    else:
+        # Without a token, an HR session is required outside DEBUG
+        authorized = settings.DEBUG or (
+            request.user.is_authenticated and request.user.role == "HR"
+        )
+    if not authorized:
+        return {"success": False, "message": "Unauthorized"}
+    return HttpResponse(
+        registry.render() + connection_stats.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 # ---------------------------------- HR APIs ---------------------------------- #
 
 
@@ -102,25 +160,35 @@ def update_hr_profile(request, payload: HRUpdateSchema):
     if not updated_hr:
         return {"success": False, "message": "Unable to update HR profile"}
 
-    return {"success": True, "message": "HR profile updated"}
+    return {"success": True, "message": "HR profile updated", "hr": hr_to_dict(updated_hr)}
 
 
-# Api for HR to get all HRs
-@api.get("/hrs", auth=django_auth)
-def get_all_hrs_handler(request):
-    if request.user.role != "HR":
+# Api for HR to get all HRs (paginated with limit / cursor)
+@api.get("/hrs", auth=async_django_auth)
+async def get_all_hrs_handler(
+    request, response: HttpResponse, limit: int = None, cursor: str = None
+):
+    if request.auth.role != "HR":
         return {"success": False, "message": "Unauthorized"}
-    
-    hr_list = get_all_hrs()
-    return {"success": True, "hrs": hr_list}
+    validators = collection_validators(request, "hrs")
+    unchanged = not_modified(request, validators)
+    if unchanged:
+        return unchanged
+    set_validators(response, validators)
+
+    try:
+        hr_list, next_cursor = await aget_all_hrs(limit, cursor)
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}
+    return {"success": True, "hrs": hr_list, "next": next_cursor}
 
 # Api for HR to view HR profile (self or others)
-@api.get("/hr/{username}", auth=django_auth)
-def get_hr_profile_handler(request, username: str):
-    if request.user.role != "HR":
+@api.get("/hr/{username}", auth=async_django_auth)
+async def get_hr_profile_handler(request, username: str):
+    if request.auth.role != "HR":
         return {"success": False, "message": "Unauthorized"}
     
-    hr_data = get_hr_by_username(username)
+    hr_data = await aget_hr_by_username(username)
     if hr_data is None:
         return {"success": False, "message": "HR not found"}
     
@@ -156,21 +224,62 @@ def create_employee_handler(request, payload: EmployeeCreateSchema):
     return {"success": True, "message": "Employee created", "username": user.username}
 
 
-# Api for HR to update employee
-@api.put("/employees/{username}", auth=django_auth)
-def update_employee_handler(request, username: str, payload: EmployeeUpdateSchema):
-    try:
-        user = User.objects.get(username=username)
-    except User.DoesNotExist:
-        return {"success": False, "message": "User not found"}
+# Api for HR to search employees by name, email, username or department
+# (declared before /employees/{username} so "search" is not taken for a username)
+@api.get("/employees/search", auth=django_auth)
+def search_employees_handler(request, q: str, limit: int = None):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    return {"success": True, "employees": search_employees(q, limit)}
+
 
+# Api for HR to import many employees at once from a JSON array
+@api.post("/employees/import", auth=django_auth)
+def import_employees_handler(request, payload: List[dict] = Body(...)):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    result = bulk_create_employees(payload)
+    if result is None:
+        return {
+            "success": False,
+            "message": "Unable to import employees, another employee was created meanwhile. Please retry.",
+        }
+    return {
+        "success": True,
+        "message": f"{len(result['usernames'])} employees created",
+        "usernames": result["usernames"],
+        "errors": result["errors"],
+    }
+
+
+# Api for HR to import many employees at once from a CSV upload
+@api.post("/employees/import/csv", auth=django_auth)
+def import_employees_csv_handler(request, file: UploadedFile = File(...)):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
     try:
-        employee = Employee.objects.get(username_id=user.id)
-    except Employee.DoesNotExist:
-        return {"success": False, "message": "Employee not found"}
+        rows = read_csv_rows(file)
+    except (UnicodeDecodeError, ValueError):
+        return {"success": False, "message": "Unable to read CSV file"}
+    result = bulk_create_employees(rows)
+    if result is None:
+        return {
+            "success": False,
+            "message": "Unable to import employees, another employee was created meanwhile. Please retry.",
+        }
+    return {
+        "success": True,
+        "message": f"{len(result['usernames'])} employees created",
+        "usernames": result["usernames"],
+        "errors": result["errors"],
+    }
 
+
+# Api for HR to update employee
+@api.put("/employees/{username}", auth=django_auth)
+def update_employee_handler(request, username: str, payload: EmployeeUpdateSchema):
     updated_employee = update_employee(
-        username=user.username,
+        username=username,
         first_name=payload.first_name,
         last_name=payload.last_name,
         email=getattr(payload, "email", None),  # or handle if needed
@@ -184,7 +293,11 @@ def update_employee_handler(request, username: str, payload: EmployeeUpdateSchem
     if not updated_employee:
         return {"success": False, "message": "Unable to update Employee"}
 
-    return {"success": True, "message": "Employee updated"}
+    return {
+        "success": True,
+        "message": "Employee updated",
+        "employee": employee_to_dict(updated_employee),
+    }
 
 
 # Api for HR to delete employee
@@ -201,13 +314,34 @@ def delete_employee_handler(request, username: str):
     return {"success": False, "message": "Failed to delete Employee"}
 
 
-# Api for HR to get all employees
-@api.get("/employees", auth=django_auth)
-def get_all_employees_handler(request):
-    if request.user.role != "HR":
+# Api for HR to get all employees (paginated with limit / cursor, or streamed)
+@api.get("/employees", auth=async_django_auth)
+async def get_all_employees_handler(
+    request,
+    response: HttpResponse,
+    limit: int = None,
+    cursor: str = None,
+    stream: str = None,
+):
+    if request.auth.role != "HR":
         return {"success": False, "message": "Unauthorized"}
-    employees = get_all_employees()
-    return {"success": True, "employees": employees}
+    validators = collection_validators(request, "employees")
+    unchanged = not_modified(request, validators)
+    if unchanged:
+        return unchanged
+    set_validators(response, validators)
+    if stream:
+        if stream not in STREAM_FORMATS:
+            return {"success": False, "message": "Invalid stream format"}
+        streamed = stream_rows(
+            server_rows(request, iter_all_employees, aiter_all_employees), stream, "employees"
+        )
+        return set_validators(streamed, validators)
+    try:
+        employees, next_cursor = await aget_all_employees(limit, cursor)
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}
+    return {"success": True, "employees": employees, "next": next_cursor}
 
 
 # ---------------------------------- Project Manager APIs for HR ---------------------------------- #
@@ -238,18 +372,8 @@ def create_project_manager_handler(request, payload: ProjectManagerCreateSchema)
 def update_project_manager_handler(
     request, username: str, payload: ProjectManagerUpdateSchema
 ):
-    try:
-        user = User.objects.get(username=username)
-    except User.DoesNotExist:
-        return {"success": False, "message": "User not found"}
-
-    try:
-        project_manager = ProjectManager.objects.get(username_id=user.id)
-    except ProjectManager.DoesNotExist:
-        return {"success": False, "message": "Project Manager not found"}
-
     updated_project_manager = update_project_manager(
-        username=user.username,
+        username=username,
         first_name=payload.first_name,
         last_name=payload.last_name,
         email=getattr(payload, "email", None),  # or handle if needed
@@ -261,7 +385,11 @@ def update_project_manager_handler(
     if not updated_project_manager:
         return {"success": False, "message": "Unable to update Project Manager"}
 
-    return {"success": True, "message": "Project Manager updated"}
+    return {
+        "success": True,
+        "message": "Project Manager updated",
+        "project_manager": project_manager_to_dict(updated_project_manager),
+    }
 
 
 # Api for HR to delete project manager
@@ -278,42 +406,197 @@ def delete_project_manager_handler(request, username: str):
     return {"success": False, "message": "Failed to delete Project Manager"}
 
 
-# Api for HR to get all project managers
-@api.get("/project-managers", auth=django_auth)
-def get_all_project_managers_handler(request):
+# Api for HR to offboard many employees and project managers at once,
+# given by username or by department
+@api.post("/offboard", auth=django_auth)
+def offboard_handler(request, payload: OffboardSchema):
     if request.user.role != "HR":
         return {"success": False, "message": "Unauthorized"}
-    managers = get_all_project_managers()
-    return {"success": True, "project_managers": managers}
+    if (payload.usernames is None) == (payload.department is None):
+        return {"success": False, "message": "Provide either usernames or a department"}
+
+    result = bulk_offboard(usernames=payload.usernames, department=payload.department)
+    return {
+        "success": True,
+        "message": f"{len(result['employees'])} employees and "
+                   f"{len(result['project_managers'])} project managers removed",
+        **result,
+    }
 
 
-# Api for HR to get all holidays
-@api.get("/holidays", auth=django_auth)
-def get_all_holidays_handler(request):
+# Api for HR to get all project managers (paginated with limit / cursor, or streamed)
+@api.get("/project-managers", auth=async_django_auth)
+async def get_all_project_managers_handler(
+    request,
+    response: HttpResponse,
+    limit: int = None,
+    cursor: str = None,
+    stream: str = None,
+):
+    if request.auth.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    validators = collection_validators(request, "project_managers")
+    unchanged = not_modified(request, validators)
+    if unchanged:
+        return unchanged
+    set_validators(response, validators)
+    if stream:
+        if stream not in STREAM_FORMATS:
+            return {"success": False, "message": "Invalid stream format"}
+        streamed = stream_rows(
+            server_rows(request, iter_all_project_managers, aiter_all_project_managers), stream, "project_managers"
+        )
+        return set_validators(streamed, validators)
+    try:
+        managers, next_cursor = await aget_all_project_managers(limit, cursor)
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}
+    return {"success": True, "project_managers": managers, "next": next_cursor}
+
+
+# Api for HR to get the team reporting to a project manager
+@api.get("/project-managers/{username}/team", auth=django_auth)
+def get_project_manager_team_handler(request, username: str):
     if request.user.role != "HR":
         return {"success": False, "message": "Unauthorized"}
-    holidays = get_all_holidays()
+    team = get_team(username)
+    if team is None:
+        return {"success": False, "message": "Project Manager not found"}
+    return {"success": True, "manager": team["manager"], "team": team["team"]}
+
+
+# Api for HR to get the whole reporting hierarchy
+@api.get("/org-chart", auth=django_auth)
+def get_org_chart_handler(request):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    chart = get_org_chart()
+    return {"success": True, "managers": chart["managers"], "unassigned": chart["unassigned"]}
+
+
+# Api for HR to get all holidays (optionally of a single year)
+@api.get("/holidays", auth=async_django_auth)
+async def get_all_holidays_handler(request, response: HttpResponse, year: int = None):
+    if request.auth.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    if year is not None and not MINYEAR <= year <= MAXYEAR:
+        return {"success": False, "message": f"year must be between {MINYEAR} and {MAXYEAR}"}
+    validators = collection_validators(request, "holidays")
+    unchanged = not_modified(request, validators)
+    if unchanged:
+        return unchanged
+    set_validators(response, validators)
+    holidays = await aget_all_holidays(year)
     return {"success": True, "holidays": holidays}
 
 
-# Api for HR to get all leaves
-@api.get("/leaves", auth=django_auth)
-def get_all_leaves_handler(request):
+# Api for HR to import many holidays at once from a JSON array
+@api.post("/holidays/import", auth=django_auth)
+def import_holidays_handler(request, payload: List[dict] = Body(...)):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    result = bulk_import_holidays(payload)
+    return {
+        "success": True,
+        "message": f"{result['created']} holidays created",
+        "existing": result["existing"],
+        "leaves_updated": result["leaves_updated"],
+        "errors": result["errors"],
+    }
+
+
+# Api for HR to import many holidays at once from a CSV upload (name, date columns)
+@api.post("/holidays/import/csv", auth=django_auth)
+def import_holidays_csv_handler(request, file: UploadedFile = File(...)):
     if request.user.role != "HR":
         return {"success": False, "message": "Unauthorized"}
-    leaves = get_all_leaves()
-    return {"success": True, "leaves": leaves}
+    try:
+        rows = read_csv_rows(file)
+    except (UnicodeDecodeError, ValueError):
+        return {"success": False, "message": "Unable to read CSV file"}
+    result = bulk_import_holidays(rows)
+    return {
+        "success": True,
+        "message": f"{result['created']} holidays created",
+        "existing": result["existing"],
+        "leaves_updated": result["leaves_updated"],
+        "errors": result["errors"],
+    }
 
 
-# Api for HR to get all leaves of an employee
-@api.get("/employees/{username}/leaves", auth=django_auth)
-def get_employee_leaves_handler(request, username: str):
+# Api for HR to import the events of an iCalendar (.ics) file as holidays
+@api.post("/holidays/import/ics", auth=django_auth)
+def import_holidays_ics_handler(request, file: UploadedFile = File(...)):
     if request.user.role != "HR":
         return {"success": False, "message": "Unauthorized"}
-    leaves = get_user_leaves(username, "EMPLOYEE")
-    if leaves is None:
+    try:
+        rows = read_ics_rows(file)
+    except (UnicodeDecodeError, ValueError):
+        return {"success": False, "message": "Unable to read iCalendar file"}
+    result = bulk_import_holidays(rows)
+    return {
+        "success": True,
+        "message": f"{result['created']} holidays created",
+        "existing": result["existing"],
+        "leaves_updated": result["leaves_updated"],
+        "errors": result["errors"],
+    }
+
+
+# Api for HR to get all leaves (paginated with limit / cursor, or streamed)
+@api.get("/leaves", auth=async_django_auth)
+async def get_all_leaves_handler(
+    request,
+    response: HttpResponse,
+    limit: int = None,
+    cursor: str = None,
+    stream: str = None,
+):
+    if request.auth.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    validators = collection_validators(request, "leaves", "employees")
+    unchanged = not_modified(request, validators)
+    if unchanged:
+        return unchanged
+    set_validators(response, validators)
+    if stream:
+        if stream not in STREAM_FORMATS:
+            return {"success": False, "message": "Invalid stream format"}
+        streamed = stream_rows(
+            server_rows(request, iter_all_leaves, aiter_all_leaves), stream, "leaves"
+        )
+        return set_validators(streamed, validators)
+    try:
+        leaves, next_cursor = await aget_all_leaves(limit, cursor)
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}
+    return {"success": True, "leaves": leaves, "next": next_cursor}
+
+
+# Api for HR to get all leaves of an employee (paginated with limit / cursor)
+@api.get("/employees/{username}/leaves", auth=async_django_auth)
+async def get_employee_leaves_handler(
+    request,
+    response: HttpResponse,
+    username: str,
+    limit: int = None,
+    cursor: str = None,
+):
+    if request.auth.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    validators = collection_validators(request, "leaves", "employees")
+    unchanged = not_modified(request, validators)
+    if unchanged:
+        return unchanged
+    set_validators(response, validators)
+    try:
+        result = await aget_user_leaves(username, "EMPLOYEE", limit, cursor)
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}
+    if result is None:
         return {"success": False, "message": "Employee not found"}
-    return {"success": True, "leaves": leaves}
+    leaves, next_cursor = result
+    return {"success": True, "leaves": leaves, "next": next_cursor}
 
 
 # Api for HR to create leave
@@ -331,6 +614,110 @@ def create_leave_handler(request, payload: LeaveCreateSchema):
     )
     
     if not leave:
-        return {"success": False, "message": "Unable to create leave. Employee not found."}
+        return {
+            "success": False,
+            "message": "Unable to create leave. Employee not found, invalid dates or overlapping leave.",
+        }
     
     return {"success": True, "message": "Leave created successfully"}
+
+
+# Api for HR to create many leaves at once from a JSON array
+@api.post("/leaves/import", auth=django_auth)
+def import_leaves_handler(request, payload: List[dict] = Body(...)):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    result = bulk_create_leaves(payload)
+    if result is None:
+        return {
+            "success": False,
+            "message": "Unable to import leaves, another leave was created meanwhile. Please retry.",
+        }
+    return {
+        "success": True,
+        "message": f"{result['created']} leaves created",
+        "results": result["results"],
+    }
+
+
+# Api for HR to create many leaves at once from a CSV upload
+@api.post("/leaves/import/csv", auth=django_auth)
+def import_leaves_csv_handler(request, file: UploadedFile = File(...)):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    try:
+        rows = read_csv_rows(file)
+    except (UnicodeDecodeError, ValueError):
+        return {"success": False, "message": "Unable to read CSV file"}
+    result = bulk_create_leaves(rows)
+    if result is None:
+        return {
+            "success": False,
+            "message": "Unable to import leaves, another leave was created meanwhile. Please retry.",
+        }
+    return {
+        "success": True,
+        "message": f"{result['created']} leaves created",
+        "results": result["results"],
+    }
+
+
+# Api for HR to get leave balances of an employee or a whole department
+@api.get("/leave-balances", auth=django_auth)
+def get_leave_balances_handler(
+    request, year: int = None, username: str = None, department: str = None
+):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    if not username and not department:
+        return {"success": False, "message": "Provide a username or a department"}
+    year = year or date.today().year
+    if not MINYEAR <= year <= MAXYEAR:
+        return {"success": False, "message": f"year must be between {MINYEAR} and {MAXYEAR}"}
+
+    balances = get_leave_balances(year, username=username, department=department)
+    if username and not balances:
+        return {"success": False, "message": "Employee not found"}
+    return {"success": True, "balances": balances}
+
+
+# Api for HR to get how many employees of a department or a team are on leave each day
+@api.get("/absences/heatmap", auth=django_auth)
+def get_absence_heatmap_handler(
+    request, start: date, end: date, department: str = None, manager: str = None
+):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    if bool(department) == bool(manager):
+        return {"success": False, "message": "Provide either a department or a manager"}
+    if end < start:
+        return {"success": False, "message": "end must not be before start"}
+    if (end - start).days + 1 > MAX_HEATMAP_DAYS:
+        return {"success": False, "message": f"The range must not exceed {MAX_HEATMAP_DAYS} days"}
+    if manager and not ProjectManager.objects.filter(username__username=manager).exists():
+        return {"success": False, "message": "Project manager not found"}
+
+    days = get_absence_heatmap(start, end, department=department, manager_username=manager)
+    return {"success": True, "days": days}
+
+
+# Api for HR to get headcount, payroll, managers and leave days per department
+@api.get("/analytics/departments", auth=django_auth)
+def get_department_analytics_handler(request, year: int = None):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    year = year or date.today().year
+    if not MINYEAR <= year <= MAXYEAR:
+        return {"success": False, "message": f"year must be between {MINYEAR} and {MAXYEAR}"}
+    return {"success": True, "year": year, "departments": get_department_analytics(year)}
+
+
+
+# Api for HR to get the birthdays and work anniversaries of the coming days
+@api.get("/celebrations", auth=django_auth)
+def get_upcoming_celebrations_handler(request, days: int = 14):
+    if request.user.role != "HR":
+        return {"success": False, "message": "Unauthorized"}
+    if not 1 <= days <= MAX_CELEBRATION_DAYS:
+        return {"success": False, "message": f"days must be between 1 and {MAX_CELEBRATION_DAYS}"}
+    return {"success": True, "days": days, "celebrations": get_upcoming_celebrations(days)}
@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "main"
+
+    def ready(self):
+        # Register the cache invalidation signal handlers
+        from . import signals  # noqa: F401
+
+        # Let query_log see the SQL of every database connection
+        from django.db.backends.signals import connection_created
+        from .query_log import install_on_open_connections, install_query_recorder
+        connection_created.connect(install_query_recorder, dispatch_uid="main_query_recorder")
+        install_on_open_connections()
+
+        # Count database connects for /api/metrics
+        from .metrics import connection_stats
+        connection_created.connect(connection_stats.connection_created, dispatch_uid="main_connection_stats")
@@ -0,0 +1,538 @@
+import csv
+import io
+import re
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from pydantic import ValidationError
+
+from .business_days import working_days_batch
+from .cache import bump_collection_version
+from .hierarchy import invalidate_teams
+from .intervals import IntervalSet
+from .ledger import add_leave_deltas, apply_leave_deltas, new_deltas
+from .models import User, Employee, ProjectManager, Holiday, Leave, LeaveBalance
+from .signals import muting_row_signals
+from .schemas import EmployeeCreateSchema, HolidayCreateSchema, LeaveCreateSchema
+from .usernames import allocate_usernames, employee_username_prefix
+from .utils import MAX_LEAVE_DAYS, recalculate_leave_days
+
+# Rows sent to the database per INSERT / IN (...) statement
+BULK_BATCH_SIZE = 1000
+
+_ICS_ESCAPE = re.compile(r"\\([\\;,nN])")
+
+
+# --------------------- Helpers shared by bulk imports --------------------- #
+
+def read_csv_rows(uploaded_file):
+    """
+    Utility to read an uploaded CSV file into a list of dicts keyed by the
+    header row. Empty cells are dropped so optional fields fall back to their
+    schema defaults.
+    """
+    text = io.TextIOWrapper(uploaded_file, encoding="utf-8-sig")
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        for row in csv.DictReader(text)
+    ]
+
+
+def _unescape_ics_text(value):
+    # TEXT values escape backslashes, commas, semicolons and newlines
+    return _ICS_ESCAPE.sub(lambda match: " " if match.group(1) in "nN" else match.group(1), value)
+
+
+def read_ics_rows(uploaded_file):
+    """
+    Utility to read the events of an uploaded iCalendar (.ics) file into
+    holiday rows: {"name": SUMMARY, "date": "YYYY-MM-DD"}, one per day of
+    all-day events spanning several days (DTEND is exclusive). Events
+    without a readable DTSTART are returned with the raw value so the import
+    reports them.
+    """
+    # Long lines are folded: a line starting with a space or tab continues the previous one
+    lines = []
+    for line in io.TextIOWrapper(uploaded_file, encoding="utf-8-sig"):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+
+    rows = []
+    event = None
+    for line in lines:
+        name, _, value = line.partition(":")
+        name, _, params = name.partition(";")
+        name = name.upper()
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event = {}
+        elif name == "END" and value.upper() == "VEVENT" and event is not None:
+            rows.extend(_ics_event_rows(event))
+            event = None
+        elif event is not None and name in ("SUMMARY", "DTSTART", "DTEND"):
+            event[name] = _unescape_ics_text(value.strip()) if name == "SUMMARY" else value.strip()
+    return rows
+
+
+def _ics_event_rows(event):
+    name = event.get("SUMMARY", "")
+    try:
+        # DATE values are YYYYMMDD, DATE-TIME values YYYYMMDDTHHMMSS[Z]
+        start = datetime.strptime(event.get("DTSTART", "")[:8], "%Y%m%d").date()
+    except ValueError:
+        return [{"name": name, "date": event.get("DTSTART", "")}]
+    try:
+        end = datetime.strptime(event.get("DTEND", "")[:8], "%Y%m%d").date()
+    except ValueError:
+        end = start + timedelta(days=1)
+    days = max((end - start).days, 1)
+    return [{"name": name, "date": str(start + timedelta(days=offset))} for offset in range(days)]
+
+
+def format_validation_error(error):
+    """Utility to flatten a pydantic ValidationError into readable messages."""
+    return [
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    ]
+
+
+def length_errors(model, values):
+    """
+    Utility to check values against the max_length of the model's columns.
+    PostgreSQL rejects a longer value (failing the whole bulk transaction),
+    SQLite silently stores it, so imports check it row by row up front.
+    """
+    errors = []
+    for name, value in values.items():
+        max_length = model._meta.get_field(name).max_length
+        if value is not None and max_length and len(value) > max_length:
+            errors.append(f"{name}: must be at most {max_length} characters")
+    return errors
+
+
+def parse_date(value, field):
+    """Utility to parse an ISO date, raising ValueError naming the field."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError(f"{field}: invalid date '{value}', expected YYYY-MM-DD")
+
+
+def chunked(items, size=BULK_BATCH_SIZE):
+    """Utility to split a list into consecutive slices of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def existing_values(queryset, field, values):
+    """
+    Utility to find which of `values` already exist in `field`, using one
+    IN (...) query per batch instead of one lookup per value.
+    """
+    found = set()
+    for batch in chunked(list(values)):
+        found.update(queryset.filter(**{f"{field}__in": batch}).values_list(field, flat=True))
+    return found
+
+
+# --------------------- Bulk employee import --------------------- #
+
+def bulk_create_employees(rows):
+    """
+    Utility to create many Employee users at once.
+
+    Every row is validated against EmployeeCreateSchema, emails are checked
+    for duplicates (inside the batch and against the database) and reporting
+    managers are resolved with a single IN query. Valid rows are then written
+    with bulk_create inside one transaction.
+
+    Returns:
+        dict: {"usernames": [...created usernames...],
+               "errors": [{"row": <1-based row number>, "errors": [...]}]}
+        or None if a concurrent write made the transaction fail.
+    """
+    errors = []
+    valid = []
+
+    # Validate every row up front
+    for index, row in enumerate(rows, start=1):
+        try:
+            data = EmployeeCreateSchema(**row)
+        except ValidationError as e:
+            errors.append({"row": index, "errors": format_validation_error(e)})
+            continue
+        except TypeError:
+            errors.append({"row": index, "errors": ["row must be an object"]})
+            continue
+        try:
+            birthday = parse_date(data.birthday, "birthday")
+            date_of_joining = parse_date(data.date_of_joining, "date_of_joining")
+        except ValueError as e:
+            errors.append({"row": index, "errors": [str(e)]})
+            continue
+        row_errors = length_errors(Employee, {
+            "first_name": data.first_name,
+            "last_name": data.last_name,
+            "email": data.email,
+            "phone_number": data.phone_number,
+            "department": data.department,
+        })
+        try:
+            validate_email(data.email)
+        except DjangoValidationError:
+            row_errors.append(f"email: '{data.email}' is not a valid email address")
+        if row_errors:
+            errors.append({"row": index, "errors": row_errors})
+            continue
+        valid.append((index, data, birthday, date_of_joining))
+
+    # Duplicate emails, both within the upload and against existing employees
+    taken_emails = existing_values(
+        Employee.objects.all(), "email", {data.email for _, data, _, _ in valid}
+    )
+
+    # Reporting managers referenced by the upload, resolved in batched IN queries
+    manager_usernames = {data.reporting_manager for _, data, _, _ in valid if data.reporting_manager}
+    managers = {}
+    for batch in chunked(list(manager_usernames)):
+        for pm in ProjectManager.objects.select_related("username").filter(username__username__in=batch):
+            managers[pm.username.username] = pm
+
+    accepted = []
+    for index, data, birthday, date_of_joining in valid:
+        if data.email in taken_emails:
+            errors.append({"row": index, "errors": [f"email: '{data.email}' already exists"]})
+            continue
+        if data.reporting_manager and data.reporting_manager not in managers:
+            errors.append({
+                "row": index,
+                "errors": [f"reporting_manager: '{data.reporting_manager}' not found"],
+            })
+            continue
+        taken_emails.add(data.email)
+        accepted.append((data, birthday, date_of_joining))
+
+    # Reserve a unique username for every accepted row up front
+    usernames = allocate_usernames(
+        [employee_username_prefix(data.first_name) for data, _, _ in accepted]
+    )
+
+    users = []
+    for username, (data, _, _) in zip(usernames, accepted):
+        user = User(
+            username=username,
+            first_name=data.first_name,
+            last_name=data.last_name,
+            email=data.email,
+            role="EMPLOYEE",
+        )
+        user.set_unusable_password()
+        users.append(user)
+
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=BULK_BATCH_SIZE)
+            Employee.objects.bulk_create(
+                [
+                    Employee(
+                        username=user,
+                        first_name=data.first_name,
+                        last_name=data.last_name,
+                        email=data.email,
+                        phone_number=data.phone_number,
+                        department=data.department,
+                        birthday=birthday,
+                        date_of_joining=date_of_joining,
+                        reporting_manager=managers.get(data.reporting_manager),
+                    )
+                    for user, (data, birthday, date_of_joining) in zip(users, accepted)
+                ],
+                batch_size=BULK_BATCH_SIZE,
+            )
+    except IntegrityError:
+        # An email of the upload was taken by an employee created meanwhile
+        return None
+    # bulk_create does not send post_save, invalidate the cached collections here
+    if users:
+        bump_collection_version("employees")
+        invalidate_teams(manager_ids=[pm.id for pm in managers.values()])
+
+    return {
+        "usernames": [user.username for user in users],
+        "errors": sorted(errors, key=lambda err: err["row"]),
+    }
+
+
+# --------------------- Bulk leave import --------------------- #
+
+def bulk_create_leaves(rows):
+    """
+    Utility to create many leaves at once, e.g. when importing the records of
+    a previous system.
+
+    Every row is validated against LeaveCreateSchema, employees are resolved
+    with batched IN queries and each leave is checked against the employee's
+    existing leaves and the earlier rows of the same upload with an
+    IntervalSet per employee. Day counts come from the business-day calendar
+    in one pass, then the leaves are written with bulk_create and the leave
+    ledger is updated, all inside one transaction.
+
+    Returns:
+        dict: {"created": <number of leaves created>,
+               "results": [{"row": <1-based row number>, "success": True, "number_of_days": n}
+                           or {"row": ..., "success": False, "errors": [...]}]}
+        or None if a concurrent write made the transaction fail.
+    """
+    results = {}
+    valid = []
+
+    # Validate every row up front
+    for index, row in enumerate(rows, start=1):
+        try:
+            data = LeaveCreateSchema(**row)
+        except ValidationError as e:
+            results[index] = {"row": index, "success": False, "errors": format_validation_error(e)}
+            continue
+        except TypeError:
+            results[index] = {"row": index, "success": False, "errors": ["row must be an object"]}
+            continue
+        try:
+            start_date = parse_date(data.start_date, "start_date")
+            end_date = parse_date(data.end_date, "end_date")
+        except ValueError as e:
+            results[index] = {"row": index, "success": False, "errors": [str(e)]}
+            continue
+        if end_date < start_date:
+            results[index] = {"row": index, "success": False,
+                              "errors": ["end_date: must not be before start_date"]}
+            continue
+        if (end_date - start_date).days >= MAX_LEAVE_DAYS:
+            results[index] = {"row": index, "success": False,
+                              "errors": [f"end_date: a leave covers at most {MAX_LEAVE_DAYS} days"]}
+            continue
+        valid.append((index, data, start_date, end_date))
+
+    # Employees referenced by the upload, resolved in batched IN queries
+    employee_ids = {}
+    usernames = list({data.employee_username for _, data, _, _ in valid})
+    for batch in chunked(usernames):
+        employee_ids.update(
+            Employee.objects.filter(username__username__in=batch).values_list("username__username", "id")
+        )
+
+    accepted = []
+    for index, data, start_date, end_date in valid:
+        if data.employee_username not in employee_ids:
+            results[index] = {"row": index, "success": False,
+                              "errors": [f"employee_username: '{data.employee_username}' not found"]}
+            continue
+        accepted.append((index, employee_ids[data.employee_username], data, start_date, end_date))
+
+    created = 0
+    try:
+        with transaction.atomic():
+            # Existing leaves of those employees within the uploaded date range
+            existing_ranges = {}
+            if accepted:
+                first_day = min(start for _, _, _, start, _ in accepted)
+                last_day = max(end for _, _, _, _, end in accepted)
+                for batch in chunked(list({employee_id for _, employee_id, _, _, _ in accepted})):
+                    existing = Leave.objects.filter(
+                        employee_id__in=batch, start_date__lte=last_day, end_date__gte=first_day
+                    ).values_list("employee_id", "start_date", "end_date")
+                    for employee_id, start, end in existing:
+                        existing_ranges.setdefault(employee_id, []).append((start, end))
+            intervals = {employee_id: IntervalSet(ranges) for employee_id, ranges in existing_ranges.items()}
+
+            leaves = []
+            for index, employee_id, data, start_date, end_date in accepted:
+                if not intervals.setdefault(employee_id, IntervalSet()).add(start_date, end_date):
+                    results[index] = {"row": index, "success": False,
+                                      "errors": ["overlaps another leave of the employee"]}
+                    continue
+                leaves.append((index, Leave(
+                    employee_id=employee_id,
+                    start_date=start_date,
+                    end_date=end_date,
+                    approvable=data.approvable,
+                )))
+
+            counts = working_days_batch((leave.start_date, leave.end_date) for _, leave in leaves)
+            deltas = new_deltas()
+            for (index, leave), days in zip(leaves, counts):
+                leave.number_of_days = days
+                add_leave_deltas(deltas, leave.employee_id, leave.start_date, leave.end_date,
+                                 days, leave.approvable)
+                results[index] = {"row": index, "success": True, "number_of_days": days}
+
+            Leave.objects.bulk_create([leave for _, leave in leaves], batch_size=BULK_BATCH_SIZE)
+            # bulk_create does not send the signals that maintain the ledger
+            apply_leave_deltas(deltas)
+            created = len(leaves)
+    except IntegrityError:
+        # On PostgreSQL the exclusion constraint rejects leaves created concurrently
+        return None
+
+    if created:
+        bump_collection_version("leaves")
+    return {"created": created, "results": [results[index] for index in sorted(results)]}
+
+
+# --------------------- Bulk holiday import --------------------- #
+
+def bulk_import_holidays(rows):
+    """
+    Utility to add many holidays at once, e.g. the calendars of several
+    countries and years.
+
+    Every row is validated against HolidayCreateSchema. Holidays already
+    stored (same date and name) or repeated in the upload are skipped: they
+    are written with one bulk_create per batch with ignore_conflicts on the
+    (date, name) unique constraint, so a calendar can be imported again.
+    The day counts of the leaves overlapping the imported dates are then
+    recomputed.
+
+    Returns:
+        dict: {"created": <number of holidays added>,
+               "existing": <number of rows already present>,
+               "leaves_updated": <number of leaves whose day count changed>,
+               "errors": [{"row": <1-based row number>, "errors": [...]}]}
+    """
+    errors = []
+    holidays = {}
+
+    for index, row in enumerate(rows, start=1):
+        try:
+            data = HolidayCreateSchema(**row)
+        except ValidationError as e:
+            errors.append({"row": index, "errors": format_validation_error(e)})
+            continue
+        except TypeError:
+            errors.append({"row": index, "errors": ["row must be an object"]})
+            continue
+        name = data.name.strip()
+        row_errors = length_errors(Holiday, {"name": name}) if name else ["name: must not be empty"]
+        if row_errors:
+            errors.append({"row": index, "errors": row_errors})
+            continue
+        try:
+            day = parse_date(data.date, "date")
+        except ValueError as e:
+            errors.append({"row": index, "errors": [str(e)]})
+            continue
+        holidays.setdefault((day, name), index)
+
+    # Only the holidays not stored yet are counted as created; a concurrent
+    # import of the same rows is absorbed by ignore_conflicts
+    existing = set()
+    for batch in chunked(sorted({day for day, _ in holidays})):
+        existing.update(Holiday.objects.filter(date__in=batch).values_list("date", "name"))
+    new = [(day, name) for day, name in holidays if (day, name) not in existing]
+
+    Holiday.objects.bulk_create(
+        [Holiday(date=day, name=name) for day, name in new],
+        batch_size=BULK_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+    leaves_updated = 0
+    if new:
+        # bulk_create does not send post_save, invalidate the holiday calendar here
+        bump_collection_version("holidays")
+        new_days = {day for day, _ in new} - {day for day, _ in existing}
+        if new_days:
+            leaves_updated = recalculate_leave_days(
+                Leave.objects.filter(start_date__lte=max(new_days), end_date__gte=min(new_days))
+            )
+
+    return {
+        "created": len(new),
+        "existing": len(rows) - len(errors) - len(new),
+        "leaves_updated": leaves_updated,
+        "errors": errors,
+    }
+
+
+# --------------------- Bulk offboarding --------------------- #
+
+def bulk_offboard(usernames=None, department=None):
+    """
+    Utility to remove many employees and project managers at once, given by
+    username or by department, with set-based queries in one transaction.
+
+    Leaves and ledger rows of the employees are deleted, employees reporting
+    to a removed project manager (and staying) lose their reporting manager,
+    then the profiles and their users are deleted. The per-row cache and
+    ledger receivers are muted, the caches are invalidated once at the end.
+
+    Returns:
+        dict: {"employees": [...removed usernames...], "project_managers": [...],
+               "leaves": <leaves deleted>, "unassigned_employees": <employees left without manager>,
+               "not_found": [...usernames that are not an employee or project manager...]}
+    """
+    employees = Employee.objects.all()
+    managers = ProjectManager.objects.all()
+    if usernames is not None:
+        employees = employees.filter(username__username__in=usernames)
+        managers = managers.filter(username__username__in=usernames)
+    if department is not None:
+        employees = employees.filter(department=department)
+        managers = managers.filter(department=department)
+
+    with transaction.atomic(), muting_row_signals():
+        # (profile id, user id, username, reporting manager id) of everyone leaving
+        leaving_employees = list(employees.select_for_update().values_list(
+            "id", "username_id", "username__username", "reporting_manager_id"
+        ))
+        leaving_managers = list(managers.select_for_update().values_list(
+            "id", "username_id", "username__username"
+        ))
+        employee_ids = [row[0] for row in leaving_employees]
+        manager_ids = [row[0] for row in leaving_managers]
+
+        leaves = 0
+        for batch in chunked(employee_ids):
+            LeaveBalance.objects.filter(employee_id__in=batch).delete()
+            leaves += Leave.objects.filter(employee_id__in=batch).delete()[0]
+
+        for batch in chunked(employee_ids):
+            Employee.objects.filter(id__in=batch).delete()
+
+        # The SET_NULL of reporting_manager, as one UPDATE instead of row by row
+        unassigned = 0
+        for batch in chunked(manager_ids):
+            unassigned += Employee.objects.filter(reporting_manager_id__in=batch).update(
+                reporting_manager=None
+            )
+        for batch in chunked(manager_ids):
+            ProjectManager.objects.filter(id__in=batch).delete()
+        user_ids = [row[1] for row in leaving_employees] + [row[1] for row in leaving_managers]
+        for batch in chunked(user_ids):
+            User.objects.filter(id__in=batch).delete()
+
+    if leaving_employees:
+        bump_collection_version("employees")
+    if leaves:
+        bump_collection_version("leaves")
+    if leaving_managers:
+        bump_collection_version("project_managers")
+    if leaving_employees or leaving_managers:
+        invalidate_teams(
+            manager_ids={row[3] for row in leaving_employees} - set(manager_ids),
+            manager_usernames=[row[2] for row in leaving_managers],
+        )
+
+    removed = {row[2] for row in leaving_employees} | {row[2] for row in leaving_managers}
+    return {
+        "employees": sorted(row[2] for row in leaving_employees),
+        "project_managers": sorted(row[2] for row in leaving_managers),
+        "leaves": leaves,
+        "unassigned_employees": unassigned,
+        "not_found": sorted(set(usernames or ()) - removed),
+    }
+
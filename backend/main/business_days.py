@@ -0,0 +1,108 @@
+from array import array
+from datetime import date, timedelta
+from itertools import accumulate
+
+from .cache import get_collection_version
+from .models import Holiday
+from .routers import reading_from_primary
+
+# Saturday and Sunday (date.weekday() numbering)
+WEEKEND_DAYS = (5, 6)
+
+
+class YearCalendar:
+    """
+    Working days of one calendar year.
+
+    `working` holds one flag per day of the year (1 = working day) and
+    `prefix[i]` the number of working days among the first i days, so the
+    working days between any two dates of the year are a single subtraction.
+    """
+
+    def __init__(self, year, holidays):
+        self.year = year
+        self.first_day = date(year, 1, 1)
+        length = (date(year + 1, 1, 1) - self.first_day).days
+        self.working = bytearray(length)
+        for offset in range(length):
+            day = self.first_day + timedelta(days=offset)
+            self.working[offset] = day.weekday() not in WEEKEND_DAYS and day not in holidays
+        self.prefix = array("H", accumulate(self.working, initial=0))
+
+    def is_working_day(self, day):
+        return bool(self.working[(day - self.first_day).days])
+
+    def count(self, start, end):
+        """Working days in [start, end], both dates inside this year."""
+        return self.prefix[(end - self.first_day).days + 1] - self.prefix[(start - self.first_day).days]
+
+
+# year -> (holiday collection version, YearCalendar), rebuilt when holidays change
+_calendars = {}
+
+
+def _load_calendars(years, version):
+    missing = [
+        year for year in years
+        if year not in _calendars or _calendars[year][0] != version
+    ]
+    if missing:
+        holidays = {year: set() for year in missing}
+        # Cached under `version`, so read from the primary (see reading_from_primary)
+        with reading_from_primary():
+            days = list(Holiday.objects.filter(
+                date__gte=date(min(missing), 1, 1), date__lt=date(max(missing) + 1, 1, 1)
+            ).values_list("date", flat=True))
+        for day in days:
+            if day.year in holidays:
+                holidays[day.year].add(day)
+        for year in missing:
+            _calendars[year] = (version, YearCalendar(year, holidays[year]))
+    return {year: _calendars[year][1] for year in years}
+
+
+def get_year_calendar(year):
+    """Utility to get the (cached) working day calendar of a year."""
+    return _load_calendars([year], get_collection_version("holidays"))[year]
+
+
+def _count(calendars, start, end):
+    if end < start:
+        return 0
+    if start.year == end.year:
+        return calendars[start.year].count(start, end)
+    total = calendars[start.year].count(start, date(start.year, 12, 31))
+    for year in range(start.year + 1, end.year):
+        total += calendars[year].prefix[-1]
+    return total + calendars[end.year].count(date(end.year, 1, 1), end)
+
+
+def working_days_between(start, end):
+    """
+    Utility to count the working days (not a weekend, not a Holiday) from
+    start to end, both included. Returns 0 when end is before start.
+    """
+    if end < start:
+        return 0
+    years = range(start.year, end.year + 1)
+    return _count(_load_calendars(years, get_collection_version("holidays")), start, end)
+
+
+def working_days_batch(ranges):
+    """
+    Utility to count working days for many (start, end) pairs at once.
+
+    The calendars of every year involved are loaded up front (one Holiday
+    query at most), after which each pair costs O(1) per year it spans.
+
+    Returns:
+        list: working day counts, in the order of `ranges`
+    """
+    ranges = list(ranges)
+    if not ranges:
+        return []
+    years = set()
+    for start, end in ranges:
+        years.update(range(start.year, end.year + 1))
+    calendars = _load_calendars(sorted(years), get_collection_version("holidays"))
+    return [_count(calendars, start, end) for start, end in ranges]
@@ -0,0 +1,132 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .routers import reading_from_primary
+
+# Cache backends private to each process: a version bumped by one worker is
+# not seen by the others
+PER_PROCESS_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Cached payloads are only ever replaced by a version bump, this is a safety net
+DEFAULT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(name):
+    return f"hr:version:{name}"
+
+
+def _new_version():
+    # (token, time of the change) - the timestamp backs Last-Modified headers
+    return (uuid.uuid4().hex[:12], time.time())
+
+
+def cache_is_shared():
+    """Utility to tell whether every worker process sees the same cache (e.g. Redis)."""
+    return settings.CACHES["default"]["BACKEND"] not in PER_PROCESS_CACHE_BACKENDS
+
+
+def get_collection_state(name):
+    """
+    Utility to read the (version token, last modified timestamp) pair of a
+    cached collection.
+
+    A missing entry (cold or evicted cache) is replaced by a fresh random token
+    stamped with the current time, so versions never go back to a value that
+    was handed out before.
+    """
+    key = _version_key(name)
+    state = cache.get(key)
+    if state is None:
+        cache.add(key, _new_version(), None)
+        state = cache.get(key)
+    return state
+
+
+def has_collection_state(name):
+    """Utility to tell whether collection `name` has a version yet, without creating one."""
+    return cache.get(_version_key(name)) is not None
+
+
+def get_collection_version(name):
+    """Utility to read the current version token of a cached collection."""
+    return get_collection_state(name)[0]
+
+
+def get_collections_state(*names):
+    """Utility to read the state of several collections with one cache round trip."""
+    keys = {name: _version_key(name) for name in names}
+    found = cache.get_many(keys.values())
+    return {
+        name: found[key] if key in found else get_collection_state(name)
+        for name, key in keys.items()
+    }
+
+
+def bump_collection_version(*names):
+    """
+    Utility to invalidate everything cached for the given collections by
+    moving them to a new version. Old entries simply stop being read and
+    expire on their own.
+    """
+    cache.set_many({_version_key(name): _new_version() for name in names}, None)
+
+
+def cached_collection(name, suffix, compute, timeout=DEFAULT_CACHE_TIMEOUT):
+    """
+    Utility to serve `compute()` from the cache under the current version of
+    collection `name`. `suffix` distinguishes slices of the same collection.
+
+    `compute()` reads from the primary: rows from a lagging replica would be
+    cached under a version that says they are up to date.
+    """
+    key = f"hr:{name}:{get_collection_version(name)}:{suffix}"
+    value = cache.get(key)
+    if value is None:
+        with reading_from_primary():
+            value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def cached_collection_many(name, suffixes, compute_missing, timeout=DEFAULT_CACHE_TIMEOUT):
+    """
+    Utility to serve several slices of collection `name` with one cache round
+    trip. `compute_missing(suffixes)` gets the suffixes not in the cache and
+    returns {suffix: value} for them, so they can be computed together. Like
+    in cached_collection, it reads from the primary.
+
+    Returns:
+        dict: {suffix: value} for every suffix
+    """
+    version = get_collection_version(name)
+    keys = {suffix: f"hr:{name}:{version}:{suffix}" for suffix in suffixes}
+    found = cache.get_many(keys.values())
+    values = {suffix: found[key] for suffix, key in keys.items() if key in found}
+    missing = [suffix for suffix in keys if suffix not in values]
+    if missing:
+        with reading_from_primary():
+            computed = compute_missing(missing)
+        cache.set_many({keys[suffix]: computed[suffix] for suffix in missing}, timeout)
+        values.update(computed)
+    return values
+
+
+async def acached_collection(name, suffix, acompute, timeout=DEFAULT_CACHE_TIMEOUT):
+    """
+    Async version of cached_collection, for a coroutine function `acompute`.
+    The cache itself is read synchronously: the local memory backend never
+    blocks, and Django's Redis backend has no native async client either.
+    """
+    key = f"hr:{name}:{get_collection_version(name)}:{suffix}"
+    value = cache.get(key)
+    if value is None:
+        with reading_from_primary():
+            value = await acompute()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,99 @@
+import calendar
+from datetime import date, timedelta
+
+from django.db.models import CharField, F, Q, Value
+
+from .models import HR, Employee, ProjectManager
+
+# Longest window GET /celebrations answers, one year
+MAX_CELEBRATION_DAYS = 365
+
+# (model, role, date field, MMDD column, kind) of every date celebrated
+CELEBRATED_DATES = [
+    (Employee, "EMPLOYEE", "birthday", "birthday_mmdd", "birthday"),
+    (Employee, "EMPLOYEE", "date_of_joining", "joining_mmdd", "work_anniversary"),
+    (ProjectManager, "PROJECT_MANAGER", "birthday", "birthday_mmdd", "birthday"),
+    (HR, "HR", "birthday", "birthday_mmdd", "birthday"),
+]
+
+
+def _month_day(day):
+    return day.month * 100 + day.day
+
+
+def _window_filter(column, start, end):
+    """
+    Filter on an MMDD column matching the dates from `start` to `end`: one
+    range, or two when the window wraps over New Year. February 29th is
+    celebrated on the 28th in common years, so it is matched with the 28th.
+    """
+    first, last = _month_day(start), _month_day(end)
+    if last == 228 and not calendar.isleap(end.year):
+        last = 229
+    if end.year == start.year:
+        return Q(**{f"{column}__range": (first, last)})
+    return Q(**{f"{column}__gte": first}) | Q(**{f"{column}__lte": last})
+
+
+def next_occurrence(day, today):
+    """
+    Utility to get the first anniversary of `day` on or after `today`,
+    February 29th falling on the 28th in common years.
+    """
+    for year in (today.year, today.year + 1):
+        if day.month == 2 and day.day == 29 and not calendar.isleap(year):
+            occurrence = date(year, 2, 28)
+        else:
+            occurrence = day.replace(year=year)
+        if occurrence >= today:
+            return occurrence
+
+
+def get_upcoming_celebrations(days, today=None):
+    """
+    Utility to list the birthdays of employees, project managers and HRs and
+    the work anniversaries of employees from `today` to `days` days later,
+    ordered by date.
+
+    Every profile table stores the month and day of those dates as an
+    indexed MMDD column (see models.month_day), so the window is a range
+    scan per table, all of them sent as one UNION ALL query.
+    """
+    today = today or date.today()
+    end = today + timedelta(days=days)
+
+    parts = [
+        model.objects.filter(_window_filter(column, today, end))
+        .order_by()
+        .values(
+            "first_name",
+            "last_name",
+            username_value=F("username__username"),
+            date_value=F(field),
+            role=Value(role, output_field=CharField()),
+            kind=Value(kind, output_field=CharField()),
+        )
+        for model, role, field, column, kind in CELEBRATED_DATES
+    ]
+    rows = parts[0].union(*parts[1:], all=True)
+
+    celebrations = []
+    for row in rows:
+        occurrence = next_occurrence(row["date_value"], today)
+        years = occurrence.year - row["date_value"].year
+        # No anniversary before the first year of work (joining dates may be
+        # set ahead of time), nor birthdays of dates still in the future
+        if occurrence > end or years < 0 or (row["kind"] == "work_anniversary" and years == 0):
+            continue
+        celebrations.append({
+            "type": row["kind"],
+            "date": occurrence,
+            "days_until": (occurrence - today).days,
+            "years": years,
+            "role": row["role"],
+            "username": row["username_value"],
+            "first_name": row["first_name"],
+            "last_name": row["last_name"],
+        })
+    celebrations.sort(key=lambda item: (item["date"], item["last_name"], item["first_name"], item["username"]))
+    return celebrations
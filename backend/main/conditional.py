@@ -0,0 +1,53 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import cache_is_shared, get_collections_state
+
+
+def collection_validators(request, *names):
+    """
+    Utility to compute the (ETag, Last-Modified) pair of a read endpoint from
+    the version tokens of the collections it returns. Only the cache is read,
+    so this costs no database query. The full path is part of the ETag, so
+    every page, year or stream format gets its own tag.
+
+    Returns None (no validators, every request gets the full response) with
+    a per-process cache: a write handled by one worker does not move the
+    versions another worker reads, which would keep answering 304 for
+    changed data.
+    """
+    if not cache_is_shared():
+        return None
+    states = get_collections_state(*names)
+    digest = hashlib.md5(request.get_full_path().encode())
+    for name in names:
+        digest.update(f"|{name}:{states[name][0]}".encode())
+    etag = f'W/"{digest.hexdigest()}"'
+    last_modified = int(max(state[1] for state in states.values()))
+    return etag, last_modified
+
+
+def not_modified(request, validators):
+    """
+    Utility to answer a conditional GET. Returns a 304 Not Modified response
+    when the client's If-None-Match / If-Modified-Since still match, or None
+    when the endpoint has to build the full response.
+    """
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, validators):
+    """Utility to add the ETag and Last-Modified headers to a response."""
+    if validators is None:
+        return response
+    etag, last_modified = validators
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # Let browsers keep the payload but revalidate it on every poll
+    response["Cache-Control"] = "private, no-cache"
+    return response
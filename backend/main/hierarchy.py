@@ -0,0 +1,86 @@
+from django.db.models import Q
+
+from .cache import bump_collection_version, cached_collection, has_collection_state
+from .models import Employee, ProjectManager, User
+from .utils import employee_to_dict, project_manager_to_dict
+
+
+def _team_collection(manager_username):
+    return f"team:{manager_username}"
+
+
+def get_team(manager_username):
+    """
+    Utility to get a project manager and the employees reporting to them.
+    The result is cached per manager until their team changes; unknown
+    usernames are not cached.
+
+    Returns:
+        dict: {"manager": {...}, "team": [...]} or None if the manager does not exist
+    """
+    def load():
+        try:
+            manager = ProjectManager.objects.select_related("username").get(
+                username__username=manager_username
+            )
+        except ProjectManager.DoesNotExist:
+            return {"manager": None, "team": []}
+        team = Employee.objects.select_related("username").filter(
+            reporting_manager=manager
+        ).order_by("last_name", "id")
+        return {
+            "manager": project_manager_to_dict(manager),
+            "team": [employee_to_dict(emp) for emp in team],
+        }
+
+    name = _team_collection(manager_username)
+    # Nothing is cached for unknown usernames, or made-up ones would each add
+    # a version and a payload to the cache
+    if not has_collection_state(name) and not ProjectManager.objects.filter(
+        username__username=manager_username
+    ).exists():
+        return None
+    result = cached_collection(name, "all", load)
+    return result if result["manager"] else None
+
+
+def get_org_chart():
+    """
+    Utility to build the whole reporting hierarchy: every project manager with
+    their team, plus the employees without a reporting manager. Built from two
+    queries (managers, employees) and cached until any of them changes.
+    """
+    def load():
+        managers = ProjectManager.objects.select_related("username").order_by("last_name", "id")
+        chart = {pm.id: {**project_manager_to_dict(pm), "team": []} for pm in managers}
+        unassigned = []
+        employees = Employee.objects.select_related("username").order_by("last_name", "id")
+        for emp in employees.iterator(chunk_size=2000):
+            if emp.reporting_manager_id in chart:
+                chart[emp.reporting_manager_id]["team"].append(employee_to_dict(emp))
+            else:
+                unassigned.append(employee_to_dict(emp))
+        return {"managers": list(chart.values()), "unassigned": unassigned}
+
+    return cached_collection("org_chart", "all", load)
+
+
+def find_manager_usernames(manager_ids=(), manager_user_ids=()):
+    """Utility to find the usernames of project managers by profile id or by user id."""
+    manager_ids = [pk for pk in manager_ids if pk is not None]
+    manager_user_ids = [pk for pk in manager_user_ids if pk is not None]
+    if not manager_ids and not manager_user_ids:
+        return []
+    return list(User.objects.filter(
+        Q(manager_profile__id__in=manager_ids) | Q(id__in=manager_user_ids)
+    ).values_list("username", flat=True))
+
+
+def invalidate_teams(manager_ids=(), manager_user_ids=(), manager_usernames=()):
+    """
+    Utility to drop the cached teams of the given project managers, by profile
+    id, by user id or by username, together with the cached org chart.
+    """
+    usernames = list(manager_usernames) + find_manager_usernames(manager_ids, manager_user_ids)
+    bump_collection_version("org_chart", *(_team_collection(name) for name in usernames))
+
@@ -0,0 +1,40 @@
+from bisect import bisect_right
+
+
+class IntervalSet:
+    """
+    A set of non-overlapping closed date intervals kept sorted by start date.
+
+    Because the stored intervals never overlap, sorting them by start also
+    sorts them by end, so the only stored interval that can overlap a new
+    [start, end] is the one with the greatest start <= end. Finding it is a
+    binary search, which makes every overlap check O(log n) - the same lookup
+    the (employee, start_date) index gives create_leave in the database.
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in sorted(intervals):
+            self._starts.append(start)
+            self._ends.append(end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def overlaps(self, start, end):
+        """Return True if [start, end] overlaps any interval in the set."""
+        position = bisect_right(self._starts, end)
+        return position > 0 and self._ends[position - 1] >= start
+
+    def add(self, start, end):
+        """
+        Add [start, end] to the set if it does not overlap anything.
+        Returns True if it was added, False if it was rejected.
+        """
+        if self.overlaps(start, end):
+            return False
+        position = bisect_right(self._starts, end)
+        self._starts.insert(position, start)
+        self._ends.insert(position, end)
+        return True
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+
+from .business_days import working_days_batch
+from .models import Employee, Leave, LeaveBalance
+
+
+def as_date(value):
+    """Utility to accept both date objects and ISO date strings on model fields."""
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def leave_days_by_year(start_date, end_date, number_of_days):
+    """
+    Utility to split the days of a leave between the calendar years it spans.
+
+    Every year but the last gets its working day count from the business-day
+    calendar and the last year gets the remainder, so the parts always add up
+    to the stored number_of_days.
+    """
+    if start_date.year == end_date.year:
+        return {start_date.year: number_of_days}
+    ranges = [(max(start_date, date(year, 1, 1)), min(end_date, date(year, 12, 31)))
+              for year in range(start_date.year, end_date.year)]
+    days = {}
+    remaining = number_of_days
+    for (start, _), count in zip(ranges, working_days_batch(ranges)):
+        days[start.year] = min(count, remaining)
+        remaining -= days[start.year]
+    days[end_date.year] = remaining
+    return days
+
+
+def add_leave_deltas(deltas, employee_id, start_date, end_date, number_of_days, approvable, sign=1):
+    """
+    Utility to add the effect of one leave on the ledger to `deltas`, a dict of
+    (employee_id, year) -> [taken, pending]. Use sign=-1 to remove a leave.
+    """
+    column = 0 if approvable else 1
+    for year, days in leave_days_by_year(start_date, end_date, number_of_days).items():
+        deltas[(employee_id, year)][column] += sign * days
+
+
+def new_deltas():
+    """Utility to create an empty deltas dict for add_leave_deltas."""
+    return defaultdict(lambda: [0, 0])
+
+
+def apply_leave_deltas(deltas, create_missing=True, balance_model=LeaveBalance):
+    """
+    Utility to apply (employee_id, year) -> [taken, pending] deltas to the ledger.
+
+    Missing rows are created with the yearly entitlement (unless
+    create_missing is False), then the affected rows are locked, adjusted and
+    written back with one bulk_update, whatever the number of leaves involved.
+    """
+    deltas = {key: value for key, value in deltas.items() if value[0] or value[1]}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        if create_missing:
+            balance_model.objects.bulk_create(
+                [
+                    balance_model(employee_id=employee_id, year=year,
+                                 entitlement=settings.LEAVE_ANNUAL_ENTITLEMENT)
+                    for employee_id, year in deltas
+                ],
+                ignore_conflicts=True,
+            )
+
+        balances = [
+            balance
+            for balance in balance_model.objects.select_for_update().filter(
+                employee_id__in={employee_id for employee_id, _ in deltas},
+                year__in={year for _, year in deltas},
+            )
+            if (balance.employee_id, balance.year) in deltas
+        ]
+        for balance in balances:
+            taken, pending = deltas[(balance.employee_id, balance.year)]
+            balance.taken += taken
+            balance.pending += pending
+        balance_model.objects.bulk_update(balances, ["taken", "pending"], batch_size=1000)
+
+
+def rebuild_leave_balances(employee_ids=None, leave_model=Leave, balance_model=LeaveBalance):
+    """
+    Utility to recompute the ledger from the Leave table, for all employees or
+    only the given ones. Entitlements of existing rows are kept.
+
+    Migrations pass their historical Leave and LeaveBalance models.
+    """
+    leaves = leave_model.objects.all()
+    balances = balance_model.objects.all()
+    if employee_ids is not None:
+        leaves = leaves.filter(employee_id__in=employee_ids)
+        balances = balances.filter(employee_id__in=employee_ids)
+
+    deltas = new_deltas()
+    for employee_id, start_date, end_date, number_of_days, approvable in leaves.values_list(
+        "employee_id", "start_date", "end_date", "number_of_days", "approvable"
+    ).iterator(chunk_size=2000):
+        add_leave_deltas(deltas, employee_id, start_date, end_date, number_of_days, approvable)
+
+    with transaction.atomic():
+        balances.update(taken=0, pending=0)
+        apply_leave_deltas(deltas, balance_model=balance_model)
+
+
+def get_leave_balances(year, username=None, department=None):
+    """
+    Utility to read the leave balances of one employee or of a department for
+    a year, with a single query (employees LEFT JOIN their ledger row).
+    Employees without leaves that year get their full entitlement.
+    """
+    employees = Employee.objects.annotate(
+        balance=FilteredRelation("leave_balances", condition=Q(leave_balances__year=year))
+    )
+    if username is not None:
+        employees = employees.filter(username__username=username)
+    if department is not None:
+        employees = employees.filter(department=department)
+
+    rows = employees.order_by("last_name", "id").values(
+        "username__username", "first_name", "last_name", "department",
+        "balance__entitlement", "balance__taken", "balance__pending",
+    )
+    result = []
+    for row in rows:
+        entitlement = row["balance__entitlement"]
+        if entitlement is None:
+            entitlement = settings.LEAVE_ANNUAL_ENTITLEMENT
+        taken = row["balance__taken"] or 0
+        pending = row["balance__pending"] or 0
+        result.append({
+            "username": row["username__username"],
+            "employee_name": f"{row['first_name']} {row['last_name']}",
+            "department": row["department"],
+            "year": year,
+            "entitlement": entitlement,
+            "taken": taken,
+            "pending": pending,
+            "remaining": entitlement - taken,
+        })
+    return result
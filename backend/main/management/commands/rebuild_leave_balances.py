@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from main.ledger import rebuild_leave_balances
+
+
+class Command(BaseCommand):
+    help = "Recompute the leave balance ledger from the Leave table."
+
+    def handle(self, *args, **options):
+        rebuild_leave_balances()
+        self.stdout.write(self.style.SUCCESS("Leave balances rebuilt"))
@@ -0,0 +1,197 @@
+import threading
+
+from django.db import connections
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RouteStats:
+    """Counters of one (method, route) pair."""
+
+    __slots__ = ("responses", "bucket_counts", "duration_sum", "db_queries", "db_seconds")
+
+    def __init__(self):
+        self.responses = {}  # status code -> count
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)  # last one is +Inf
+        self.duration_sum = 0.0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+
+class MetricsRegistry:
+    """
+    Process-wide request metrics, keyed by (method, route pattern).
+
+    Every worker process keeps its own registry: with several workers, scrape
+    each of them (or run one metrics-enabled worker per host).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, method, route, status, duration, db_queries, db_seconds):
+        bucket = len(LATENCY_BUCKETS)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                bucket = index
+                break
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = RouteStats()
+            stats.responses[status] = stats.responses.get(status, 0) + 1
+            stats.bucket_counts[bucket] += 1
+            stats.duration_sum += duration
+            stats.db_queries += db_queries
+            stats.db_seconds += db_seconds
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+    def render(self):
+        """Render every counter in the Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_requests_total Requests served, by route and status code.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route), stats in routes:
+                for status, count in sorted(stats.responses.items()):
+                    lines.append(
+                        f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}'
+                    )
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency, by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), stats in routes:
+                labels = f'method="{method}",route="{route}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), stats.bucket_counts):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.duration_sum:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+            lines += [
+                "# HELP db_queries_total SQL queries run while serving requests, by route.",
+                "# TYPE db_queries_total counter",
+            ]
+            for (method, route), stats in routes:
+                lines.append(f'db_queries_total{{method="{method}",route="{route}"}} {stats.db_queries}')
+
+            lines += [
+                "# HELP db_query_duration_seconds_total Time spent in SQL queries, by route.",
+                "# TYPE db_query_duration_seconds_total counter",
+            ]
+            for (method, route), stats in routes:
+                lines.append(
+                    f'db_query_duration_seconds_total{{method="{method}",route="{route}"}} {stats.db_seconds:.6f}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class RequestDbStats:
+    """Query recorder (see query_log.recording) summing the SQL of one request."""
+
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def add(self, sql, duration):
+        self.queries += 1
+        self.seconds += duration
+
+
+# (metric, type, psycopg_pool statistic, help, divisor) exposed per pool
+POOL_METRICS = [
+    ("db_pool_size", "gauge", "pool_size", "Connections managed by the pool.", 1),
+    ("db_pool_max_size", "gauge", "pool_max", "Largest size the pool may grow to.", 1),
+    ("db_pool_available", "gauge", "pool_available", "Idle connections in the pool.", 1),
+    ("db_pool_requests_waiting", "gauge", "requests_waiting", "Requests waiting for a connection.", 1),
+    ("db_pool_checkouts_total", "counter", "requests_num", "Connections handed out by the pool.", 1),
+    ("db_pool_wait_seconds_total", "counter", "requests_wait_ms",
+     "Time requests spent waiting for a connection.", 1000),
+    ("db_pool_timeouts_total", "counter", "requests_errors",
+     "Requests that got no connection within the timeout.", 1),
+    ("db_pool_connections_opened_total", "counter", "connections_num",
+     "Connections opened by the pool.", 1),
+    ("db_pool_connect_seconds_total", "counter", "connections_ms",
+     "Time spent opening connections (handshakes).", 1000),
+]
+
+
+class ConnectionStats:
+    """
+    Database connection counters of this process, per database alias, and
+    the statistics of the psycopg connection pools when pooling is enabled
+    (OPTIONS "pool" in DATABASES).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = {}
+
+    def connection_created(self, sender, connection, **kwargs):
+        """
+        connection_created receiver: without a pool every connect is a new
+        connection (handshake included), with one a checkout from the pool.
+        """
+        with self._lock:
+            self.connects[connection.alias] = self.connects.get(connection.alias, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.connects = {}
+
+    def pool_stats(self):
+        """{alias: psycopg_pool statistics} of the pooled databases."""
+        stats = {}
+        for alias in connections:
+            connection = connections[alias]
+            if connection.vendor == "postgresql" and connection.settings_dict["OPTIONS"].get("pool"):
+                stats[alias] = connection.pool.get_stats()
+        return stats
+
+    def render(self):
+        """Render the counters and pool statistics in the Prometheus text format."""
+        with self._lock:
+            connects = sorted(self.connects.items())
+        lines = [
+            "# HELP db_connects_total Database connects: new connections, or checkouts with a pool.",
+            "# TYPE db_connects_total counter",
+        ]
+        lines += [f'db_connects_total{{alias="{alias}"}} {count}' for alias, count in connects]
+
+        pools = sorted(self.pool_stats().items())
+        if pools:
+            for name, kind, key, help_text, scale in POOL_METRICS:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for alias, stats in pools:
+                    value = stats.get(key, 0)  # psycopg_pool leaves out the counters still at 0
+                    if scale != 1:
+                        value = f"{value / scale:.6f}"
+                    lines.append(f'{name}{{alias="{alias}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+connection_stats = ConnectionStats()
+
+
+def record_request(request, response, duration, db_stats):
+    """Record a served request in the registry, under its route pattern."""
+    match = getattr(request, "resolver_match", None)
+    route = match.route if match is not None else "unmatched"
+    registry.record(
+        request.method, route, response.status_code, duration, db_stats.queries, db_stats.seconds
+    )
@@ -0,0 +1,132 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import RequestDbStats, record_request
+from .query_budget import RepeatedQueryDetector
+from .query_log import recording
+from .routers import reading_from_replica, replica_configured
+
+# Methods that do not change anything, whose reads may go to the replica
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class MetricsMiddleware:
+    """
+    Record the count, latency, SQL query count and SQL time of every request
+    per route, for the /api/metrics endpoint.
+
+    Works in both sync (WSGI) and async (ASGI) stacks without thread hops.
+    With METRICS_ENABLED = False it removes itself from the middleware chain
+    at startup, so it costs nothing. The body of
+    a streamed response is produced after the middleware returns: its queries
+    and time are not included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with recording(RequestDbStats()) as db_stats:
+            response = self.get_response(request)
+        record_request(request, response, time.perf_counter() - started, db_stats)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with recording(RequestDbStats()) as db_stats:
+            response = await self.get_response(request)
+        record_request(request, response, time.perf_counter() - started, db_stats)
+        return response
+
+
+class RepeatedQueryMiddleware:
+    """
+    Development aid: log a warning with the offending stack when the same
+    query shape runs REPEATED_QUERY_THRESHOLD times within one request, the
+    signature of an N+1 loop. Only active with DEBUG = True.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, "REPEATED_QUERY_THRESHOLD", 5)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with recording(RepeatedQueryDetector(f"{request.method} {request.path}", self.threshold)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with recording(RepeatedQueryDetector(f"{request.method} {request.path}", self.threshold)):
+            return await self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send the reads of GET requests to the read replica (see routers.py).
+
+    Replicas lag a little behind the primary: after a request that may have
+    written (any other method), the client gets a cookie keeping its reads
+    on the primary for REPLICA_STICKY_SECONDS, so it sees its own writes.
+    Without a "replica" database the middleware removes itself at startup.
+    """
+
+    cookie_name = "use_primary"
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, "REPLICA_STICKY_SECONDS", 10)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _use_replica(self, request):
+        return request.method in SAFE_METHODS and self.cookie_name not in request.COOKIES
+
+    def _stick_to_primary(self, request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                self.cookie_name, "1", max_age=self.sticky_seconds, httponly=True, samesite="Lax"
+            )
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._use_replica(request):
+            return self._stick_to_primary(request, self.get_response(request))
+        with reading_from_replica():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self._use_replica(request):
+            return self._stick_to_primary(request, await self.get_response(request))
+        with reading_from_replica():
+            return await self.get_response(request)
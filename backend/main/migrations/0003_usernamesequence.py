@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0002_holiday_employee_designation_employee_salary_leave"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UsernameSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prefix", models.CharField(max_length=150, unique=True)),
+                ("last_value", models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
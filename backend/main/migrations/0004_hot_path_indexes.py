@@ -0,0 +1,64 @@
+# Generated by Django 5.1.3 on 2026-10-18 02:16
+
+from django.db import migrations, models
+
+from main.migration_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("main", "0003_usernamesequence"),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name="employee",
+            index=models.Index(fields=["department"], name="main_emp_department_idx"),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="employee",
+            index=models.Index(
+                fields=["last_name", "id"], name="main_emp_last_name_id_idx"
+            ),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="holiday",
+            index=models.Index(fields=["date"], name="main_holiday_date_idx"),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="hr",
+            index=models.Index(
+                fields=["last_name", "id"], name="main_hr_last_name_id_idx"
+            ),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="leave",
+            index=models.Index(
+                fields=["employee", "start_date"], name="main_leave_emp_start_idx"
+            ),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="leave",
+            index=models.Index(
+                fields=["start_date", "id"], name="main_leave_start_id_idx"
+            ),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="projectmanager",
+            index=models.Index(fields=["department"], name="main_pm_department_idx"),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="projectmanager",
+            index=models.Index(
+                fields=["last_name", "id"], name="main_pm_last_name_id_idx"
+            ),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="user",
+            index=models.Index(fields=["role"], name="main_user_role_idx"),
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+from main.migration_operations import RunSQLIfPostgres
+
+# Conflicts listed in the error when existing leaves overlap
+MAX_REPORTED_OVERLAPS = 50
+
+
+def check_no_overlapping_leaves(apps, schema_editor):
+    # Leaves were never checked for overlaps before this migration. Adding
+    # the constraint over overlapping rows fails with an opaque error, so
+    # list them instead; they have to be fixed (merged or deleted) by HR
+    # before migrating, the migration does not pick which leave to keep.
+    Leave = apps.get_model("main", "Leave")
+    rows = (
+        Leave.objects.order_by("employee_id", "start_date", "id")
+        .values_list("id", "employee_id", "start_date", "end_date")
+        .iterator(chunk_size=2000)
+    )
+    overlaps = []
+    previous = None  # (id, employee_id, end_date) of the leave ending last so far
+    for leave_id, employee_id, start_date, end_date in rows:
+        if previous and previous[1] == employee_id and start_date <= previous[2]:
+            overlaps.append((previous[0], leave_id))
+        if not previous or previous[1] != employee_id or end_date > previous[2]:
+            previous = (leave_id, employee_id, end_date)
+    if overlaps:
+        listing = "\n".join(
+            f"  leave {first} overlaps leave {second}"
+            for first, second in overlaps[:MAX_REPORTED_OVERLAPS]
+        )
+        raise RuntimeError(
+            f"{len(overlaps)} overlapping leaves must be resolved before adding "
+            f"main_leave_no_overlap:\n{listing}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0004_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_no_overlapping_leaves, migrations.RunPython.noop),
+        # Let PostgreSQL reject overlapping leaves of the same employee, using
+        # a GiST index over (employee_id, daterange). btree_gist provides the
+        # GiST operator class for the plain equality on employee_id.
+        RunSQLIfPostgres(
+            sql="CREATE EXTENSION IF NOT EXISTS btree_gist",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        # Building the constraint's index holds an ACCESS EXCLUSIVE lock on
+        # main_leave (reads and writes wait) for the duration of the build,
+        # PostgreSQL has no concurrent form of exclusion constraints. The
+        # lock_timeout makes the migration fail fast, instead of queueing
+        # every other query behind it, when long transactions hold the table.
+        RunSQLIfPostgres(
+            sql=(
+                "SET LOCAL lock_timeout = '10s'; "
+                "ALTER TABLE main_leave ADD CONSTRAINT main_leave_no_overlap "
+                "EXCLUDE USING gist ("
+                "employee_id WITH =, "
+                "daterange(start_date, end_date, '[]') WITH &&"
+                ")"
+            ),
+            reverse_sql="ALTER TABLE main_leave DROP CONSTRAINT main_leave_no_overlap",
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.3 on 2026-10-18 02:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_leave_balances(apps, schema_editor):
+    """
+    Fill the new ledger from the leaves already stored, the way
+    `manage.py rebuild_leave_balances` does. Per-year day splits still read
+    the holidays through the live model, which only needs Holiday.date.
+    """
+    from main.ledger import rebuild_leave_balances
+
+    rebuild_leave_balances(
+        leave_model=apps.get_model("main", "Leave"),
+        balance_model=apps.get_model("main", "LeaveBalance"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0005_leave_no_overlap"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaveBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField()),
+                ("entitlement", models.PositiveIntegerField()),
+                ("taken", models.IntegerField(default=0)),
+                ("pending", models.IntegerField(default=0)),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leave_balances",
+                        to="main.employee",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("employee", "year"),
+                        name="main_leave_balance_emp_year_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_leave_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+from main.migration_operations import RunSQLIfPostgres
+
+# The employee search filters with icontains, which Django renders as
+# UPPER(column::text) LIKE UPPER(...); trigram GIN indexes on the same
+# expression let PostgreSQL answer those with an index scan.
+TRIGRAM_INDEXES = [
+    ("main_emp_first_name_trgm", "main_employee", "first_name"),
+    ("main_emp_last_name_trgm", "main_employee", "last_name"),
+    ("main_emp_email_trgm", "main_employee", "email"),
+    ("main_emp_department_trgm", "main_employee", "department"),
+    ("main_user_username_trgm", "main_user", "username"),
+]
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("main", "0006_leavebalance"),
+    ]
+
+    operations = [
+        RunSQLIfPostgres(
+            sql="CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ] + [
+        RunSQLIfPostgres(
+            sql=(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+            ),
+            reverse_sql=f"DROP INDEX CONCURRENTLY IF EXISTS {name}",
+        )
+        for name, table, column in TRIGRAM_INDEXES
+    ]
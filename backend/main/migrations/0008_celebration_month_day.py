@@ -0,0 +1,140 @@
+# Generated by Django 5.1.3 on 2026-10-18 02:42
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+from main.migration_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    # On PostgreSQL, adding a stored generated column rewrites the whole
+    # table under an ACCESS EXCLUSIVE lock: main_employee, main_hr and
+    # main_projectmanager each block reads and writes while they are
+    # rewritten. Run it outside working hours on large tables. The indexes
+    # are then built concurrently, without blocking writes.
+
+    dependencies = [
+        ("main", "0007_employee_search_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employee",
+            name="birthday_mmdd",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.comparison.Cast(
+                    django.db.models.expressions.CombinedExpression(
+                        django.db.models.expressions.CombinedExpression(
+                            django.db.models.functions.datetime.ExtractMonth(
+                                "birthday"
+                            ),
+                            "*",
+                            models.Value(100),
+                        ),
+                        "+",
+                        django.db.models.functions.datetime.ExtractDay("birthday"),
+                    ),
+                    models.IntegerField(),
+                ),
+                output_field=models.IntegerField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="employee",
+            name="joining_mmdd",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.comparison.Cast(
+                    django.db.models.expressions.CombinedExpression(
+                        django.db.models.expressions.CombinedExpression(
+                            django.db.models.functions.datetime.ExtractMonth(
+                                "date_of_joining"
+                            ),
+                            "*",
+                            models.Value(100),
+                        ),
+                        "+",
+                        django.db.models.functions.datetime.ExtractDay(
+                            "date_of_joining"
+                        ),
+                    ),
+                    models.IntegerField(),
+                ),
+                output_field=models.IntegerField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="hr",
+            name="birthday_mmdd",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.comparison.Cast(
+                    django.db.models.expressions.CombinedExpression(
+                        django.db.models.expressions.CombinedExpression(
+                            django.db.models.functions.datetime.ExtractMonth(
+                                "birthday"
+                            ),
+                            "*",
+                            models.Value(100),
+                        ),
+                        "+",
+                        django.db.models.functions.datetime.ExtractDay("birthday"),
+                    ),
+                    models.IntegerField(),
+                ),
+                output_field=models.IntegerField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="projectmanager",
+            name="birthday_mmdd",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.comparison.Cast(
+                    django.db.models.expressions.CombinedExpression(
+                        django.db.models.expressions.CombinedExpression(
+                            django.db.models.functions.datetime.ExtractMonth(
+                                "birthday"
+                            ),
+                            "*",
+                            models.Value(100),
+                        ),
+                        "+",
+                        django.db.models.functions.datetime.ExtractDay("birthday"),
+                    ),
+                    models.IntegerField(),
+                ),
+                output_field=models.IntegerField(),
+            ),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="employee",
+            index=models.Index(
+                fields=["birthday_mmdd"], name="main_emp_birthday_mmdd_idx"
+            ),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="employee",
+            index=models.Index(
+                fields=["joining_mmdd"], name="main_emp_joining_mmdd_idx"
+            ),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="hr",
+            index=models.Index(
+                fields=["birthday_mmdd"], name="main_hr_birthday_mmdd_idx"
+            ),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name="projectmanager",
+            index=models.Index(
+                fields=["birthday_mmdd"], name="main_pm_birthday_mmdd_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 02:44
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_holidays(apps, schema_editor):
+    # Keep the first of the holidays sharing a date and name, so the unique
+    # constraint can be added
+    Holiday = apps.get_model("main", "Holiday")
+    keep = (
+        Holiday.objects.values("date", "name")
+        .annotate(first_id=Min("id"))
+        .values_list("first_id", flat=True)
+    )
+    Holiday.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0008_celebration_month_day"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_holidays, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="holiday",
+            constraint=models.UniqueConstraint(
+                fields=("date", "name"), name="main_holiday_date_name_uniq"
+            ),
+        ),
+    ]
@@ -1,5 +1,17 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Cast, ExtractDay, ExtractMonth
+
+
+def month_day(field_name):
+    """
+    Expression of the month and day of a date column as one integer (MMDD,
+    e.g. 1231 for December 31st), stored by the *_mmdd generated columns.
+    Unlike the day of the year it does not shift after February in leap
+    years, so an annual window is a plain range (two when it wraps over New
+    Year) on an index of the column.
+    """
+    return Cast(ExtractMonth(field_name) * 100 + ExtractDay(field_name), models.IntegerField())
 
 # Custom User Model
 class User(AbstractUser):
@@ -10,6 +22,13 @@ class User(AbstractUser):
     ]
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
 
+    class Meta(AbstractUser.Meta):
+        # Username lookups are served by the unique username index, this one
+        # serves the role filters
+        indexes = [
+            models.Index(fields=['role'], name='main_user_role_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.role})"
 
@@ -26,6 +45,28 @@ class Employee(models.Model):
     date_of_joining = models.DateField()
     birthday = models.DateField(null=True, blank=True)  # Optional birthday field
     reporting_manager = models.ForeignKey('ProjectManager', on_delete=models.SET_NULL, null=True, blank=True)
+    # Upcoming birthdays and work anniversaries (see celebrations.py)
+    birthday_mmdd = models.GeneratedField(
+        expression=month_day('birthday'), output_field=models.IntegerField(), db_persist=True
+    )
+    joining_mmdd = models.GeneratedField(
+        expression=month_day('date_of_joining'), output_field=models.IntegerField(), db_persist=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['department'], name='main_emp_department_idx'),
+            models.Index(fields=['last_name', 'id'], name='main_emp_last_name_id_idx'),  # Keyset pagination
+            models.Index(fields=['birthday_mmdd'], name='main_emp_birthday_mmdd_idx'),
+            models.Index(fields=['joining_mmdd'], name='main_emp_joining_mmdd_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the loaded manager so a change of team can be detected on save
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_reporting_manager_id = instance.__dict__.get('reporting_manager_id')
+        return instance
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - Employee"
@@ -39,6 +80,16 @@ class ProjectManager(models.Model):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     department = models.CharField(max_length=100)
     birthday = models.DateField(null=True, blank=True)  # Optional birthday field
+    birthday_mmdd = models.GeneratedField(
+        expression=month_day('birthday'), output_field=models.IntegerField(), db_persist=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['department'], name='main_pm_department_idx'),
+            models.Index(fields=['last_name', 'id'], name='main_pm_last_name_id_idx'),  # Keyset pagination
+            models.Index(fields=['birthday_mmdd'], name='main_pm_birthday_mmdd_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - Project Manager"
@@ -51,6 +102,15 @@ class HR(models.Model):
     email = models.EmailField(unique=True)
     branch = models.CharField(max_length=100)
     birthday = models.DateField(null=True, blank=True)  # Optional birthday field
+    birthday_mmdd = models.GeneratedField(
+        expression=month_day('birthday'), output_field=models.IntegerField(), db_persist=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_name', 'id'], name='main_hr_last_name_id_idx'),  # Keyset pagination
+            models.Index(fields=['birthday_mmdd'], name='main_hr_birthday_mmdd_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - HR"
@@ -60,6 +120,15 @@ class Holiday(models.Model):
     name = models.CharField(max_length=100)
     date = models.DateField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='main_holiday_date_idx'),
+        ]
+        constraints = [
+            # One holiday per name and day, which lets imports skip the rows already stored
+            models.UniqueConstraint(fields=['date', 'name'], name='main_holiday_date_name_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.date})"
 
@@ -71,5 +140,38 @@ class Leave(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'start_date'], name='main_leave_emp_start_idx'),
+            models.Index(fields=['start_date', 'id'], name='main_leave_start_id_idx'),  # Keyset pagination
+        ]
+
+    def __str__(self):
+        return f"Leave({self.employee.first_name} {self.employee.last_name}, {self.number_of_days} days)"
+
+# Username counters, one row per username prefix (see usernames.py)
+class UsernameSequence(models.Model):
+    prefix = models.CharField(max_length=150, unique=True)
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.prefix} ({self.last_value})"
+
+
+# Leave balance ledger, one row per employee per year, kept up to date by the
+# Leave signals (see ledger.py). Approvable leaves count as taken, the others
+# as pending.
+class LeaveBalance(models.Model):
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_balances')
+    year = models.PositiveSmallIntegerField()
+    entitlement = models.PositiveIntegerField()
+    taken = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'year'], name='main_leave_balance_emp_year_uniq'),
+        ]
+
     def __str__(self):
-        return f"Leave({self.employee.first_name} {self.employee.last_name}, {self.number_of_days} days)"
\ No newline at end of file
+        return f"LeaveBalance({self.employee_id}, {self.year}: {self.taken}/{self.entitlement} days)"
@@ -0,0 +1,92 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Page size used when the client does not send a limit, and the hard upper bound
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(sort_value, pk):
+    """
+    Utility to build an opaque cursor from the last row of a page.
+    The cursor is a url-safe base64 encoded JSON pair of (sort value, id).
+    """
+    raw = json.dumps([str(sort_value) if sort_value is not None else None, pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Utility to read back a cursor built by encode_cursor.
+    Raises InvalidCursor if the token was tampered with or is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(pk, int) or isinstance(pk, bool) or not isinstance(sort_value, str):
+        raise InvalidCursor(cursor)
+    return sort_value, pk
+
+
+def clamp_limit(limit):
+    """Utility to keep a client supplied page size within sane bounds."""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def _page_queryset(queryset, sort_field, limit, cursor):
+    # The queryset of one page, with one extra row to detect a next page
+    queryset = queryset.order_by(sort_field, "id")
+    if cursor:
+        sort_value, pk = decode_cursor(cursor)
+        try:
+            # e.g. a date sort field needs a parseable date
+            sort_value = queryset.model._meta.get_field(sort_field).to_python(sort_value)
+        except ValidationError:
+            raise InvalidCursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f"{sort_field}__gt": sort_value})
+            | Q(**{sort_field: sort_value, "id__gt": pk})
+        )
+    return queryset[: limit + 1]
+
+
+def _split_page(rows, sort_field, limit):
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_field), last.pk)
+
+
+def paginate_queryset(queryset, sort_field, limit=None, cursor=None):
+    """
+    Utility to fetch one page of a queryset using keyset pagination.
+
+    Rows are ordered by (sort_field, id) and the page starts right after the
+    row encoded in the cursor, so every page is a single index range scan no
+    matter how deep into the collection the client is.
+
+    Returns:
+        tuple: (list of model instances, cursor for the next page or None)
+    """
+    limit = clamp_limit(limit)
+    rows = list(_page_queryset(queryset, sort_field, limit, cursor))
+    return _split_page(rows, sort_field, limit)
+
+
+async def apaginate_queryset(queryset, sort_field, limit=None, cursor=None):
+    """Async version of paginate_queryset, using async iteration of the queryset."""
+    limit = clamp_limit(limit)
+    rows = [row async for row in _page_queryset(queryset, sort_field, limit, cursor)]
+    return _split_page(rows, sort_field, limit)
@@ -0,0 +1,123 @@
+import functools
+import logging
+import re
+import traceback
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+from .query_log import recording
+
+logger = logging.getLogger("main.queries")
+
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*%s\s*,)*\s*%s\s*\)")
+
+
+def sql_shape(sql):
+    """
+    Utility to reduce a query to its shape: literals and the length of
+    IN (...) lists removed, so the queries of an N+1 loop compare equal.
+    """
+    shape = _STRING.sub("%s", sql)
+    shape = _NUMBER.sub("%s", shape)
+    return _PLACEHOLDER_LIST.sub("(...)", shape)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block runs more SQL queries than its budget allows."""
+
+
+class QueryBudget:
+    """
+    Context manager and decorator failing when the wrapped code runs more than
+    `max_queries` SQL queries, or (with `max_repeats`) the same query shape
+    more than `max_repeats` times.
+
+        with query_budget(3):
+            client.get("/api/leaves")
+
+        @query_budget(2)
+        def get_user_leaves(...): ...
+
+    Queries are seen through query_log, including those async views run in
+    sync_to_async threads. Decorated coroutine functions stay coroutines, and
+    every call of a decorated function gets its own count.
+    """
+
+    def __init__(self, max_queries, max_repeats=None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.queries = []
+        self._recording = None
+
+    def add(self, sql, duration):
+        self.queries.append(sql)
+
+    def __enter__(self):
+        self.queries = []
+        self._recording = recording(self)
+        self._recording.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._recording.__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            return False
+        problems = []
+        if len(self.queries) > self.max_queries:
+            problems.append(f"{len(self.queries)} queries run, the budget is {self.max_queries}")
+        if self.max_repeats is not None and self.queries:
+            shape, count = Counter(sql_shape(sql) for sql in self.queries).most_common(1)[0]
+            if count > self.max_repeats:
+                problems.append(f"the same query ran {count} times (at most {self.max_repeats}): {shape}")
+        if problems:
+            listing = "\n".join(f"{index}. {sql}" for index, sql in enumerate(self.queries, start=1))
+            raise QueryBudgetExceeded("; ".join(problems) + "\nQueries:\n" + listing)
+        return False
+
+    def __call__(self, func):
+        if iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with QueryBudget(self.max_queries, self.max_repeats):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with QueryBudget(self.max_queries, self.max_repeats):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+query_budget = QueryBudget
+
+
+class RepeatedQueryDetector:
+    """
+    Query recorder (see query_log.recording) logging a warning, with the
+    stack of the offending call, when one query shape runs `threshold` times.
+    Each shape is reported once per recording.
+    """
+
+    def __init__(self, label, threshold):
+        self.label = label
+        self.threshold = threshold
+        self.counts = Counter()
+
+    def add(self, sql, duration):
+        shape = sql_shape(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] == self.threshold:
+            base_dir = str(settings.BASE_DIR)
+            stack = [
+                frame for frame in traceback.extract_stack()
+                if frame.filename.startswith(base_dir) and "site-packages" not in frame.filename
+            ]
+            logger.warning(
+                "Possible N+1 in %s: the same query ran %d times\n%s\n%s",
+                self.label, self.threshold, shape, "".join(traceback.format_list(stack)),
+            )
@@ -0,0 +1,53 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+# Recorders (objects with an add(sql, duration) method) of the current context.
+# Context variables follow a request into sync_to_async threads, so queries
+# run by async views reach the recorders of their request as well.
+_recorders = ContextVar("query_recorders", default=())
+
+
+def record_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper passing every query and its duration to the
+    active recorders. With no recorder active it only forwards the call.
+    """
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for recorder in recorders:
+            recorder.add(sql, duration)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created receiver adding record_queries to the execute wrappers
+    of every database connection, the permanent form of
+    connection.execute_wrapper(record_queries).
+    """
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def install_on_open_connections():
+    """Add record_queries to the connections this thread opened already."""
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(None, connection)
+
+
+@contextmanager
+def recording(recorder):
+    """Pass the queries run inside the block (in this context) to `recorder`."""
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
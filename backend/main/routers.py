@@ -0,0 +1,87 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+# Database alias of the optional read replica (see DATABASES in settings.py)
+REPLICA_DB = "replica"
+
+
+class _ReplicaState:
+    """Whether the reads of the current request may go to the replica."""
+
+    __slots__ = ("use_replica",)
+
+    def __init__(self):
+        self.use_replica = True
+
+
+# Set for the requests allowed to read from the replica. Context variables
+# follow a request into sync_to_async threads, so async views are routed too.
+_replica_state = ContextVar("replica_state", default=None)
+
+
+def replica_configured():
+    """Utility to tell whether a read replica is set up in DATABASES."""
+    return REPLICA_DB in settings.DATABASES
+
+
+@contextmanager
+def reading_from_replica():
+    """
+    Send the reads run inside the block to the replica, until the block
+    writes: from the first write on, reads go to the primary again so they
+    see that write.
+    """
+    token = _replica_state.set(_ReplicaState())
+    try:
+        yield
+    finally:
+        _replica_state.reset(token)
+
+
+@contextmanager
+def reading_from_primary():
+    """
+    Send the reads run inside the block to the primary, even within a
+    reading_from_replica() block. Used to fill caches keyed by a collection
+    version: a lagging replica could still return the rows from before the
+    change that moved the version, and they would stay cached under it.
+    """
+    token = _replica_state.set(None)
+    try:
+        yield
+    finally:
+        _replica_state.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of reading_from_replica() blocks (the
+    GET requests, see ReplicaRoutingMiddleware) to the replica and
+    everything else to the primary. Reads inside a transaction stay on the
+    primary, and migrations only run on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _replica_state.get()
+        if state is None or not state.use_replica or not replica_configured():
+            return None
+        if connections["default"].in_atomic_block:
+            return None
+        return REPLICA_DB
+
+    def db_for_write(self, model, **hints):
+        state = _replica_state.get()
+        if state is not None:
+            # Read-after-write within the request: pin the rest of it to the primary
+            state.use_replica = False
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB
@@ -1,3 +1,5 @@
+from typing import List
+
 from ninja import Schema
 
 class SignInSchema(Schema):
@@ -55,7 +57,15 @@ class ProjectManagerUpdateSchema(Schema):
 
 class LeaveCreateSchema(Schema):
     employee_username: str
-    number_of_days: int
+    number_of_days: int = None  # Ignored, computed from the dates and holidays
     start_date: str
     end_date: str
-    approvable: bool = False
\ No newline at end of file
+    approvable: bool = False
+
+class HolidayCreateSchema(Schema):
+    name: str
+    date: str
+
+class OffboardSchema(Schema):
+    usernames: List[str] = None
+    department: str = None
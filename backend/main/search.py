@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models.functions import Greatest
+
+from .cache import get_collection_version
+from .models import Employee, User
+from .routers import reading_from_primary
+from .utils import employee_to_dict
+
+# Default and maximum number of results returned by a search
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_RESULTS = 50
+
+SEARCH_FIELDS = ("first_name", "last_name", "email", "username__username", "department")
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class EmployeeSearchIndex:
+    """
+    In-process inverted index over the searchable employee fields, used when
+    the database has no pg_trgm (SQLite in local runs and tests).
+
+    Every trigram of every field points to the employees containing it, and
+    every 1 and 2 character word prefix does as well, so queries shorter than
+    a trigram still resolve without scanning all employees.
+    """
+
+    def __init__(self, employees):
+        self.documents = {}
+        self.fields = {}
+        self.postings = defaultdict(set)
+        for emp in employees:
+            values = [
+                (emp.username.username if field == "username__username" else getattr(emp, field) or "").lower()
+                for field in SEARCH_FIELDS
+            ]
+            self.documents[emp.id] = employee_to_dict(emp)
+            self.fields[emp.id] = values
+            for value in values:
+                for gram in _trigrams(value):
+                    self.postings[gram].add(emp.id)
+                for word in value.replace("@", " ").replace(".", " ").replace("_", " ").split():
+                    self.postings["^" + word[:1]].add(emp.id)
+                    self.postings["^" + word[:2]].add(emp.id)
+
+    def _candidates(self, query):
+        if len(query) < 3:
+            return self.postings.get("^" + query, set())
+        grams = sorted(_trigrams(query), key=lambda gram: len(self.postings.get(gram, ())))
+        candidates = set(self.postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            candidates &= self.postings.get(gram, set())
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def _score(values, query):
+        # Exact field match, then prefix match, then substring match
+        best = 0
+        for value in values:
+            if value == query:
+                return 3
+            if value.startswith(query):
+                best = max(best, 2)
+            elif query in value:
+                best = max(best, 1)
+        return best
+
+    def search(self, query, limit):
+        scored = []
+        for emp_id in self._candidates(query):
+            score = self._score(self.fields[emp_id], query)
+            if score:
+                scored.append((-score, self.documents[emp_id]["last_name"], emp_id))
+        scored.sort()
+        return [self.documents[emp_id] for _, _, emp_id in scored[:limit]]
+
+
+# (employees collection version, EmployeeSearchIndex), rebuilt on any change
+_index = None
+
+
+def _get_search_index():
+    global _index
+    version = get_collection_version("employees")
+    if _index is None or _index[0] != version:
+        # Built under `version`, so read from the primary (see reading_from_primary)
+        with reading_from_primary():
+            employees = Employee.objects.select_related("username").iterator(chunk_size=2000)
+            _index = (version, EmployeeSearchIndex(employees))
+    return _index[1]
+
+
+def search_employees(query, limit=None):
+    """
+    Utility to search employees by first/last name, email, username and department.
+
+    On PostgreSQL every searched column is matched by its own ILIKE, so each
+    one is served by its pg_trgm GIN index, the matching ids are combined with
+    a UNION and only those employees are ranked by trigram similarity.
+    Elsewhere the in-process EmployeeSearchIndex is used. At most
+    MAX_SEARCH_RESULTS rows are returned.
+    """
+    query = (query or "").strip().lower()
+    # Missing, zero or negative limits fall back to the default, as in pagination.clamp_limit
+    limit = min(limit, MAX_SEARCH_RESULTS) if limit and limit > 0 else DEFAULT_SEARCH_LIMIT
+    if not query:
+        return []
+
+    if connection.vendor != "postgresql":
+        return _get_search_index().search(query, limit)
+
+    # One OR over both tables of the join cannot use the indexes and scans
+    # every employee, so each column gets a subquery of its own
+    id_queries = [
+        Employee.objects.filter(**{f"{field}__icontains": query}).values("id")
+        for field in SEARCH_FIELDS
+        if field != "username__username"
+    ]
+    id_queries.append(
+        Employee.objects.filter(
+            username__in=User.objects.filter(username__icontains=query).values("id")
+        ).values("id")
+    )
+    employees = (
+        Employee.objects.select_related("username")
+        .filter(id__in=id_queries[0].union(*id_queries[1:]))
+        .annotate(rank=Greatest(*(TrigramSimilarity(field, query) for field in SEARCH_FIELDS)))
+        .order_by("-rank", "last_name", "id")[:limit]
+    )
+    return [employee_to_dict(emp) for emp in employees]
@@ -0,0 +1,20 @@
+from ninja.security import SessionAuth
+
+
+class AsyncSessionAuth(SessionAuth):
+    """
+    Session authentication for async operations.
+
+    request.user is a lazy object that loads the user with a blocking query,
+    which Django refuses to run inside the event loop; request.auser() loads
+    it with the async ORM instead. Handlers read the user from request.auth.
+    """
+
+    async def authenticate(self, request, key):
+        user = await request.auser()
+        if user.is_authenticated:
+            return user
+        return None
+
+
+async_django_auth = AsyncSessionAuth()
@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_collection_version
+from .hierarchy import find_manager_usernames, invalidate_teams
+from .ledger import add_leave_deltas, apply_leave_deltas, as_date, new_deltas
+from .models import HR, Employee, Holiday, Leave, ProjectManager
+
+
+# Set inside muting_row_signals() blocks
+_row_signals_muted = ContextVar("row_signals_muted", default=False)
+
+
+@contextmanager
+def muting_row_signals():
+    """
+    Skip the per-row cache and ledger work of the receivers below for the
+    saves and deletes run inside the block, for set-based writers (see
+    bulk.bulk_offboard) that update the ledger and bump the versions once.
+    """
+    token = _row_signals_muted.set(True)
+    try:
+        yield
+    finally:
+        _row_signals_muted.reset(token)
+
+
+def bump_on_commit(*names):
+    """
+    Move the versions once the writing transaction commits. Bumped any
+    earlier, a concurrent read could still see the old rows and cache them
+    under the new version.
+    """
+    transaction.on_commit(lambda: bump_collection_version(*names))
+
+
+def invalidate_teams_on_commit(manager_ids=(), manager_user_ids=()):
+    # Usernames are resolved now, a deleted manager is gone after the commit
+    usernames = find_manager_usernames(manager_ids, manager_user_ids)
+    transaction.on_commit(lambda: invalidate_teams(manager_usernames=usernames))
+
+
+# Any change to the holiday table invalidates the cached holiday calendar
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def invalidate_holiday_cache(sender, **kwargs):
+    if _row_signals_muted.get():
+        return
+    bump_on_commit("holidays")
+
+
+# Changes to the other collections move their versions (and so their ETags)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_employee_cache(sender, instance, **kwargs):
+    if _row_signals_muted.get():
+        return
+    bump_on_commit("employees")
+    # Both the team the employee left and the one they are in now
+    invalidate_teams_on_commit(manager_ids={
+        getattr(instance, "_loaded_reporting_manager_id", None),
+        instance.reporting_manager_id,
+    })
+    instance._loaded_reporting_manager_id = instance.reporting_manager_id
+
+
+@receiver(post_save, sender=ProjectManager)
+@receiver(post_delete, sender=ProjectManager)
+def invalidate_project_manager_cache(sender, instance, **kwargs):
+    if _row_signals_muted.get():
+        return
+    bump_on_commit("project_managers")
+    invalidate_teams_on_commit(manager_user_ids=[instance.username_id])
+
+
+@receiver(post_save, sender=HR)
+@receiver(post_delete, sender=HR)
+def invalidate_hr_cache(sender, **kwargs):
+    if _row_signals_muted.get():
+        return
+    bump_on_commit("hrs")
+
+
+@receiver(post_save, sender=Leave)
+@receiver(post_delete, sender=Leave)
+def invalidate_leave_cache(sender, **kwargs):
+    if _row_signals_muted.get():
+        return
+    bump_on_commit("leaves")
+
+
+# ---------------------------------- Leave balance ledger ---------------------------------- #
+
+
+@receiver(pre_save, sender=Leave)
+def remember_previous_leave(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Keep the stored version of an updated leave to reverse its old effect
+    instance._ledger_previous = None
+    if raw or instance.pk is None or _row_signals_muted.get():
+        return
+    instance._ledger_previous = (
+        Leave.objects.filter(pk=instance.pk)
+        .values_list("employee_id", "start_date", "end_date", "number_of_days", "approvable")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Leave)
+def update_ledger_on_save(sender, instance, raw=False, **kwargs):
+    if raw or _row_signals_muted.get():
+        return
+    deltas = new_deltas()
+    previous = getattr(instance, "_ledger_previous", None)
+    if previous:
+        add_leave_deltas(deltas, *previous, sign=-1)
+    add_leave_deltas(
+        deltas, instance.employee_id, as_date(instance.start_date), as_date(instance.end_date),
+        instance.number_of_days, instance.approvable,
+    )
+    apply_leave_deltas(deltas)
+
+
+@receiver(post_delete, sender=Leave)
+def update_ledger_on_delete(sender, instance, origin=None, **kwargs):
+    # Leaves removed because their employee is deleted take the ledger rows
+    # with them, only direct deletions of leaves adjust the balance
+    if _row_signals_muted.get():
+        return
+    if not (isinstance(origin, Leave) or getattr(origin, "model", None) is Leave):
+        return
+    deltas = new_deltas()
+    add_leave_deltas(
+        deltas, instance.employee_id, as_date(instance.start_date), as_date(instance.end_date),
+        instance.number_of_days, instance.approvable, sign=-1,
+    )
+    apply_leave_deltas(deltas, create_missing=False)
@@ -0,0 +1,69 @@
+import json
+
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Rows fetched from the database per round trip while streaming
+STREAM_CHUNK_SIZE = 2000
+
+STREAM_FORMATS = ("ndjson", "json")
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+async def _andjson_lines(rows):
+    async for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def _json_array(rows, key):
+    # Same document shape as the non-streamed endpoint, emitted piece by piece
+    yield '{"success": true, "%s": [' % key
+    separator = ""
+    for row in rows:
+        yield separator + json.dumps(row, cls=DjangoJSONEncoder)
+        separator = ","
+    yield "]}"
+
+
+async def _ajson_array(rows, key):
+    yield '{"success": true, "%s": [' % key
+    separator = ""
+    async for row in rows:
+        yield separator + json.dumps(row, cls=DjangoJSONEncoder)
+        separator = ","
+    yield "]}"
+
+
+def server_rows(request, iter_rows, aiter_rows):
+    """
+    Utility to pick the row iterator matching the server of `request`: the
+    async one over ASGI, the sync one over WSGI, where Django would otherwise
+    collect a whole async iterator in memory before sending the first byte.
+    """
+    return aiter_rows() if isinstance(request, ASGIRequest) else iter_rows()
+
+
+def stream_rows(rows, stream_format, key):
+    """
+    Utility to wrap an iterator of dicts in a StreamingHttpResponse.
+
+    "ndjson" emits one JSON object per line, "json" emits the usual
+    {"success": true, "<key>": [...]} document as a chunked array.
+    `rows` may also be an async iterator, for views served over ASGI (see
+    server_rows).
+    """
+    is_async = hasattr(rows, "__aiter__")
+    if stream_format == "ndjson":
+        content = _andjson_lines(rows) if is_async else _ndjson_lines(rows)
+        response = StreamingHttpResponse(content, content_type="application/x-ndjson")
+    else:
+        content = _ajson_array(rows, key) if is_async else _json_array(rows, key)
+        response = StreamingHttpResponse(content, content_type="application/json")
+    # Stop proxies such as nginx from buffering the whole body
+    response["X-Accel-Buffering"] = "no"
+    return response
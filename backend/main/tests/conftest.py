@@ -0,0 +1,26 @@
+import pytest
+from django.core.cache import cache
+
+from main.query_budget import QueryBudget
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache, as test rollbacks do not send signals."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Query budget for a block of a test, e.g.
+
+        with query_budget(4):
+            client.get("/api/leaves")
+
+    fails the test when the block runs more than 4 queries (pass max_repeats
+    to also fail on the same query repeating, the signature of an N+1).
+    """
+    return QueryBudget
@@ -1,6 +1,10 @@
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client
-from main.models import Employee
+from datetime import date
+from main.models import Employee, Leave
+from main.celebrations import get_upcoming_celebrations
+from main.utils import create_employee_user, create_project_manager_user, update_employee
 from main.tests.test_hr_auth_apis import csrf_token, hr_user  # Reuse fixtures
 
 
@@ -82,6 +86,45 @@ def test_update_employee(client, csrf_token, hr_user):
     assert updated_employee.department == "Sales"
 
 
+@pytest.mark.django_db
+def test_update_employee_partial(client, csrf_token, hr_user, django_assert_num_queries):
+    user = create_employee_user(
+        first_name="Partial",
+        last_name="Update",
+        email="partial@example.com",
+        phone_number="1234567890",
+        department="Engineering",
+        birthday="1990-01-01",
+        date_of_joining="2023-01-01",
+    )
+
+    # One joined read, then a single UPDATE of the profile inside a transaction
+    with django_assert_num_queries(4) as captured:  # SELECT, SAVEPOINT, UPDATE, RELEASE
+        updated = update_employee(user.username, department="Sales", first_name="Partial")
+    updates = [q["sql"] for q in captured.captured_queries if q["sql"].startswith("UPDATE")]
+    assert len(updates) == 1
+    assert '"department"' in updates[0] and '"first_name"' not in updates[0]
+    assert updated.department == "Sales"
+
+    # Nothing changed, nothing written
+    with django_assert_num_queries(1):
+        update_employee(user.username, department="Sales")
+
+    # The endpoint returns the updated representation
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+    response = client.put(f"/api/employees/{user.username}",
+                          {"phone_number": "999"},
+                          content_type="application/json",
+                          HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.json()["employee"]["phone_number"] == "999"
+    assert client.put("/api/employees/nobody", {"phone_number": "1"},
+                      content_type="application/json",
+                      HTTP_X_CSRFTOKEN=csrf_token).json()["success"] is False
+
+
 @pytest.mark.django_db
 def test_delete_employee(client, csrf_token, hr_user):
     # Create an employee first
@@ -123,7 +166,7 @@ def test_delete_employee(client, csrf_token, hr_user):
 
 
 @pytest.mark.django_db
-def test_get_all_employees(client, csrf_token, hr_user):
+def test_get_all_employees(client, csrf_token, hr_user, query_budget):
     # Login first
     client.post("/api/login", 
                 {"username": hr_user.username, "password": "test_password"},
@@ -146,11 +189,299 @@ def test_get_all_employees(client, csrf_token, hr_user):
                    content_type="application/json",
                    HTTP_X_CSRFTOKEN=csrf_token)
 
-    # Get all employees
-    response = client.get("/api/employees",
-                         HTTP_X_CSRFTOKEN=csrf_token)
+    # Get all employees: session and user, then one joined page query
+    with query_budget(3, max_repeats=1):
+        response = client.get("/api/employees",
+                              HTTP_X_CSRFTOKEN=csrf_token)
     
     assert response.status_code == 200
     data = response.json()
     assert data["success"] is True
     assert len(data["employees"]) == 3
+
+
+@pytest.mark.django_db
+def test_get_all_employees_paginated(client, csrf_token, hr_user):
+    # Login first
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    # Create 5 employees sharing a last name so the id tie-breaker is exercised
+    for i in range(5):
+        create_employee_user(
+            first_name=f"Page{i}",
+            last_name="Same",
+            email=f"page{i}@example.com",
+            phone_number=f"555000000{i}",
+            department="Engineering",
+            birthday="1990-01-01",
+            date_of_joining="2023-01-01",
+        )
+
+    # Walk through the pages two at a time
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/employees", params, HTTP_X_CSRFTOKEN=csrf_token)
+        data = response.json()
+        assert data["success"] is True
+        assert len(data["employees"]) <= 2
+        seen.extend(emp["email"] for emp in data["employees"])
+        cursor = data["next"]
+        if cursor is None:
+            break
+
+    assert sorted(seen) == sorted(f"page{i}@example.com" for i in range(5))
+    assert len(seen) == len(set(seen))
+
+    # A tampered cursor is rejected
+    response = client.get("/api/employees", {"cursor": "not-a-cursor"},
+                          HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.json()["success"] is False
+
+
+@pytest.mark.django_db
+def test_import_employees(client, csrf_token, hr_user, monkeypatch):
+    # Login first
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    base = {
+        "last_name": "Import",
+        "phone_number": "1234567890",
+        "department": "Engineering",
+        "birthday": "1990-01-01",
+        "date_of_joining": "2023-01-01",
+    }
+    payload = [
+        {**base, "first_name": "Ann", "email": "ann@example.com"},
+        {**base, "first_name": "Ann", "email": "ann2@example.com"},
+        {**base, "first_name": "Bad", "email": "ann@example.com"},  # Duplicate email
+        {**base, "first_name": "Worse", "email": "worse@example.com", "birthday": "1990-13-01"},
+        {"first_name": "Missing"},  # Missing required fields
+        {**base, "first_name": "Long", "email": "long@example.com", "phone_number": "1" * 40},
+        {**base, "first_name": "Nomail", "email": "not-an-email"},
+    ]
+    response = client.post("/api/employees/import",
+                           payload,
+                           content_type="application/json",
+                           HTTP_X_CSRFTOKEN=csrf_token)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["success"] is True
+    assert len(data["usernames"]) == 2
+    assert len(set(data["usernames"])) == 2  # Same first name, distinct usernames
+    assert [err["row"] for err in data["errors"]] == [3, 4, 5, 6, 7]
+    assert data["errors"][3]["errors"] == ["phone_number: must be at most 15 characters"]
+    assert data["errors"][4]["errors"] == ["email: 'not-an-email' is not a valid email address"]
+    assert Employee.objects.filter(last_name="Import").count() == 2
+
+    # An email taken after the duplicate check (as by a concurrent import)
+    # fails the transaction, reported as an error the client can retry
+    monkeypatch.setattr("main.bulk.existing_values", lambda queryset, field, values: set())
+    response = client.post("/api/employees/import",
+                           [{**base, "first_name": "Late", "email": "ann@example.com"}],
+                           content_type="application/json",
+                           HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.json() == {
+        "success": False,
+        "message": "Unable to import employees, another employee was created meanwhile. Please retry.",
+    }
+    assert Employee.objects.filter(last_name="Import").count() == 2
+
+
+@pytest.mark.django_db
+def test_import_employees_csv(client, csrf_token, hr_user):
+    # Login first
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    csv_file = SimpleUploadedFile(
+        "employees.csv",
+        b"first_name,last_name,email,phone_number,department,birthday,date_of_joining\n"
+        b"Cara,Csv,cara@example.com,111,Sales,1991-05-05,2024-02-01\n"
+        b"Dan,Csv,dan@example.com,222,Sales,1992-06-06,2024-02-01\n",
+        content_type="text/csv",
+    )
+    response = client.post("/api/employees/import/csv",
+                           {"file": csv_file},
+                           HTTP_X_CSRFTOKEN=csrf_token)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["success"] is True
+    assert data["errors"] == []
+    assert Employee.objects.filter(last_name="Csv", department="Sales").count() == 2
+
+
+@pytest.mark.django_db
+def test_get_all_employees_etag(client, csrf_token, hr_user, django_assert_max_num_queries,
+                                django_capture_on_commit_callbacks, settings, tmp_path):
+    # Login first
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    # Without a cache shared by all workers no validators are sent
+    response = client.get("/api/employees", HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.json()["success"] is True
+    assert "ETag" not in response
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                                   "LOCATION": str(tmp_path)}}
+
+    create_employee_user(
+        first_name="Etag",
+        last_name="Employee",
+        email="etag@example.com",
+        phone_number="1234567890",
+        department="IT",
+        birthday="1990-01-01",
+        date_of_joining="2023-01-01",
+    )
+    response = client.get("/api/employees", HTTP_X_CSRFTOKEN=csrf_token)
+    etag = response["ETag"]
+    assert response["Last-Modified"]
+
+    # Nothing changed: 304 without querying the employee table
+    with django_assert_max_num_queries(2):  # Session and user lookups only
+        response = client.get("/api/employees", HTTP_IF_NONE_MATCH=etag,
+                              HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.status_code == 304
+
+    # A change to any employee invalidates the tag once committed
+    with django_capture_on_commit_callbacks(execute=True):
+        Employee.objects.filter(email="etag@example.com").get().save()
+    response = client.get("/api/employees", HTTP_IF_NONE_MATCH=etag,
+                          HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_search_employees(client, csrf_token, hr_user, django_capture_on_commit_callbacks):
+    # Login first
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    people = [("Johnny", "Walker", "Sales"), ("Ann", "Johnson", "Engineering"), ("Zoe", "Smith", "Finance")]
+    for first_name, last_name, department in people:
+        create_employee_user(
+            first_name=first_name,
+            last_name=last_name,
+            email=f"{first_name.lower()}@example.com",
+            phone_number="1234567890",
+            department=department,
+            birthday="1990-01-01",
+            date_of_joining="2023-01-01",
+        )
+
+    def search(q, **params):
+        response = client.get("/api/employees/search", {"q": q, **params},
+                              HTTP_X_CSRFTOKEN=csrf_token)
+        assert response.json()["success"] is True
+        return [emp["last_name"] for emp in response.json()["employees"]]
+
+    # Matches on any field, equally ranked results ordered by last name
+    assert search("john") == ["Johnson", "Walker"]
+    assert search("johnny") == ["Walker"]
+    assert search("ann") == ["Johnson"]
+    assert search("FINANCE") == ["Smith"]
+    assert search("zo") == ["Smith"]
+    assert search("nobody") == []
+    assert search("example.com", limit=2) == ["Johnson", "Smith"]
+    assert search("example.com", limit=0) == ["Johnson", "Smith", "Walker"]
+    assert search("example.com", limit=-1) == ["Johnson", "Smith", "Walker"]
+
+    # The index follows changes to employees
+    Employee.objects.filter(last_name="Smith").update(department="Sales")
+    with django_capture_on_commit_callbacks(execute=True):
+        Employee.objects.get(last_name="Smith").save()
+    assert search("sales") == ["Smith", "Walker"]
+
+
+@pytest.mark.django_db
+def test_department_analytics(client, csrf_token, hr_user, django_assert_num_queries):
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    for i, (department, salary) in enumerate([("Sales", "1000.50"), ("Sales", "2000"), ("IT", None)]):
+        user = create_employee_user(f"Emp{i}", "Analytics", f"emp{i}@example.com", "1",
+                                    department, "1990-01-01", "2020-01-01")
+        Employee.objects.filter(username=user).update(salary=salary)
+    create_project_manager_user("Pam", "Sales", "pam@example.com", "1", "Sales", "1980-01-01")
+    create_project_manager_user("Paul", "Hr", "paul@example.com", "1", "HR", "1980-01-01")
+    sales = Employee.objects.filter(department="Sales").first()
+    Leave.objects.create(employee=sales, number_of_days=3, approvable=True,
+                         start_date=date(2024, 5, 6), end_date=date(2024, 5, 8))
+    Leave.objects.create(employee=sales, number_of_days=2, approvable=False,
+                         start_date=date(2024, 6, 3), end_date=date(2024, 6, 4))
+
+    # Session, user, then a single aggregation query
+    with django_assert_num_queries(3):
+        response = client.get("/api/analytics/departments", {"year": 2024},
+                              HTTP_X_CSRFTOKEN=csrf_token)
+    data = response.json()
+    assert data["success"] is True
+    assert data["year"] == 2024
+    assert data["departments"] == [
+        {"department": "IT", "headcount": 1, "total_salary": None, "average_salary": None,
+         "managers": 0, "leave_days_taken": 0},
+        {"department": "Sales", "headcount": 2, "total_salary": "3000.50", "average_salary": "1500.25",
+         "managers": 1, "leave_days_taken": 3},
+    ]
+
+    # Served from the cache afterwards
+    with django_assert_num_queries(2):
+        client.get("/api/analytics/departments", {"year": 2024}, HTTP_X_CSRFTOKEN=csrf_token)
+
+
+
+@pytest.mark.django_db
+def test_upcoming_celebrations(client, csrf_token, hr_user, django_assert_num_queries):
+    create_employee_user("Eve", "Winter", "eve@example.com", "1", "Sales", "1995-12-30", "2020-01-05")
+    create_employee_user("Nora", "New", "nora@example.com", "1", "Sales", "1990-06-01", "2025-12-26")
+    # Joining more than a year ahead: no anniversary with a negative number of years
+    create_employee_user("Finn", "Future", "finn@example.com", "1", "Sales", "1990-06-01", "2027-01-02")
+    create_project_manager_user("Leo", "Leap", "leo@example.com", "1", "IT", "1980-02-29")
+
+    # The window wraps over New Year: one UNION ALL query over the three tables
+    with django_assert_num_queries(1):
+        celebrations = get_upcoming_celebrations(14, today=date(2025, 12, 25))
+    assert [(c["type"], c["date"], c["years"], c["role"], c["first_name"]) for c in celebrations] == [
+        ("birthday", date(2025, 12, 30), 30, "EMPLOYEE", "Eve"),
+        ("birthday", date(2026, 1, 1), 36, "HR", "Test"),
+        ("work_anniversary", date(2026, 1, 5), 6, "EMPLOYEE", "Eve"),
+    ]
+    assert celebrations[0]["days_until"] == 5
+
+    # February 29th is celebrated on the 28th in common years
+    celebrations = get_upcoming_celebrations(8, today=date(2027, 2, 20))
+    assert [(c["date"], c["years"], c["role"]) for c in celebrations] == [
+        (date(2027, 2, 28), 47, "PROJECT_MANAGER"),
+    ]
+    assert get_upcoming_celebrations(7, today=date(2027, 3, 1)) == []
+
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+    data = client.get("/api/celebrations", HTTP_X_CSRFTOKEN=csrf_token).json()
+    assert data["success"] is True
+    assert data["days"] == 14
+    data = client.get("/api/celebrations", {"days": 400}, HTTP_X_CSRFTOKEN=csrf_token).json()
+    assert data == {"success": False, "message": "days must be between 1 and 365"}
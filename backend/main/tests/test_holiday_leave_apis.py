@@ -1,10 +1,33 @@
+import base64
+import importlib
+import json
 import pytest
-from django.test import Client
+from django.core.files.uploadedfile import SimpleUploadedFile
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.test import AsyncClient, Client
 from datetime import date, timedelta
-from main.models import Holiday, Leave, Employee
-from main.utils import create_employee_user, create_leave
+from main.intervals import IntervalSet
+from main.ledger import rebuild_leave_balances
+from main.models import Holiday, Leave, LeaveBalance, Employee
+from main.business_days import working_days_batch, working_days_between
+from main.query_budget import QueryBudgetExceeded, RepeatedQueryDetector, query_budget
+from main.query_log import recording
+from main.utils import (
+    create_employee_user, create_leave, create_project_manager_user, get_all_holidays, get_user_leaves, recalculate_leave_days
+)
 from main.tests.test_hr_auth_apis import csrf_token, hr_user  # Reuse fixtures
 
+
+def read_streaming_content(response):
+    """Join the body of a streamed response, sync (WSGI) or async (ASGI)."""
+    if not response.is_async:
+        return b"".join(response.streaming_content)
+
+    async def collect():
+        return b"".join([chunk async for chunk in response.streaming_content])
+    return async_to_sync(collect)()
+
 @pytest.fixture
 def client():
     return Client()
@@ -48,6 +71,37 @@ def test_get_all_holidays(client, csrf_token, hr_user):
     assert data["success"] is True
     assert len(data["holidays"]) == 2
 
+@pytest.mark.django_db
+def test_holiday_cache(client, csrf_token, hr_user, django_assert_num_queries,
+                       django_capture_on_commit_callbacks):
+    Holiday.objects.create(name="New Year", date=date(2024, 1, 1))
+    Holiday.objects.create(name="New Year", date=date(2025, 1, 1))
+
+    # First call fills the cache, the second one never touches the database
+    assert len(get_all_holidays()) == 2
+    assert len(get_all_holidays(2025)) == 1
+    with django_assert_num_queries(0):
+        assert len(get_all_holidays()) == 2
+        assert len(get_all_holidays(2025)) == 1
+
+    # Saving a holiday invalidates every cached slice, once the save is committed
+    with django_capture_on_commit_callbacks(execute=True):
+        Holiday.objects.create(name="Christmas", date=date(2025, 12, 25))
+        assert len(get_all_holidays()) == 2
+    assert len(get_all_holidays()) == 3
+    assert [h["name"] for h in get_all_holidays(2025)] == ["New Year", "Christmas"]
+
+    # The year filter is also available on the endpoint
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    response = client.get("/api/holidays", {"year": 2024}, HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.json()["holidays"] == [{"name": "New Year", "date": "2024-01-01"}]
+    for year in (0, 10000):
+        response = client.get("/api/holidays", {"year": year}, HTTP_X_CSRFTOKEN=csrf_token)
+        assert response.status_code == 200
+        assert response.json() == {"success": False, "message": "year must be between 1 and 9999"}
+
 @pytest.mark.django_db
 def test_get_all_leaves(client, csrf_token, hr_user, test_employee):
     # Login first
@@ -81,6 +135,86 @@ def test_get_all_leaves(client, csrf_token, hr_user, test_employee):
     assert data["success"] is True
     assert len(data["leaves"]) == 2
 
+    # Cursors with a sort value that is not a date, or a non-integer id, are rejected
+    for sort_value, pk in [("notadate", 1), ("2024-01-01", True), (None, 1)]:
+        raw = json.dumps([sort_value, pk]).encode()
+        cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+        response = client.get("/api/leaves", {"cursor": cursor}, HTTP_X_CSRFTOKEN=csrf_token)
+        assert response.json() == {"success": False, "message": "Invalid cursor"}
+
+@pytest.mark.django_db
+def test_get_employee_leaves_async(client, csrf_token, hr_user, test_employee, django_assert_num_queries):
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    employee = Employee.objects.get(username=test_employee)
+    for i in range(3):
+        Leave.objects.create(
+            employee=employee,
+            number_of_days=1,
+            start_date=date(2024, 3, 4 + i * 7),
+            end_date=date(2024, 3, 4 + i * 7),
+        )
+
+    # Served by the async view; the employee of every leave is joined up front
+    # (session, user, employee lookup, one page of leaves)
+    with django_assert_num_queries(4):
+        response = client.get(f"/api/employees/{test_employee.username}/leaves",
+                              HTTP_X_CSRFTOKEN=csrf_token)
+    data = response.json()
+    assert data["success"] is True
+    assert [leave["start_date"] for leave in data["leaves"]] == ["2024-03-04", "2024-03-11", "2024-03-18"]
+    assert data["leaves"][0]["employee_name"] == f"{employee.first_name} {employee.last_name}"
+
+    response = client.get("/api/employees/nobody/leaves", HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.json() == {"success": False, "message": "Employee not found"}
+
+@pytest.mark.django_db
+def test_stream_all_leaves(client, csrf_token, hr_user, test_employee):
+    # Login first
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    employee = Employee.objects.get(username=test_employee)
+    for i in range(3):
+        Leave.objects.create(
+            employee=employee,
+            number_of_days=1,
+            start_date=date(2024, 3, 1 + i * 7),
+            end_date=date(2024, 3, 1 + i * 7),
+        )
+
+    # Newline delimited JSON, one leave per line, from a sync iterator over
+    # WSGI so the server sends rows as they are read
+    response = client.get("/api/leaves", {"stream": "ndjson"},
+                          HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert not response.is_async
+    lines = read_streaming_content(response).decode().splitlines()
+    assert [json.loads(line)["start_date"] for line in lines] == [
+        "2024-03-01", "2024-03-08", "2024-03-15"
+    ]
+
+    # Chunked JSON array keeps the usual response shape
+    response = client.get("/api/leaves", {"stream": "json"},
+                          HTTP_X_CSRFTOKEN=csrf_token)
+    data = json.loads(read_streaming_content(response))
+    assert data["success"] is True
+    assert len(data["leaves"]) == 3
+
+    # Over ASGI the rows come from the async iterator
+    async_client = AsyncClient()
+    async_client.cookies = client.cookies
+    response = async_to_sync(async_client.get)("/api/leaves", {"stream": "ndjson"},
+                                               headers={"X-CSRFToken": csrf_token})
+    assert response.is_async
+    assert len(read_streaming_content(response).decode().splitlines()) == 3
+
 @pytest.mark.django_db
 def test_get_employee_leaves(client, csrf_token, hr_user, test_employee):
     # Login first
@@ -120,8 +254,8 @@ def test_create_leave(client, csrf_token, hr_user, test_employee):
     payload = {
         "employee_username": test_employee.username,
         "number_of_days": 5,
-        "start_date": str(date.today()),
-        "end_date": str(date.today() + timedelta(days=5)),
+        "start_date": "2024-01-08",  # Monday to Friday, 5 working days
+        "end_date": "2024-01-12",
         "approvable": True
     }
 
@@ -150,8 +284,8 @@ def test_create_leave_validation(client, csrf_token, hr_user, test_employee):
     payload = {
         "employee_username": test_employee.username,
         "number_of_days": 5,
-        "start_date": str(date.today()),
-        "end_date": str(date.today() + timedelta(days=5)),
+        "start_date": "2024-01-08",  # Monday to Friday, 5 working days
+        "end_date": "2024-01-12",
         "approvable": True
     }
     response = client.post("/api/leaves/create",
@@ -166,8 +300,8 @@ def test_create_leave_validation(client, csrf_token, hr_user, test_employee):
     employee = Employee.objects.get(username=test_employee)
     leave = Leave.objects.get(employee=employee)
     assert leave.number_of_days == 5
-    assert leave.start_date == date.today()
-    assert leave.end_date == date.today() + timedelta(days=5)
+    assert leave.start_date == date(2024, 1, 8)
+    assert leave.end_date == date(2024, 1, 12)
     assert leave.approvable is True
 
     # Test case 2: Invalid employee username
@@ -183,8 +317,8 @@ def test_create_leave_validation(client, csrf_token, hr_user, test_employee):
 
     # Test case 3: End date before start date
     payload["employee_username"] = test_employee.username
-    payload["start_date"] = str(date.today())
-    payload["end_date"] = str(date.today() - timedelta(days=1))
+    payload["start_date"] = "2024-02-05"
+    payload["end_date"] = "2024-02-04"
     response = client.post("/api/leaves/create",
                           payload,
                           content_type="application/json",
@@ -192,3 +326,396 @@ def test_create_leave_validation(client, csrf_token, hr_user, test_employee):
     
     assert response.status_code == 200
     assert response.json()["success"] is False  # Should fail validation
+
+@pytest.mark.django_db
+def test_create_leave_overlap(test_employee):
+    """Overlapping leaves of the same employee are rejected."""
+    first = create_leave(test_employee.username, 3, date(2024, 5, 6), date(2024, 5, 8))
+    assert first is not None
+
+    # Overlapping the end, the start, or fully inside the existing leave
+    assert create_leave(test_employee.username, 2, date(2024, 5, 8), date(2024, 5, 9)) is None
+    assert create_leave(test_employee.username, 2, date(2024, 5, 3), date(2024, 5, 6)) is None
+    assert create_leave(test_employee.username, 1, date(2024, 5, 7), date(2024, 5, 7)) is None
+
+    # Adjacent leaves are fine
+    assert create_leave(test_employee.username, 1, date(2024, 5, 9), date(2024, 5, 9)) is not None
+    assert create_leave(test_employee.username, 1, date(2024, 5, 3), date(2024, 5, 3)) is not None
+    assert Leave.objects.filter(employee__username=test_employee).count() == 3
+
+    # At most a year per leave
+    assert create_leave(test_employee.username, 0, date(2025, 1, 1), date(2025, 12, 31)) is not None
+    assert create_leave(test_employee.username, 0, date(2026, 1, 1), date(2027, 1, 2)) is None
+    assert create_leave(test_employee.username, 0, date(1, 1, 1), date(9998, 12, 31)) is None
+
+
+@pytest.mark.django_db
+def test_no_overlap_migration_reports_existing_overlaps(test_employee):
+    migration = importlib.import_module("main.migrations.0005_leave_no_overlap")
+    employee = Employee.objects.get(username=test_employee)
+    # Rows written before overlaps were checked (bulk_create skips the checks)
+    Leave.objects.bulk_create([
+        Leave(employee=employee, number_of_days=5, start_date=date(2024, 5, 6), end_date=date(2024, 5, 10)),
+        Leave(employee=employee, number_of_days=1, start_date=date(2024, 5, 13), end_date=date(2024, 5, 13)),
+    ])
+    migration.check_no_overlapping_leaves(django_apps, None)
+
+    inside = Leave.objects.bulk_create([
+        Leave(employee=employee, number_of_days=1, start_date=date(2024, 5, 8), end_date=date(2024, 5, 8)),
+    ])[0]
+    with pytest.raises(RuntimeError, match=f"(?s)1 overlapping leaves .*overlaps leave {inside.id}"):
+        migration.check_no_overlapping_leaves(django_apps, None)
+
+
+def test_interval_set():
+    intervals = IntervalSet([(date(2024, 1, 10), date(2024, 1, 12)), (date(2024, 1, 1), date(2024, 1, 3))])
+    assert intervals.overlaps(date(2024, 1, 3), date(2024, 1, 4))
+    assert intervals.overlaps(date(2023, 12, 1), date(2024, 2, 1))
+    assert not intervals.overlaps(date(2024, 1, 4), date(2024, 1, 9))
+    assert intervals.add(date(2024, 1, 5), date(2024, 1, 6))
+    assert not intervals.add(date(2024, 1, 6), date(2024, 1, 10))
+    assert len(intervals) == 3
+
+
+@pytest.mark.django_db
+def test_leave_days_skip_weekends_and_holidays(test_employee, django_capture_on_commit_callbacks):
+    """number_of_days is computed from the dates, not taken from the caller."""
+    with django_capture_on_commit_callbacks(execute=True):
+        Holiday.objects.create(name="Republic Day", date=date(2024, 1, 26))  # Friday
+
+    # Monday 2024-01-22 to Monday 2024-01-29: 6 weekdays minus the holiday
+    leave = create_leave(test_employee.username, 99, date(2024, 1, 22), date(2024, 1, 29))
+    assert leave.number_of_days == 5
+
+    # Across a year boundary: Fri 2024-12-27 .. Thu 2025-01-02 has 5 weekdays
+    assert working_days_between(date(2024, 12, 27), date(2025, 1, 2)) == 5
+    assert working_days_batch([
+        (date(2024, 1, 6), date(2024, 1, 7)),    # A weekend
+        (date(2024, 1, 1), date(2024, 12, 31)),  # 2024 has 262 weekdays
+        (date(2024, 1, 9), date(2024, 1, 8)),    # End before start
+    ]) == [0, 261, 0]
+
+    # Recalculation corrects stale counts after the calendar changes
+    with django_capture_on_commit_callbacks(execute=True):
+        Holiday.objects.filter(date=date(2024, 1, 26)).delete()
+    assert recalculate_leave_days() == 1
+    leave.refresh_from_db()
+    assert leave.number_of_days == 6
+
+
+@pytest.mark.django_db
+def test_leave_balance_ledger(client, csrf_token, hr_user, test_employee):
+    # Mon-Fri, approved, then Mon-Wed pending the week after
+    approved = create_leave(test_employee.username, 0, date(2024, 3, 4), date(2024, 3, 8), approvable=True)
+    create_leave(test_employee.username, 0, date(2024, 3, 11), date(2024, 3, 13))
+    # Spanning the new year: 2 days in 2024 (Mon 30, Tue 31) and 3 in 2025
+    create_leave(test_employee.username, 0, date(2024, 12, 30), date(2025, 1, 3), approvable=True)
+
+    balance = LeaveBalance.objects.get(employee__username=test_employee, year=2024)
+    assert (balance.taken, balance.pending) == (7, 3)
+    assert LeaveBalance.objects.get(employee__username=test_employee, year=2025).taken == 3
+
+    # Updates move days between columns, deletes give them back
+    approved.approvable = False
+    approved.save()
+    balance.refresh_from_db()
+    assert (balance.taken, balance.pending) == (2, 8)
+    approved.delete()
+    balance.refresh_from_db()
+    assert (balance.taken, balance.pending) == (2, 3)
+
+    # Rebuilding from scratch gives the same ledger
+    rebuild_leave_balances()
+    balance.refresh_from_db()
+    assert (balance.taken, balance.pending) == (2, 3)
+
+    # So does the backfill of the migration creating the ledger
+    LeaveBalance.objects.all().delete()
+    importlib.import_module("main.migrations.0006_leavebalance").backfill_leave_balances(django_apps, None)
+    balance = LeaveBalance.objects.get(employee__username=test_employee, year=2024)
+    assert (balance.taken, balance.pending) == (2, 3)
+    assert LeaveBalance.objects.get(employee__username=test_employee, year=2025).taken == 3
+
+    # Balances by employee or by department
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+    response = client.get("/api/leave-balances", {"year": 2024, "department": "IT"},
+                          HTTP_X_CSRFTOKEN=csrf_token)
+    data = response.json()
+    assert data["success"] is True
+    assert data["balances"][0]["taken"] == 2
+    assert data["balances"][0]["remaining"] == data["balances"][0]["entitlement"] - 2
+    response = client.get("/api/leave-balances",
+                          {"year": 2023, "username": test_employee.username},
+                          HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.json()["balances"][0]["taken"] == 0
+
+
+@pytest.mark.django_db
+def test_get_user_leaves_query_budget(test_employee, query_budget):
+    employee = Employee.objects.get(username=test_employee)
+    Leave.objects.bulk_create([
+        Leave(employee=employee, number_of_days=1,
+              start_date=date(2024, 1, 1) + timedelta(days=7 * i),
+              end_date=date(2024, 1, 1) + timedelta(days=7 * i))
+        for i in range(10)
+    ])
+
+    # The user lookup and one page of leaves joined with their employee,
+    # however many leaves there are
+    with query_budget(2, max_repeats=1):
+        leaves, _ = get_user_leaves(test_employee.username, "EMPLOYEE")
+    assert len(leaves) == 10
+
+
+@pytest.mark.django_db
+def test_query_budget_exceeded(test_employee):
+    @query_budget(2, max_repeats=2)
+    def n_plus_one():
+        return [leave.employee.first_name for leave in Leave.objects.all()]
+
+    employee = Employee.objects.get(username=test_employee)
+    for i in range(3):
+        Leave.objects.create(employee=employee, number_of_days=1,
+                             start_date=date(2024, 2, 5 + i * 7), end_date=date(2024, 2, 5 + i * 7))
+
+    with pytest.raises(QueryBudgetExceeded) as excinfo:
+        n_plus_one()
+    assert "4 queries run, the budget is 2" in str(excinfo.value)
+    assert "the same query ran 3 times" in str(excinfo.value)
+
+
+@pytest.mark.django_db
+def test_repeated_query_detector_logs_stack(test_employee, caplog):
+    employee = Employee.objects.get(username=test_employee)
+    for i in range(3):
+        Leave.objects.create(employee=employee, number_of_days=1,
+                             start_date=date(2024, 2, 5 + i * 7), end_date=date(2024, 2, 5 + i * 7))
+
+    with caplog.at_level("WARNING", logger="main.queries"):
+        with recording(RepeatedQueryDetector("test", threshold=3)):
+            [leave.employee.first_name for leave in Leave.objects.all()]
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert "the same query ran 3 times" in message
+    assert "test_holiday_leave_apis.py" in message
+
+
+@pytest.mark.django_db
+def test_import_leaves(client, csrf_token, hr_user, test_employee, django_assert_max_num_queries):
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    employee = Employee.objects.get(username=test_employee)
+    Leave.objects.create(employee=employee, number_of_days=1,
+                         start_date=date(2024, 1, 3), end_date=date(2024, 1, 3))
+
+    payload = [
+        {"employee_username": test_employee.username, "start_date": "2024-01-08",
+         "end_date": "2024-01-12", "approvable": True},
+        # Overlaps the row above
+        {"employee_username": test_employee.username, "start_date": "2024-01-12",
+         "end_date": "2024-01-15"},
+        # Overlaps the existing leave
+        {"employee_username": test_employee.username, "start_date": "2024-01-02",
+         "end_date": "2024-01-04"},
+        {"employee_username": "nobody", "start_date": "2024-01-08", "end_date": "2024-01-08"},
+        {"employee_username": test_employee.username, "start_date": "2024-02-09",
+         "end_date": "2024-02-01"},
+        {"employee_username": test_employee.username, "start_date": "2024-13-01",
+         "end_date": "2024-13-02"},
+        {"start_date": "2024-03-01", "end_date": "2024-03-01"},
+        {"employee_username": test_employee.username, "start_date": "2024-12-30",
+         "end_date": "2025-01-03"},
+        {"employee_username": test_employee.username, "start_date": "0001-01-01",
+         "end_date": "9998-12-31"},
+    ]
+    # The number of queries does not grow with the number of rows
+    with django_assert_max_num_queries(15):
+        response = client.post("/api/leaves/import", payload,
+                               content_type="application/json",
+                               HTTP_X_CSRFTOKEN=csrf_token)
+    data = response.json()
+    assert data["success"] is True
+    assert data["message"] == "2 leaves created"
+    results = data["results"]
+    assert [result["row"] for result in results] == list(range(1, 10))
+    assert results[0] == {"row": 1, "success": True, "number_of_days": 5}
+    assert results[1]["errors"] == ["overlaps another leave of the employee"]
+    assert results[2]["errors"] == ["overlaps another leave of the employee"]
+    assert results[3]["errors"] == ["employee_username: 'nobody' not found"]
+    assert results[4]["errors"] == ["end_date: must not be before start_date"]
+    assert "start_date: invalid date" in results[5]["errors"][0]
+    assert results[6]["errors"][0].startswith("employee_username:")
+    assert results[7] == {"row": 8, "success": True, "number_of_days": 5}
+    assert results[8]["errors"] == ["end_date: a leave covers at most 366 days"]
+
+    assert Leave.objects.filter(employee=employee).count() == 3
+    # The ledger was updated for both years
+    balances = {b.year: (b.taken, b.pending) for b in LeaveBalance.objects.filter(employee=employee)}
+    assert balances[2024] == (5, 1 + 2)
+    assert balances[2025] == (0, 3)
+
+
+@pytest.mark.django_db
+def test_import_leaves_csv(client, csrf_token, hr_user, test_employee):
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    csv_file = SimpleUploadedFile(
+        "leaves.csv",
+        f"employee_username,start_date,end_date,approvable\n"
+        f"{test_employee.username},2024-04-01,2024-04-02,true\n"
+        f"{test_employee.username},2024-04-08,2024-04-08,\n".encode(),
+        content_type="text/csv",
+    )
+    response = client.post("/api/leaves/import/csv", {"file": csv_file},
+                           HTTP_X_CSRFTOKEN=csrf_token)
+    data = response.json()
+    assert data["success"] is True
+    assert [result["success"] for result in data["results"]] == [True, True]
+    leaves = Leave.objects.filter(employee__username=test_employee).order_by("start_date")
+    assert [(leave.number_of_days, leave.approvable) for leave in leaves] == [(2, True), (1, False)]
+
+
+
+@pytest.mark.django_db
+def test_import_holidays(client, csrf_token, hr_user, test_employee):
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+    leave = create_leave(test_employee.username, 0, "2024-04-01", "2024-04-05")
+    assert leave.number_of_days == 5
+    Holiday.objects.create(name="Old Name", date=date(2024, 4, 3))
+
+    rows = [
+        {"name": "Founders Day", "date": "2024-04-03"},
+        {"name": "Founders Day", "date": "2024-04-03"},  # Repeated in the upload
+        {"name": "Old Name", "date": "2024-04-03"},  # Already stored
+        {"name": "Labour Day", "date": "2025-05-01"},
+        {"name": "", "date": "2025-05-02"},
+        {"name": "Bad Day", "date": "02/05/2025"},
+        {"date": "2025-05-03"},
+    ]
+    response = client.post("/api/holidays/import", rows, content_type="application/json",
+                           HTTP_X_CSRFTOKEN=csrf_token)
+    data = response.json()
+    assert data["success"] is True
+    assert data["message"] == "2 holidays created"
+    assert data["existing"] == 2
+    assert [error["row"] for error in data["errors"]] == [5, 6, 7]
+    # April 3rd was a holiday already (under another name): the leave is unchanged
+    assert data["leaves_updated"] == 0
+
+    csv_file = SimpleUploadedFile(
+        "holidays.csv", b"name,date\nSpring Break,2024-04-04\nLabour Day,2025-05-01\n",
+        content_type="text/csv",
+    )
+    data = client.post("/api/holidays/import/csv", {"file": csv_file},
+                       HTTP_X_CSRFTOKEN=csrf_token).json()
+    assert (data["message"], data["existing"], data["leaves_updated"]) == ("1 holidays created", 1, 1)
+    leave.refresh_from_db()
+    assert leave.number_of_days == 3
+
+    # The cached holiday list and calendar see the imported holidays
+    holidays = client.get("/api/holidays", {"year": 2025}, HTTP_X_CSRFTOKEN=csrf_token).json()["holidays"]
+    assert holidays == [{"name": "Labour Day", "date": "2025-05-01"}]
+
+
+@pytest.mark.django_db
+def test_import_holidays_ics(client, csrf_token, hr_user):
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+
+    ics = (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "BEGIN:VEVENT\r\n"
+        "DTSTART;VALUE=DATE:20251225\r\n"
+        "DTEND;VALUE=DATE:20251227\r\n"
+        "SUMMARY;LANGUAGE=en:Christmas\\, Boxing\r\n"
+        "  Day\r\n"
+        "END:VEVENT\r\n"
+        "BEGIN:VEVENT\r\n"
+        "DTSTART:20260101T000000Z\r\n"
+        "SUMMARY:New Year\r\n"
+        "END:VEVENT\r\n"
+        "BEGIN:VEVENT\r\n"
+        "DTSTART:tomorrow\r\n"
+        "SUMMARY:Broken\r\n"
+        "END:VEVENT\r\n"
+        "END:VCALENDAR\r\n"
+    )
+    ics_file = SimpleUploadedFile("holidays.ics", ics.encode(), content_type="text/calendar")
+    data = client.post("/api/holidays/import/ics", {"file": ics_file},
+                       HTTP_X_CSRFTOKEN=csrf_token).json()
+    assert data["success"] is True
+    assert data["message"] == "3 holidays created"
+    assert len(data["errors"]) == 1
+    assert list(Holiday.objects.order_by("date").values_list("name", "date")) == [
+        ("Christmas, Boxing Day", date(2025, 12, 25)),
+        ("Christmas, Boxing Day", date(2025, 12, 26)),
+        ("New Year", date(2026, 1, 1)),
+    ]
+
+
+@pytest.mark.django_db
+def test_absence_heatmap(client, csrf_token, hr_user, test_employee, django_assert_num_queries,
+                         django_capture_on_commit_callbacks):
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+    colleague = create_employee_user("Other", "Employee", "other@example.com", "1", "IT",
+                                     "1990-01-01", "2023-01-01")
+    outsider = create_employee_user("Sam", "Sales", "sam@example.com", "1", "Sales",
+                                    "1990-01-01", "2023-01-01")
+    create_leave(test_employee.username, 0, "2024-01-29", "2024-02-02", approvable=True)
+    create_leave(colleague.username, 0, "2024-02-01", "2024-02-05")
+    create_leave(outsider.username, 0, "2024-02-01", "2024-02-01", approvable=True)
+    Holiday.objects.create(name="Founders Day", date=date(2024, 2, 5))
+
+    params = {"start": "2024-01-31", "end": "2024-02-05", "department": "IT"}
+    # Session, user, the holiday list, then one leave query for both months
+    with django_assert_num_queries(4):
+        data = client.get("/api/absences/heatmap", params, HTTP_X_CSRFTOKEN=csrf_token).json()
+    assert data["success"] is True
+    assert [(day["date"], day["absent"], day["pending"]) for day in data["days"]] == [
+        ("2024-01-31", 1, 0),
+        ("2024-02-01", 1, 1),
+        ("2024-02-02", 1, 1),
+        ("2024-02-03", 0, 1),
+        ("2024-02-04", 0, 1),
+        ("2024-02-05", 0, 1),
+    ]
+    assert [day["weekend"] for day in data["days"]] == [False, False, False, True, True, False]
+    assert data["days"][-1]["holiday"] == "Founders Day"
+
+    # Cached per month until the leaves change
+    with django_assert_num_queries(2):
+        client.get("/api/absences/heatmap", params, HTTP_X_CSRFTOKEN=csrf_token)
+    with django_capture_on_commit_callbacks(execute=True):
+        Leave.objects.filter(employee__username=colleague).delete()
+    data = client.get("/api/absences/heatmap", params, HTTP_X_CSRFTOKEN=csrf_token).json()
+    assert [day["pending"] for day in data["days"]] == [0] * 6
+
+    # A project manager's team
+    manager = create_project_manager_user("Pam", "Manager", "pam@example.com", "1", "IT", "1980-01-01")
+    Employee.objects.filter(username=outsider).update(reporting_manager=manager.manager_profile)
+    data = client.get("/api/absences/heatmap", {"start": "2024-02-01", "end": "2024-02-02",
+                                                "manager": manager.username},
+                      HTTP_X_CSRFTOKEN=csrf_token).json()
+    assert [day["absent"] for day in data["days"]] == [1, 0]
+
+    data = client.get("/api/absences/heatmap", {"start": "2024-02-01", "end": "2024-02-01"},
+                      HTTP_X_CSRFTOKEN=csrf_token).json()
+    assert data == {"success": False, "message": "Provide either a department or a manager"}
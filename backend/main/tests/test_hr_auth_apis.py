@@ -1,8 +1,16 @@
 import datetime
 import pytest
-from django.test import Client
-from main.utils import create_hr_user
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from main.cache import bump_collection_version, cached_collection
+from main.utils import create_hr_user, create_employee_user, create_project_manager_user
+from main.usernames import allocate_usernames
+from main.metrics import connection_stats, registry
+from main.middleware import ReplicaRoutingMiddleware
 from main.models import HR, User
+from main.routers import ReplicaRouter
 
 
 @pytest.fixture
@@ -198,3 +206,132 @@ def test_update_hr_profile(client, csrf_token, hr_user):
     assert profile_data["first_name"] == "Updated"
     assert profile_data["last_name"] == "Name"
     assert profile_data["branch"] == "New Branch"
+
+
+@pytest.mark.django_db
+def test_usernames_never_collide():
+    """Test that users sharing a first name get distinct usernames."""
+    first = create_employee_user(
+        first_name="John",
+        last_name="One",
+        email="john.one@example.com",
+        phone_number="1",
+        department="IT",
+        birthday="1990-01-01",
+        date_of_joining="2023-01-01",
+    )
+    second = create_project_manager_user(
+        first_name="John",
+        last_name="Two",
+        email="john.two@example.com",
+        phone_number="2",
+        department="IT",
+        birthday="1990-01-01",
+    )
+    assert first.username != second.username
+
+    # Bulk allocation hands out consecutive, distinct names per prefix
+    usernames = allocate_usernames(["john", "mary", "john"])
+    assert len(set(usernames + [first.username, second.username])) == 5
+    assert usernames[0].startswith("john_") and usernames[1].startswith("mary_")
+
+    # Two HRs with the same first name in the same branch
+    hr_a = create_hr_user("Sam", "A", "sam.a@example.com", "Main Branch", "1990-01-01", "pw_a_123456")
+    hr_b = create_hr_user("Sam", "B", "sam.b@example.com", "Main Branch", "1990-01-01", "pw_b_123456")
+    assert hr_a.username != hr_b.username
+    assert User.objects.filter(username__startswith="sam_main_branch").count() == 2
+
+
+@pytest.mark.django_db
+def test_metrics(client, csrf_token, hr_user, settings):
+    registry.reset()
+    client.post("/api/login",
+                {"username": hr_user.username, "password": "test_password"},
+                content_type="application/json")
+    client.cookies["csrftoken"] = csrf_token
+    client.get("/api/hrs", HTTP_X_CSRFTOKEN=csrf_token)  # async view
+    client.get("/api/hrs", HTTP_X_CSRFTOKEN=csrf_token)
+    client.get("/api/hr/nobody", HTTP_X_CSRFTOKEN=csrf_token)
+
+    response = client.get("/api/metrics")
+    assert response["Content-Type"].startswith("text/plain")
+    lines = response.content.decode().splitlines()
+    assert 'http_requests_total{method="GET",route="api/hrs",status="200"} 2' in lines
+    assert 'http_request_duration_seconds_count{method="GET",route="api/hrs"} 2' in lines
+    assert 'http_request_duration_seconds_bucket{method="GET",route="api/hrs",le="+Inf"} 2' in lines
+    # Queries of the async view are attributed to its route
+    queries = next(line for line in lines if line.startswith('db_queries_total{method="GET",route="api/hrs"}'))
+    assert int(queries.split()[-1]) >= 4
+    assert any(line.startswith('http_requests_total{method="GET",route="api/hr/<username>"')
+               for line in lines)
+
+    # Without a token only HR sessions may read them (DEBUG is off in tests)
+    assert Client().get("/api/metrics").json() == {"success": False, "message": "Unauthorized"}
+    settings.DEBUG = True
+    assert Client().get("/api/metrics").status_code == 200
+    settings.DEBUG = False
+
+    # A token protects the endpoint when configured
+    settings.METRICS_TOKEN = "secret"
+    assert client.get("/api/metrics").json() == {"success": False, "message": "Unauthorized"}
+    response = client.get("/api/metrics", HTTP_AUTHORIZATION="Bearer secret")
+    assert response.status_code == 200
+
+
+def test_connection_metrics(monkeypatch):
+    connection_stats.reset()
+    connection_created.send(sender=None, connection=connection)
+    lines = connection_stats.render().splitlines()
+    assert 'db_connects_total{alias="default"} 1' in lines
+    assert not any(line.startswith("db_pool_") for line in lines)
+
+    # With a pool, its statistics are exposed too (counters at 0 are left out by psycopg_pool)
+    monkeypatch.setattr(connection_stats, "pool_stats",
+                        lambda: {"default": {"pool_size": 4, "pool_max": 10, "requests_wait_ms": 1500}})
+    lines = connection_stats.render().splitlines()
+    assert 'db_pool_size{alias="default"} 4' in lines
+    assert 'db_pool_checkouts_total{alias="default"} 0' in lines
+    assert 'db_pool_wait_seconds_total{alias="default"} 1.500000' in lines
+
+
+def test_replica_routing(settings):
+    settings.DATABASES = {**settings.DATABASES, "replica": {**settings.DATABASES["default"]}}
+    router = ReplicaRouter()
+    routed = []
+
+    def view(request):
+        routed.append(router.db_for_read(User))
+        if request.GET.get("write"):
+            router.db_for_write(User)
+            routed.append(router.db_for_read(User))
+        if request.GET.get("cache"):
+            bump_collection_version("replica_test")
+            cached_collection("replica_test", "all", lambda: routed.append(router.db_for_read(User)) or 1)
+            routed.append(router.db_for_read(User))
+        return HttpResponse()
+
+    middleware = ReplicaRoutingMiddleware(view)
+    factory = RequestFactory()
+
+    # GET requests read from the replica until they write
+    middleware(factory.get("/api/employees"))
+    middleware(factory.get("/api/employees", {"write": "1"}))
+    assert routed == ["replica", "replica", None]
+
+    # Cache fills read from the primary, the replica may lag behind the version
+    routed.clear()
+    middleware(factory.get("/api/employees", {"cache": "1"}))
+    assert routed == ["replica", None, "replica"]
+
+    # Other methods use the primary and keep the client on it for a while
+    routed.clear()
+    response = middleware(factory.post("/api/employees/create"))
+    assert response.cookies["use_primary"]["max-age"] == settings.REPLICA_STICKY_SECONDS
+    request = factory.get("/api/employees")
+    request.COOKIES["use_primary"] = "1"
+    middleware(request)
+    assert routed == [None, None]
+
+    # Outside a request nothing goes to the replica
+    assert router.db_for_read(User) is None
+    assert router.allow_migrate("replica", "main") is False
@@ -1,6 +1,10 @@
 import pytest
+from datetime import date
 from django.test import Client
-from main.models import ProjectManager
+from main.cache import has_collection_state
+from main.hierarchy import get_team
+from main.models import Employee, Leave, LeaveBalance, ProjectManager, User
+from main.utils import create_employee_user, create_project_manager_user, update_employee
 from main.tests.test_hr_auth_apis import csrf_token, hr_user  # Reuse fixtures
 
 
@@ -154,4 +158,105 @@ def test_get_all_project_managers(client, csrf_token, hr_user):
     assert response.status_code == 200
     data = response.json()
     assert data["success"] is True
-    assert len(data["project_managers"]) == 2
\ No newline at end of file
+    assert len(data["project_managers"]) == 2
+
+@pytest.mark.django_db
+def test_project_manager_team_and_org_chart(client, csrf_token, hr_user, django_assert_num_queries,
+                                            django_capture_on_commit_callbacks):
+    client.post(
+        "/api/login",
+        {"username": hr_user.username, "password": "test_password"},
+        content_type="application/json",
+    )
+    client.cookies["csrftoken"] = csrf_token
+
+    alice = create_project_manager_user("Alice", "Lead", "alice@example.com", "1", "Engineering", "1985-01-01")
+    bob = create_project_manager_user("Bob", "Lead", "bob@example.com", "2", "Sales", "1985-01-01")
+    employee = create_employee_user("Eve", "Member", "eve@example.com", "3", "Engineering", "1990-01-01", "2023-01-01")
+    update_employee(employee.username, reporting_manager=alice.username)
+
+    response = client.get(f"/api/project-managers/{alice.username}/team", HTTP_X_CSRFTOKEN=csrf_token)
+    data = response.json()
+    assert data["success"] is True
+    assert data["manager"]["email"] == "alice@example.com"
+    assert [emp["email"] for emp in data["team"]] == ["eve@example.com"]
+
+    # Served from the cache until the team changes
+    with django_assert_num_queries(0):
+        get_team(alice.username)
+
+    # Moving the employee invalidates both teams once committed
+    with django_capture_on_commit_callbacks(execute=True):
+        update_employee(employee.username, reporting_manager=bob.username)
+    assert get_team(alice.username)["team"] == []
+    assert [emp["email"] for emp in get_team(bob.username)["team"]] == ["eve@example.com"]
+
+    response = client.get("/api/org-chart", HTTP_X_CSRFTOKEN=csrf_token)
+    chart = response.json()
+    teams = {pm["email"]: [emp["email"] for emp in pm["team"]] for pm in chart["managers"]}
+    assert teams == {"alice@example.com": [], "bob@example.com": ["eve@example.com"]}
+    assert chart["unassigned"] == []
+
+    response = client.get("/api/project-managers/nobody/team", HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.json()["success"] is False
+    assert not has_collection_state("team:nobody")
+
+
+@pytest.mark.django_db
+def test_offboard(client, csrf_token, hr_user, django_capture_on_commit_callbacks):
+    client.post(
+        "/api/login",
+        {"username": hr_user.username, "password": "test_password"},
+        content_type="application/json",
+    )
+    client.cookies["csrftoken"] = csrf_token
+
+    sales_pm = create_project_manager_user("Sam", "Sales", "sam@example.com", "1", "Sales", "1980-01-01")
+    it_pm = create_project_manager_user("Ivy", "It", "ivy@example.com", "2", "IT", "1981-01-01")
+    leaving = create_employee_user("Lea", "Sales", "lea@example.com", "3", "Sales", "1990-01-01", "2020-01-01")
+    staying = create_employee_user("Stan", "It", "stan@example.com", "4", "IT", "1991-01-01", "2020-01-01")
+    other = create_employee_user("Otto", "It", "otto@example.com", "5", "IT", "1992-01-01", "2020-01-01")
+    update_employee(leaving.username, reporting_manager=sales_pm.username)
+    update_employee(staying.username, reporting_manager=sales_pm.username)
+    update_employee(other.username, reporting_manager=it_pm.username)
+    Leave.objects.create(employee=Employee.objects.get(username=leaving), number_of_days=1,
+                         start_date=date(2024, 1, 8), end_date=date(2024, 1, 8))
+    Leave.objects.create(employee=Employee.objects.get(username=staying), number_of_days=1,
+                         start_date=date(2024, 1, 8), end_date=date(2024, 1, 8))
+    assert get_team(sales_pm.username) is not None  # cached
+
+    # The per-row receivers stay quiet, the caches are invalidated once
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = client.post("/api/offboard", {"department": "Sales"},
+                               content_type="application/json", HTTP_X_CSRFTOKEN=csrf_token)
+    assert callbacks == []
+    data = response.json()
+    assert data["success"] is True
+    assert data["employees"] == [leaving.username]
+    assert data["project_managers"] == [sales_pm.username]
+    assert data["leaves"] == 1
+    assert data["unassigned_employees"] == 1
+    assert data["not_found"] == []
+
+    assert not User.objects.filter(username__in=[leaving.username, sales_pm.username]).exists()
+    assert not LeaveBalance.objects.filter(employee__username__username=leaving.username).exists()
+    assert Employee.objects.get(username=staying).reporting_manager is None
+    assert Leave.objects.filter(employee__username=staying).count() == 1
+    assert get_team(sales_pm.username) is None
+    chart = client.get("/api/org-chart", HTTP_X_CSRFTOKEN=csrf_token).json()
+    assert [emp["username"] for emp in chart["unassigned"]] == [staying.username]
+
+    # By username: HR users and unknown names are reported as not found
+    response = client.post("/api/offboard",
+                           {"usernames": [other.username, it_pm.username, hr_user.username, "nobody"]},
+                           content_type="application/json", HTTP_X_CSRFTOKEN=csrf_token)
+    data = response.json()
+    assert data["employees"] == [other.username]
+    assert data["project_managers"] == [it_pm.username]
+    assert data["not_found"] == sorted([hr_user.username, "nobody"])
+    assert User.objects.filter(username=hr_user.username).exists()
+
+    response = client.post("/api/offboard", {},
+                           content_type="application/json", HTTP_X_CSRFTOKEN=csrf_token)
+    assert response.json() == {"success": False, "message": "Provide either usernames or a department"}
+
@@ -0,0 +1,86 @@
+from django.db import connection
+
+from .models import UsernameSequence
+
+# Prefixes are truncated so "<prefix>_<counter>" always fits User.username
+MAX_PREFIX_LENGTH = 130
+
+# Prefixes reserved per upsert statement during bulk allocation
+ALLOCATION_BATCH_SIZE = 500
+
+
+def employee_username_prefix(first_name):
+    """
+    Utility to build the username prefix for Employees and Project Managers.
+    Only letters and digits are kept, so these prefixes never contain an
+    underscore and cannot clash with the HR "<first_name>_<branch>" prefixes.
+    """
+    prefix = "".join(ch for ch in first_name.lower() if ch.isalnum())
+    return (prefix or "user")[:MAX_PREFIX_LENGTH]
+
+
+def hr_username_prefix(first_name, branch):
+    """Utility to build the "<first_name>_<branch>" username prefix for HRs."""
+    branch_slug = "".join(
+        ch for ch in branch.lower().replace(" ", "_") if ch.isalnum() or ch == "_"
+    )
+    return f"{employee_username_prefix(first_name)}_{branch_slug}"[:MAX_PREFIX_LENGTH]
+
+
+def _reserve(counts):
+    """
+    Bump the counter of every prefix in `counts` by the requested amount with a
+    single INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement, and return
+    the new last value of each prefix. The row lock taken by the upsert makes
+    concurrent reservations for the same prefix hand out disjoint blocks.
+
+    Rows are locked in the order of the VALUES list, so prefixes are sorted:
+    two reservations sharing prefixes then lock them in the same order and
+    cannot deadlock.
+    """
+    table = connection.ops.quote_name(UsernameSequence._meta.db_table)
+    values = ", ".join(["(%s, %s)"] * len(counts))
+    params = [item for prefix_count in sorted(counts.items()) for item in prefix_count]
+    sql = (
+        f"INSERT INTO {table} (prefix, last_value) VALUES {values} "
+        f"ON CONFLICT (prefix) DO UPDATE SET last_value = {table}.last_value + excluded.last_value "
+        f"RETURNING prefix, last_value"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return dict(cursor.fetchall())
+
+
+def allocate_usernames(prefixes):
+    """
+    Utility to hand out unique usernames for a list of prefixes.
+
+    Each distinct prefix gets a block of consecutive counters reserved in the
+    database in one statement, so allocation never needs retries or scans of
+    the User table, whether it is for one user or a bulk import.
+
+    Returns:
+        list: usernames of the form "<prefix>_<counter>", in the order of `prefixes`
+    """
+    counts = {}
+    for prefix in prefixes:
+        counts[prefix] = counts.get(prefix, 0) + 1
+
+    next_values = {}
+    # Sorted across batches too, see _reserve
+    items = sorted(counts.items())
+    for start in range(0, len(items), ALLOCATION_BATCH_SIZE):
+        batch = dict(items[start:start + ALLOCATION_BATCH_SIZE])
+        for prefix, last_value in _reserve(batch).items():
+            next_values[prefix] = last_value - batch[prefix] + 1
+
+    usernames = []
+    for prefix in prefixes:
+        usernames.append(f"{prefix}_{next_values[prefix]}")
+        next_values[prefix] += 1
+    return usernames
+
+
+def allocate_username(prefix):
+    """Utility to hand out a single unique username for a prefix."""
+    return allocate_usernames([prefix])[0]
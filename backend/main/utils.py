@@ -1,5 +1,94 @@
 from datetime import datetime
+from django.db import IntegrityError, transaction
 from .models import User, Employee, ProjectManager, HR, Holiday, Leave
+from .business_days import working_days_batch, working_days_between
+from .cache import acached_collection, bump_collection_version, cached_collection
+from .ledger import rebuild_leave_balances
+from .pagination import apaginate_queryset, paginate_queryset
+from .streaming import STREAM_CHUNK_SIZE
+from .usernames import allocate_username, employee_username_prefix, hr_username_prefix
+
+# Longest leave accepted, in calendar days. Longer ranges are input errors and
+# would make every day count and the ledger touch one calendar year each.
+MAX_LEAVE_DAYS = 366
+
+
+# --------------------- Serialization helpers --------------------- #
+
+def hr_to_dict(hr):
+    """Utility to convert an HR profile (with its user selected) to a dict."""
+    return {
+        "username": hr.username.username,
+        "first_name": hr.first_name,
+        "last_name": hr.last_name,
+        "email": hr.email,
+        "branch": hr.branch,
+        "birthday": str(hr.birthday) if hr.birthday else None
+    }
+
+
+def employee_to_dict(emp):
+    """Utility to convert an Employee profile (with its user selected) to a dict."""
+    return {
+        "username": emp.username.username,
+        "first_name": emp.first_name,
+        "last_name": emp.last_name,
+        "email": emp.email,
+        "department": emp.department,
+        "date_of_joining": str(emp.date_of_joining),
+        "phone_number": emp.phone_number,
+        "birthday": str(emp.birthday) if emp.birthday else None
+    }
+
+
+def project_manager_to_dict(pm):
+    """Utility to convert a Project Manager profile (with its user selected) to a dict."""
+    return {
+        "username": pm.username.username,
+        "first_name": pm.first_name,
+        "last_name": pm.last_name,
+        "email": pm.email,
+        "department": pm.department,
+        "phone_number": pm.phone_number,
+        "birthday": str(pm.birthday) if pm.birthday else None
+    }
+
+
+def leave_to_dict(leave):
+    """Utility to convert a Leave (with its employee selected) to a dict."""
+    return {
+        "employee_name": f"{leave.employee.first_name} {leave.employee.last_name}",
+        "number_of_days": leave.number_of_days,
+        "start_date": str(leave.start_date),
+        "end_date": str(leave.end_date),
+        "approvable": leave.approvable
+    }
+
+
+# --------------------- Partial update helpers --------------------- #
+
+def _apply_changes(instance, changes):
+    """
+    Set every non-empty value of `changes` on `instance` and return the names
+    of the fields whose value actually changed.
+    """
+    changed = []
+    for field, value in changes.items():
+        if value and str(getattr(instance, field)) != str(value):
+            setattr(instance, field, value)
+            changed.append(field)
+    return changed
+
+
+def _save_changes(user, user_fields, profile, profile_fields):
+    """Write only the changed columns of a user and its profile, atomically."""
+    if not user_fields and not profile_fields:
+        return
+    with transaction.atomic():
+        if user_fields:
+            user.save(update_fields=user_fields)
+        if profile_fields:
+            profile.save(update_fields=profile_fields)
 
 
 # --------------------- Utility functions for HR --------------------- #
@@ -9,8 +98,8 @@ def create_hr_user(first_name, last_name, email, branch, birthday, password):
     """
     Utility to create an HR user and associate it with an HR profile.
     """
-    # Generate a username by combining first name and branch
-    username = f"{first_name.lower()}_{branch.lower().replace(' ', '_')}"  # Replace spaces with underscores in branch name
+    # Generate a unique username from the first name and branch
+    username = allocate_username(hr_username_prefix(first_name, branch))
 
     # Create the user
     user = User.objects.create_user(
@@ -45,52 +134,41 @@ def update_hr(
 ):
     """
     Utility to update HR data by username and update the associated User as well.
+    The profile and its user are read with one joined query and only the
+    columns that actually changed are written.
     """
     try:
-        user = User.objects.get(username=username, role="HR")
-        hr_profile = HR.objects.get(username=user)
-        
-        if first_name:
-            user.first_name = first_name
-            hr_profile.first_name = first_name
-        if last_name:
-            user.last_name = last_name
-            hr_profile.last_name = last_name
-        if email:
-            user.email = email
-            hr_profile.email = email
-        if branch:
-            hr_profile.branch = branch
-        if birthday:
-            hr_profile.birthday = birthday
-        
-        user.save()
-        hr_profile.save()
-        return hr_profile
-    except (User.DoesNotExist, HR.DoesNotExist):
+        hr_profile = HR.objects.select_related('username').get(
+            username__username=username, username__role="HR"
+        )
+    except HR.DoesNotExist:
         return None
 
-
-def get_all_hrs():
+    user = hr_profile.username
+    user_fields = _apply_changes(
+        user, {"first_name": first_name, "last_name": last_name, "email": email}
+    )
+    profile_fields = _apply_changes(hr_profile, {
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+        "branch": branch,
+        "birthday": birthday,
+    })
+    _save_changes(user, user_fields, hr_profile, profile_fields)
+    return hr_profile
+
+
+def get_all_hrs(limit=None, cursor=None):
     """
-    Utility to get all HR profiles with their user data.
-    Returns a list of HR profiles or empty list if none found.
+    Utility to get one page of HR profiles with their user data.
+    Returns a tuple of (list of HR profiles, cursor for the next page or None).
+    Raises InvalidCursor if the cursor cannot be decoded.
     """
-    try:
-        hrs = HR.objects.all().select_related('username')
-        hr_list = []
-        for hr in hrs:
-            hr_list.append({
-                "username": hr.username.username,
-                "first_name": hr.first_name,
-                "last_name": hr.last_name,
-                "email": hr.email,
-                "branch": hr.branch,
-                "birthday": str(hr.birthday) if hr.birthday else None
-            })
-        return hr_list
-    except Exception:
-        return []
+    hrs, next_cursor = paginate_queryset(
+        HR.objects.select_related('username'), "last_name", limit, cursor
+    )
+    return [hr_to_dict(hr) for hr in hrs], next_cursor
 
 def get_hr_by_username(username):
     """
@@ -100,14 +178,7 @@ def get_hr_by_username(username):
     try:
         user = User.objects.get(username=username, role="HR")
         hr = HR.objects.get(username=user)
-        return {
-            "username": hr.username.username,
-            "first_name": hr.first_name,
-            "last_name": hr.last_name,
-            "email": hr.email,
-            "branch": hr.branch,
-            "birthday": str(hr.birthday) if hr.birthday else None
-        }
+        return hr_to_dict(hr)
     except (User.DoesNotExist, HR.DoesNotExist):
         return None
 
@@ -128,8 +199,8 @@ def create_employee_user(
     """
     Utility to create an Employee user and associate it with an Employee profile.
     """
-    # Generate a username by combining first name and current date and time
-    username = f"{first_name.lower()}_{datetime.now().strftime('%y%m%d%H%M%S')}"
+    # Generate a unique username from the first name
+    username = allocate_username(employee_username_prefix(first_name))
 
     # Create the user
     user = User.objects.create_user(
@@ -169,36 +240,44 @@ def update_employee(
 ):
     """
     Utility to update Employee data by username and update the associated User as well.
+    The profile and its user are read with one joined query and only the
+    columns that actually changed are written.
+    Returns None if the employee (or the given reporting manager) does not exist.
     """
     try:
-        user = User.objects.get(username=username, role="EMPLOYEE")
-        employee_profile = Employee.objects.get(username=user)
-        if first_name:
-            user.first_name = first_name
-            employee_profile.first_name = first_name
-        if last_name:
-            user.last_name = last_name
-            employee_profile.last_name = last_name
-        if email:
-            user.email = email
-            employee_profile.email = email
-        if phone_number:
-            employee_profile.phone_number = phone_number
-        if department:
-            employee_profile.department = department
-        if birthday:
-            employee_profile.birthday = birthday
-        if date_of_joining:
-            employee_profile.date_of_joining = date_of_joining
-        if reporting_manager:
-            employee_profile.reporting_manager = reporting_manager
-
-        user.save()
-        employee_profile.save()
-        return employee_profile
-    except (User.DoesNotExist, Employee.DoesNotExist):
+        employee_profile = Employee.objects.select_related('username').get(
+            username__username=username, username__role="EMPLOYEE"
+        )
+    except Employee.DoesNotExist:
         return None
 
+    user = employee_profile.username
+    user_fields = _apply_changes(
+        user, {"first_name": first_name, "last_name": last_name, "email": email}
+    )
+    profile_fields = _apply_changes(employee_profile, {
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+        "phone_number": phone_number,
+        "department": department,
+        "birthday": birthday,
+        "date_of_joining": date_of_joining,
+    })
+
+    # The reporting manager is given by username
+    if reporting_manager:
+        try:
+            manager = ProjectManager.objects.get(username__username=reporting_manager)
+        except ProjectManager.DoesNotExist:
+            return None
+        if employee_profile.reporting_manager_id != manager.id:
+            employee_profile.reporting_manager = manager
+            profile_fields.append("reporting_manager")
+
+    _save_changes(user, user_fields, employee_profile, profile_fields)
+    return employee_profile
+
 
 # Utility function to delete employee data
 def delete_employee(username):
@@ -218,19 +297,25 @@ def delete_employee(username):
         return False
 
 
-def get_all_employees():
-    """Utility to get all employees with their user data."""
-    employees = Employee.objects.all().select_related('username')
-    return [{
-        "username": emp.username.username,
-        "first_name": emp.first_name,
-        "last_name": emp.last_name,
-        "email": emp.email,
-        "department": emp.department,
-        "date_of_joining": str(emp.date_of_joining),
-        "phone_number": emp.phone_number,
-        "birthday": str(emp.birthday) if emp.birthday else None
-    } for emp in employees]
+def get_all_employees(limit=None, cursor=None):
+    """
+    Utility to get one page of employees with their user data.
+    Returns a tuple of (list of employees, cursor for the next page or None).
+    """
+    employees, next_cursor = paginate_queryset(
+        Employee.objects.select_related('username'), "last_name", limit, cursor
+    )
+    return [employee_to_dict(emp) for emp in employees], next_cursor
+
+
+def iter_all_employees(chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Utility to lazily yield every employee as a dict, fetching rows from the
+    database in chunks so memory stays constant regardless of table size.
+    """
+    employees = Employee.objects.select_related('username').order_by("last_name", "id")
+    for emp in employees.iterator(chunk_size=chunk_size):
+        yield employee_to_dict(emp)
 
 
 # --------------------- Utility functions for Project Manager --------------------- #
@@ -242,8 +327,8 @@ def create_project_manager_user(
     """
     Utility to create a Project Manager user and associate it with a Project Manager profile.
     """
-    # Generate a username by combining first name and last name
-    username = f"{first_name.lower()}_{datetime.now().strftime('%y%m%d%H%M%S')}"
+    # Generate a unique username from the first name
+    username = allocate_username(employee_username_prefix(first_name))
 
     # Create the user
     user = User.objects.create_user(
@@ -279,31 +364,30 @@ def update_project_manager(
 ):
     """
     Utility to update Project manager data by username and update the associated User as well.
+    The profile and its user are read with one joined query and only the
+    columns that actually changed are written.
     """
     try:
-        user = User.objects.get(username=username, role="PROJECT_MANAGER")
-        project_manager_profile = ProjectManager.objects.get(username=user)
-        if first_name:
-            user.first_name = first_name
-            project_manager_profile.first_name = first_name
-        if last_name:
-            user.last_name = last_name
-            project_manager_profile.last_name = last_name
-        if email:
-            user.email = email
-            project_manager_profile.email = email
-        if phone_number:
-            project_manager_profile.phone_number = phone_number
-        if department:
-            project_manager_profile.department = department
-        if birthday:
-            project_manager_profile.birthday = birthday
-        
-        user.save()
-        project_manager_profile.save()
-        return project_manager_profile
-    except (User.DoesNotExist, project_manager_profile.DoesNotExist):
+        project_manager_profile = ProjectManager.objects.select_related('username').get(
+            username__username=username, username__role="PROJECT_MANAGER"
+        )
+    except ProjectManager.DoesNotExist:
         return None
+
+    user = project_manager_profile.username
+    user_fields = _apply_changes(
+        user, {"first_name": first_name, "last_name": last_name, "email": email}
+    )
+    profile_fields = _apply_changes(project_manager_profile, {
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+        "phone_number": phone_number,
+        "department": department,
+        "birthday": birthday,
+    })
+    _save_changes(user, user_fields, project_manager_profile, profile_fields)
+    return project_manager_profile
     
 
 # Utility function to delete project manager data
@@ -324,55 +408,91 @@ def delete_project_manager(username):
         return False
 
 
-def get_all_project_managers():
-    """Utility to get all project managers with their user data."""
-    managers = ProjectManager.objects.all().select_related('username')
-    return [{
-        "username": pm.username.username,
-        "first_name": pm.first_name,
-        "last_name": pm.last_name,
-        "email": pm.email,
-        "department": pm.department,
-        "phone_number": pm.phone_number,
-        "birthday": str(pm.birthday) if pm.birthday else None
-    } for pm in managers]
-
-def get_all_holidays():
-    """Utility to get all holidays."""
-    holidays = Holiday.objects.all()
-    return [{
-        "name": holiday.name,
-        "date": str(holiday.date)
-    } for holiday in holidays]
-
-def get_all_leaves():
-    """Utility to get all leaves."""
-    leaves = Leave.objects.all().select_related('employee')
-    return [{
-        "employee_name": f"{leave.employee.first_name} {leave.employee.last_name}",
-        "number_of_days": leave.number_of_days,
-        "start_date": str(leave.start_date),
-        "end_date": str(leave.end_date),
-        "approvable": leave.approvable
-    } for leave in leaves]
+def get_all_project_managers(limit=None, cursor=None):
+    """
+    Utility to get one page of project managers with their user data.
+    Returns a tuple of (list of project managers, cursor for the next page or None).
+    """
+    managers, next_cursor = paginate_queryset(
+        ProjectManager.objects.select_related('username'), "last_name", limit, cursor
+    )
+    return [project_manager_to_dict(pm) for pm in managers], next_cursor
+
+
+def iter_all_project_managers(chunk_size=STREAM_CHUNK_SIZE):
+    """Utility to lazily yield every project manager as a dict, in chunks."""
+    managers = ProjectManager.objects.select_related('username').order_by("last_name", "id")
+    for pm in managers.iterator(chunk_size=chunk_size):
+        yield project_manager_to_dict(pm)
+
+def get_all_holidays(year=None):
+    """
+    Utility to get all holidays, or only those of one year.
+    Served from the cache; the holiday signals invalidate it on every change.
+    """
+    def load():
+        holidays = Holiday.objects.order_by("date", "id")
+        if year is not None:
+            holidays = holidays.filter(date__year=year)
+        return [{
+            "name": holiday.name,
+            "date": str(holiday.date)
+        } for holiday in holidays]
+
+    return cached_collection("holidays", year if year is not None else "all", load)
+
+def get_all_leaves(limit=None, cursor=None):
+    """
+    Utility to get one page of leaves, ordered by start date.
+    Returns a tuple of (list of leaves, cursor for the next page or None).
+    """
+    leaves, next_cursor = paginate_queryset(
+        Leave.objects.select_related('employee'), "start_date", limit, cursor
+    )
+    return [leave_to_dict(leave) for leave in leaves], next_cursor
 
-def get_user_leaves(username, role):
-    """Utility to get leaves for any employee (including project managers)."""
+def iter_all_leaves(chunk_size=STREAM_CHUNK_SIZE):
+    """Utility to lazily yield every leave as a dict, in chunks."""
+    leaves = Leave.objects.select_related('employee').order_by("start_date", "id")
+    for leave in leaves.iterator(chunk_size=chunk_size):
+        yield leave_to_dict(leave)
+
+def get_user_leaves(username, role, limit=None, cursor=None):
+    """
+    Utility to get one page of leaves for any employee (including project managers).
+    Returns a tuple of (list of leaves, cursor for the next page or None),
+    or None if the user does not exist.
+    """
     try:
         user = User.objects.get(username=username)
-        leaves = Leave.objects.filter(employee__username=user)
-        return [{
-            "employee_name": f"{leave.employee.first_name} {leave.employee.last_name}",
-            "number_of_days": leave.number_of_days,
-            "start_date": str(leave.start_date),
-            "end_date": str(leave.end_date),
-            "approvable": leave.approvable
-        } for leave in leaves]
+        leaves, next_cursor = paginate_queryset(
+            Leave.objects.select_related('employee').filter(employee__username=user),
+            "start_date", limit, cursor,
+        )
+        return [leave_to_dict(leave) for leave in leaves], next_cursor
     except User.DoesNotExist:
         return None
 
+def leave_overlaps(employee_id, start_date, end_date, exclude_id=None):
+    """
+    Utility to check whether [start_date, end_date] overlaps a leave of the employee.
+
+    An employee's leaves never overlap each other, so the only candidate is the
+    leave with the latest start_date <= end_date: a single seek on the
+    (employee, start_date) index, however long the leave history is.
+    """
+    leaves = Leave.objects.filter(employee_id=employee_id, start_date__lte=end_date)
+    if exclude_id is not None:
+        leaves = leaves.exclude(id=exclude_id)
+    latest_end = leaves.order_by("-start_date").values_list("end_date", flat=True).first()
+    return latest_end is not None and latest_end >= start_date
+
 def create_leave(employee_username, number_of_days, start_date, end_date, approvable=False):
-    """Utility to create a leave record for an employee."""
+    """
+    Utility to create a leave record for an employee.
+    number_of_days is not trusted: the stored value is always the number of
+    working days (weekends and holidays excluded) between the two dates.
+    """
     try:
         user = User.objects.get(username=employee_username)
         employee = Employee.objects.get(username=user)
@@ -384,16 +504,146 @@ def create_leave(employee_username, number_of_days, start_date, end_date, approv
             end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
             
         # Validate dates
-        if end_date < start_date:
+        if end_date < start_date or (end_date - start_date).days >= MAX_LEAVE_DAYS:
             return None
-            
-        leave = Leave.objects.create(
-            employee=employee,
-            number_of_days=number_of_days,
-            start_date=start_date,
-            end_date=end_date,
-            approvable=approvable
-        )
+
+        # Reject leaves overlapping an existing leave of the same employee.
+        # On PostgreSQL the exclusion constraint also catches concurrent inserts.
+        with transaction.atomic():
+            if leave_overlaps(employee.id, start_date, end_date):
+                return None
+            leave = Leave.objects.create(
+                employee=employee,
+                number_of_days=working_days_between(start_date, end_date),
+                start_date=start_date,
+                end_date=end_date,
+                approvable=approvable
+            )
         return leave
-    except (User.DoesNotExist, Employee.DoesNotExist, ValueError):
-        return None
\ No newline at end of file
+    except (User.DoesNotExist, Employee.DoesNotExist, ValueError, IntegrityError):
+        return None
+
+
+def recalculate_leave_days(leaves=None):
+    """
+    Utility to recompute number_of_days of many leaves (all of them by default)
+    from the business-day calendar, e.g. after the holiday list changed.
+    Returns the number of leaves whose day count was corrected.
+    """
+    if leaves is None:
+        leaves = Leave.objects.all()
+    leaves = list(leaves.only("id", "employee_id", "start_date", "end_date", "number_of_days"))
+    counts = working_days_batch((leave.start_date, leave.end_date) for leave in leaves)
+
+    changed = []
+    for leave, days in zip(leaves, counts):
+        if leave.number_of_days != days:
+            leave.number_of_days = days
+            changed.append(leave)
+    Leave.objects.bulk_update(changed, ["number_of_days"], batch_size=1000)
+    if changed:
+        # bulk_update bypasses the signals that maintain these
+        rebuild_leave_balances({leave.employee_id for leave in changed})
+        bump_collection_version("leaves")
+    return len(changed)
+
+
+# --------------------- Async read helpers (ASGI) --------------------- #
+# Same results as the sync helpers above, using the async ORM so an ASGI
+# worker keeps serving other requests while waiting on the database.
+
+async def aget_all_hrs(limit=None, cursor=None):
+    """Async version of get_all_hrs."""
+    hrs, next_cursor = await apaginate_queryset(
+        HR.objects.select_related('username'), "last_name", limit, cursor
+    )
+    return [hr_to_dict(hr) for hr in hrs], next_cursor
+
+
+async def aget_hr_by_username(username):
+    """
+    Async version of get_hr_by_username.
+    The profile and its user are read with one joined query.
+    """
+    try:
+        hr = await HR.objects.select_related('username').aget(
+            username__username=username, username__role="HR"
+        )
+    except HR.DoesNotExist:
+        return None
+    return hr_to_dict(hr)
+
+
+async def aget_all_employees(limit=None, cursor=None):
+    """Async version of get_all_employees."""
+    employees, next_cursor = await apaginate_queryset(
+        Employee.objects.select_related('username'), "last_name", limit, cursor
+    )
+    return [employee_to_dict(emp) for emp in employees], next_cursor
+
+
+async def aiter_all_employees(chunk_size=STREAM_CHUNK_SIZE):
+    """Async version of iter_all_employees."""
+    employees = Employee.objects.select_related('username').order_by("last_name", "id")
+    async for emp in employees.aiterator(chunk_size=chunk_size):
+        yield employee_to_dict(emp)
+
+
+async def aget_all_project_managers(limit=None, cursor=None):
+    """Async version of get_all_project_managers."""
+    managers, next_cursor = await apaginate_queryset(
+        ProjectManager.objects.select_related('username'), "last_name", limit, cursor
+    )
+    return [project_manager_to_dict(pm) for pm in managers], next_cursor
+
+
+async def aiter_all_project_managers(chunk_size=STREAM_CHUNK_SIZE):
+    """Async version of iter_all_project_managers."""
+    managers = ProjectManager.objects.select_related('username').order_by("last_name", "id")
+    async for pm in managers.aiterator(chunk_size=chunk_size):
+        yield project_manager_to_dict(pm)
+
+
+async def aget_all_holidays(year=None):
+    """Async version of get_all_holidays, sharing its cache entries."""
+    async def load():
+        holidays = Holiday.objects.order_by("date", "id")
+        if year is not None:
+            holidays = holidays.filter(date__year=year)
+        return [{
+            "name": holiday.name,
+            "date": str(holiday.date)
+        } async for holiday in holidays]
+
+    return await acached_collection("holidays", year if year is not None else "all", load)
+
+
+async def aget_all_leaves(limit=None, cursor=None):
+    """Async version of get_all_leaves."""
+    leaves, next_cursor = await apaginate_queryset(
+        Leave.objects.select_related('employee'), "start_date", limit, cursor
+    )
+    return [leave_to_dict(leave) for leave in leaves], next_cursor
+
+
+async def aiter_all_leaves(chunk_size=STREAM_CHUNK_SIZE):
+    """Async version of iter_all_leaves."""
+    leaves = Leave.objects.select_related('employee').order_by("start_date", "id")
+    async for leave in leaves.aiterator(chunk_size=chunk_size):
+        yield leave_to_dict(leave)
+
+
+async def aget_user_leaves(username, role, limit=None, cursor=None):
+    """
+    Async version of get_user_leaves. The employee of every leave is joined
+    up front, as lazy relation loading is not allowed in async code.
+    """
+    try:
+        user = await User.objects.aget(username=username)
+    except User.DoesNotExist:
+        return None
+    leaves, next_cursor = await apaginate_queryset(
+        Leave.objects.select_related('employee').filter(employee__username=user),
+        "start_date", limit, cursor,
+    )
+    return [leave_to_dict(leave) for leave in leaves], next_cursor
@@ -43,6 +43,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "main.middleware.MetricsMiddleware",
+    "main.middleware.RepeatedQueryMiddleware",
+    "main.middleware.ReplicaRoutingMiddleware",
     
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -96,9 +99,83 @@ DATABASES = {
         'PASSWORD': os.getenv('SUPABASE_PASSWORD'),
         'HOST': os.getenv('SUPABASE_HOST'),
         'PORT': os.getenv('SUPABASE_PORT'),
+        # Seconds a connection is kept open to skip the TLS and authentication
+        # handshake of the next request (checked before reuse). Off unless
+        # set: under ASGI every request runs in a new thread and would leave a
+        # connection of its own open. Set it for WSGI workers, use the pool
+        # below under ASGI.
+        'CONN_MAX_AGE': int(os.getenv('SUPABASE_CONN_MAX_AGE') or 0),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional connection pool, shared by the threads of a worker: set
+# SUPABASE_POOL_MAX_SIZE to enable it. Needs psycopg 3 with its pool
+# (pip install "psycopg[binary,pool]") in place of psycopg2. Use it rather
+# than persistent connections when serving over ASGI, where every request
+# runs in a new thread and would keep a connection of its own.
+if os.getenv('SUPABASE_POOL_MAX_SIZE'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0  # Connections go back to the pool after each request
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('SUPABASE_POOL_MIN_SIZE') or 2),
+            'max_size': int(os.getenv('SUPABASE_POOL_MAX_SIZE')),
+            'timeout': float(os.getenv('SUPABASE_POOL_TIMEOUT') or 10),  # Seconds to wait for a connection
+        },
+    }
+
+# Optional read replica: with SUPABASE_REPLICA_HOST set, the reads of GET
+# requests go to the replica (see main/routers.py). After any other request
+# the client reads from the primary for REPLICA_STICKY_SECONDS, so it sees
+# its own writes despite the replication lag.
+if os.getenv('SUPABASE_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('SUPABASE_REPLICA_HOST'),
+        'PORT': os.getenv('SUPABASE_REPLICA_PORT') or os.getenv('SUPABASE_PORT'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['main.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS') or 10)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Per-process memory by default; set CACHE_REDIS_URL to share the cache
+# (and its invalidations) between all workers. Running several workers
+# without it, ETag / Last-Modified headers are not sent (see conditional.py).
+
+if os.getenv('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'hr-system',
+        }
+    }
+
+
+# Leave days every employee is entitled to per calendar year
+LEAVE_ANNUAL_ENTITLEMENT = int(os.getenv('LEAVE_ANNUAL_ENTITLEMENT') or 20)
+
+
+# Per-route request and SQL metrics served at /api/metrics (Prometheus format).
+# Set METRICS_TOKEN to require "Authorization: Bearer <token>" on scrapes;
+# without it only logged in HR users can read them (anyone with DEBUG on).
+METRICS_ENABLED = (os.getenv('METRICS_ENABLED') or 'True') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+
+# With DEBUG on, warn when one query shape runs this many times in a request (N+1)
+REPEATED_QUERY_THRESHOLD = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators